@@ -734,7 +734,7 @@ export const CreateOrderPage: React.FC = () => {
                                                 className={`relative text-left rounded-2xl border transition-all overflow-hidden group ${inCart ? 'border-indigo-400 bg-indigo-50/60 shadow-md shadow-indigo-100' : 'border-slate-100 bg-white hover:border-indigo-200 hover:shadow-sm'}`}
                                             >
                                                 {p.image_url && (
-                                                    <img src={p.image_url} alt={p.name} className="w-full h-24 object-cover" />
+                                                    <img src={p.image_src || p.image_url} srcSet={p.image_srcset || undefined} sizes="(min-width: 768px) 200px, 50vw" alt={p.name} className="w-full h-24 object-cover" />
                                                 )}
                                                 {!p.image_url && (
                                                     <div className="w-full h-16 bg-slate-50 flex items-center justify-center">
@@ -2,10 +2,14 @@ import React, { useState, useEffect, useMemo } from 'react';
 import { api } from '../services/api';
 import type { InventoryItem, InventoryLog } from '../types';
 
+const ITEMS_PAGE_SIZE = 200;
+
 export const InventoryPage: React.FC = () => {
     const [items, setItems] = useState<InventoryItem[]>([]);
     const [logs, setLogs] = useState<InventoryLog[]>([]);
+    const [itemsCursor, setItemsCursor] = useState<string | null>(null);
     const [loading, setLoading] = useState(true);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [searchTerm, setSearchTerm] = useState('');
     const [categoryFilter, setCategoryFilter] = useState('ALL');
     
@@ -39,11 +43,13 @@ export const InventoryPage: React.FC = () => {
     const fetchData = async () => {
         try {
             setLoading(true);
+            // 列表按游标分页，最近流水只展示 10 条
             const [itemsRes, logsRes] = await Promise.all([
-                api.get('/inventory/items'),
-                api.get('/inventory/logs')
+                api.get('/inventory/items', { params: { limit: ITEMS_PAGE_SIZE } }),
+                api.get('/inventory/logs', { params: { limit: 10 } })
             ]);
             setItems(Array.isArray(itemsRes.data) ? itemsRes.data : []);
+            setItemsCursor(itemsRes.headers['x-next-cursor'] || null);
             setLogs(Array.isArray(logsRes.data) ? logsRes.data : []);
         } catch (err) {
             console.error('Failed to fetch inventory data:', err);
@@ -52,6 +58,20 @@ export const InventoryPage: React.FC = () => {
         }
     };
 
+    const loadMoreItems = async () => {
+        if (!itemsCursor) return;
+        try {
+            setLoadingMore(true);
+            const res = await api.get('/inventory/items', { params: { limit: ITEMS_PAGE_SIZE, cursor: itemsCursor } });
+            setItems(prev => [...prev, ...(Array.isArray(res.data) ? res.data : [])]);
+            setItemsCursor(res.headers['x-next-cursor'] || null);
+        } catch (err) {
+            console.error('Failed to load more inventory items:', err);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     const categories = useMemo(() => {
         const cats = new Set(items.map(i => i.category).filter(Boolean));
         return ['ALL', ...Array.from(cats).sort()];
@@ -307,6 +327,17 @@ export const InventoryPage: React.FC = () => {
                         </tbody>
                     </table>
                 </div>
+                {itemsCursor && (
+                    <div className="p-6 border-t border-slate-100 text-center">
+                        <button
+                            onClick={loadMoreItems}
+                            disabled={loadingMore}
+                            className="px-6 py-2.5 rounded-xl bg-slate-50 text-slate-600 text-xs font-bold hover:bg-slate-100 transition-all disabled:opacity-50"
+                        >
+                            {loadingMore ? '加载中...' : '加载更多'}
+                        </button>
+                    </div>
+                )}
             </div>
 
             {/* Recent Logs Section */}
@@ -316,7 +347,7 @@ export const InventoryPage: React.FC = () => {
                     Recent Activity Logs
                 </h2>
                 <div className="space-y-4">
-                    {logs.slice(0, 10).map(log => (
+                    {logs.map(log => (
                         <div key={log.id} className="flex items-center justify-between p-4 rounded-2xl bg-slate-50/50 border border-slate-100/50">
                             <div className="flex items-center gap-4">
                                 <div className={`w-10 h-10 rounded-full flex items-center justify-center ${
@@ -24,6 +24,7 @@ interface ProductForm {
     price: number | '';
     category: string;
     image_url: string;
+    image_variants: Record<string, string> | null;
 }
 
 export const ProductsPage: React.FC = () => {
@@ -31,7 +32,7 @@ export const ProductsPage: React.FC = () => {
     const [loading, setLoading] = useState(true);
     const [showModal, setShowModal] = useState(false);
     const [editingProduct, setEditingProduct] = useState<Product | null>(null);
-    const [form, setForm] = useState<ProductForm>({ code: '', name: '', price: '', category: '', image_url: '' });
+    const [form, setForm] = useState<ProductForm>({ code: '', name: '', price: '', category: '', image_url: '', image_variants: null });
 
     // 双重确认弹窗状态
     const [isDeleteModalOpen, setDeleteModalOpen] = useState(false);
@@ -88,13 +89,13 @@ export const ProductsPage: React.FC = () => {
     const handleOpenModal = (product?: Product) => {
         if (product) {
             setEditingProduct(product);
-            setForm({ code: product.code, name: product.name, price: product.price ?? '', category: product.category || '', image_url: product.image_url || '' });
+            setForm({ code: product.code, name: product.name, price: product.price ?? '', category: product.category || '', image_url: product.image_url || '', image_variants: product.image_variants ?? null });
             setImagePreview(product.image_url || '');
             setShowCustomCategory(!PRESET_CATEGORIES.includes(product.category || ''));
             setCustomCategory(!PRESET_CATEGORIES.includes(product.category || '') ? (product.category || '') : '');
         } else {
             setEditingProduct(null);
-            setForm({ code: '', name: '', price: '', category: '', image_url: '' });
+            setForm({ code: '', name: '', price: '', category: '', image_url: '', image_variants: null });
             setImagePreview('');
             setShowCustomCategory(false);
             setCustomCategory('');
@@ -118,7 +119,8 @@ export const ProductsPage: React.FC = () => {
                 headers: { 'Content-Type': 'multipart/form-data' }
             });
 
-            setForm(prev => ({ ...prev, image_url: response.data.url }));
+            // 原图与各尺寸变体随产品一起保存
+            setForm(prev => ({ ...prev, image_url: response.data.url, image_variants: response.data.variants ?? null }));
         } catch (err) {
             console.error('Image upload failed', err);
             alert('图片上传失败，请重试。');
@@ -137,6 +139,7 @@ export const ProductsPage: React.FC = () => {
             name: form.name,
             category: finalCategory || undefined,
             image_url: form.image_url || undefined,
+            image_variants: form.image_url ? form.image_variants : null,
         };
         if (form.price !== '' && form.price !== null) {
             payload.price = form.price;
@@ -205,7 +208,7 @@ export const ProductsPage: React.FC = () => {
                                         <div className="flex items-center gap-4">
                                             <div className="w-10 h-10 bg-slate-100 rounded-xl flex items-center justify-center overflow-hidden shrink-0">
                                                 {product.image_url ? (
-                                                    <img src={product.image_url} alt={product.name} className="w-full h-full object-cover" />
+                                                    <img src={product.image_src || product.image_url} srcSet={product.image_srcset || undefined} sizes="40px" alt={product.name} className="w-full h-full object-cover" />
                                                 ) : (
                                                     <span className="material-icons-round text-slate-300">fastfood</span>
                                                 )}
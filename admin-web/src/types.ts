@@ -171,6 +171,10 @@ export interface Product {
     price: number;
     category?: string;
     image_url?: string;
+    image_variants?: Record<string, string> | null;
+    // 仅 GET /products 返回：按尺寸选出的列表图片与 srcset
+    image_src?: string;
+    image_srcset?: string | null;
     stock?: number;
 }
 
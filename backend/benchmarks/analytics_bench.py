@@ -0,0 +1,173 @@
+"""
+统计聚合微基准
+对 services/analytics 中逐行遍历订单的聚合函数，分别用 1k / 100k / 1M 行合成订单测量
+耗时（多次取最优）与峰值内存 (tracemalloc)。日期字段混用历史数据中出现过的多种格式。
+
+可保存基线并在之后的运行中比较，超过阈值即以非零状态退出，便于在 CI 或提交前检查回归。
+
+用法（在 backend 目录下）:
+    python benchmarks/analytics_bench.py --sizes 1000 100000 --save-baseline /tmp/analytics.json
+    python benchmarks/analytics_bench.py --sizes 1000 100000 --baseline /tmp/analytics.json --threshold 0.2
+    python benchmarks/analytics_bench.py --sizes 1000000 --repeat 1
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from services.analytics import (
+    aggregate_stats_overview, aggregate_financials, aggregate_ai_summary, ai_summary_windows,
+)
+
+# 固定"当前时间"，保证结果可重复
+NOW = datetime(2026, 3, 15, 6, 30, tzinfo=timezone.utc)
+
+STATUSES = ["pending", "preparing", "ready", "delivering", "completed"]
+METHODS = ["cash", "bank_transfer", "ewallet", "cheque", None]
+
+
+def _due_time(dt: datetime, rng: random.Random):
+    """历史数据中出现过的 dueTime 格式"""
+    fmt = rng.random()
+    if fmt < 0.45:
+        return dt.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    if fmt < 0.7:
+        return dt.isoformat()
+    if fmt < 0.85:
+        return dt.strftime("%Y-%m-%d %H:%M")
+    if fmt < 0.95:
+        return dt.strftime("%Y-%m-%d")
+    return None
+
+
+def make_orders(n: int, seed: int = 7) -> list[dict]:
+    rng = random.Random(seed)
+    orders = []
+    for i in range(n):
+        created = NOW - timedelta(days=rng.uniform(0, 420), seconds=rng.randint(0, 86400))
+        due = created + timedelta(days=rng.uniform(0, 10))
+        amount = round(rng.uniform(20, 3000), 2)
+        received = round(amount * rng.choice([0, 0, 0.5, 1]), 2)
+        orders.append({
+            "id": f"KM-{created:%y/%m/%d}/{i % 1000:03d}",
+            "order_number": f"KM-{created:%y/%m/%d}/{i % 1000:03d}",
+            "status": rng.choice(STATUSES),
+            "amount": amount,
+            "payment_received": received,
+            "balance": round(amount - received, 2),
+            "paymentStatus": "paid" if received >= amount else "unpaid",
+            "paymentMethod": rng.choice(METHODS),
+            "dueTime": _due_time(due, rng),
+            # created_at 来自数据库，始终为 ISO 格式，但精度与时区写法不一
+            "created_at": created.isoformat() if rng.random() < 0.8 else created.strftime("%Y-%m-%dT%H:%M:%S+00:00"),
+        })
+    return orders
+
+
+def _ai_inputs(orders: list[dict]):
+    windows = ai_summary_windows(NOW)
+    history_start = windows["history_start"].isoformat()
+    comparison_start = windows["last_month_start"].isoformat()
+    history = [o for o in orders if o["created_at"] >= history_start]
+    comparison = [o for o in orders if o["created_at"] >= comparison_start]
+    return history, comparison
+
+
+def cases(orders: list[dict]) -> dict:
+    history, comparison = _ai_inputs(orders)
+    return {
+        # stats 会就地排序输入，每次传入浅拷贝
+        "aggregate_stats_overview": lambda: aggregate_stats_overview(list(orders), NOW),
+        "aggregate_financials[month]": lambda: aggregate_financials(orders, "month", NOW),
+        "aggregate_financials[all]": lambda: aggregate_financials(orders, "all", NOW),
+        "aggregate_ai_summary": lambda: aggregate_ai_summary(history, comparison, NOW),
+    }
+
+
+def measure(fn, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+
+    # 单独一次运行测峰值内存（tracemalloc 本身会拖慢执行，不计入耗时）
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"best_s": round(min(times), 4), "peak_mib": round(peak / 2**20, 2)}
+
+
+# 低于这些绝对差值的变化视为测量噪声
+NOISE_FLOOR = {"best_s": 0.005, "peak_mib": 1.0}
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions = []
+    for key, current in results.items():
+        before = baseline.get(key)
+        if not before:
+            continue
+        for metric in ("best_s", "peak_mib"):
+            if current[metric] - before[metric] < NOISE_FLOOR[metric]:
+                continue
+            if before[metric] and current[metric] > before[metric] * (1 + threshold):
+                change = (current[metric] / before[metric] - 1) * 100
+                regressions.append(f"{key} {metric}: {before[metric]} -> {current[metric]} (+{change:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for analytics aggregation")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", help="substring filter on function names")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed regression ratio (0.2 = 20%%)")
+    parser.add_argument("--save-baseline", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    results: dict[str, dict] = {}
+    print(f"{'function':<32}{'rows':>10}{'best s':>10}{'rows/s':>14}{'peak MiB':>10}")
+    for size in args.sizes:
+        orders = make_orders(size)
+        for name, fn in cases(orders).items():
+            if args.only and args.only not in name:
+                continue
+            # 1M 行时单次即需数十秒，自动减少重复次数
+            result = measure(fn, 1 if size >= 1_000_000 else args.repeat)
+            key = f"{name}@{size}"
+            results[key] = result
+            print(f"{name:<32}{size:>10}{result['best_s']:>10}{size / max(result['best_s'], 1e-9):>14,.0f}{result['peak_mib']:>10}")
+        del orders
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nRegressions beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+离线接口基准测试
+用进程内的 FakeSupabase 替换数据库客户端，按指定规模生成订单 / 用户 / 车辆等合成数据，
+通过 httpx.ASGITransport 直接调用 FastAPI 应用（不经过网络），输出热点接口的
+p50 / p95 / p99 延迟与吞吐量。结果可重复，不依赖线上 Supabase 项目与真实账号。
+
+用法（在 backend 目录下）:
+    python benchmarks/endpoint_bench.py --orders 10000
+    python benchmarks/endpoint_bench.py --orders 1000000 --requests 50 --concurrency 4 --json result.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import httpx
+
+import database
+from benchmarks.fake_supabase import FakeSupabase
+from benchmarks.latency import summarize, format_table
+
+STATUSES = ["pending", "preparing", "ready", "delivering", "completed", "cancelled"]
+ROLES = [("admin", 0.05), ("kitchen", 0.15), ("driver", 0.6), ("account", 0.15), ("super_admin", 0.05)]
+MENU = [("Nasi Lemak", 12.0), ("Mee Goreng", 10.0), ("Ayam Masak Merah", 18.0), ("Kuih Platter", 25.0), ("Teh Tarik", 3.5)]
+
+
+def _iso(dt: datetime) -> str:
+    return dt.isoformat()
+
+
+def seed(orders: int, users: int, vehicles: int, rng: random.Random) -> dict[str, list[dict]]:
+    now = datetime.now(timezone.utc)
+
+    user_rows = []
+    for i in range(users):
+        role = rng.choices([r for r, _ in ROLES], weights=[w for _, w in ROLES])[0]
+        user_rows.append({
+            "id": f"user-{i:05d}",
+            "email": f"user{i}@bench.local",
+            "role": role,
+            "status": "active",
+            "name": f"Bench User {i}",
+            "phone": f"01{rng.randint(10000000, 99999999)}",
+            "vehicle_status": "idle",
+        })
+    drivers = [u["id"] for u in user_rows if u["role"] == "driver"]
+
+    vehicle_rows = [
+        {
+            "id": f"vehicle-{i:04d}",
+            "plate_no": f"BKL {1000 + i}",
+            "model": rng.choice(["Hiace", "Starex", "Vellfire"]),
+            "type": "van",
+            "status": "available",
+        }
+        for i in range(vehicles)
+    ]
+
+    assignment_rows = []
+    for i, (driver_id, vehicle) in enumerate(zip(drivers, vehicle_rows)):
+        if rng.random() < 0.7:
+            vehicle["status"] = "busy"
+            assignment_rows.append({
+                "id": f"assign-{i:04d}",
+                "driver_id": driver_id,
+                "vehicle_id": vehicle["id"],
+                "status": "active",
+                "assigned_at": _iso(now - timedelta(hours=rng.randint(1, 48))),
+            })
+
+    customer_rows = [
+        {"id": f"customer-{i:05d}", "name": f"Customer {i}", "phone": f"01{rng.randint(10000000, 99999999)}"}
+        for i in range(max(1, orders // 20))
+    ]
+
+    order_rows = []
+    per_day: dict[str, int] = {}
+    for _ in range(orders):
+        created = now - timedelta(days=rng.uniform(0, 400))
+        due = created + timedelta(days=rng.uniform(0, 14), hours=rng.randint(8, 20))
+        day = created.strftime("%y/%m/%d")
+        per_day[day] = per_day.get(day, 0) + 1
+        order_id = f"KM-{day}/{per_day[day]:03d}"
+        items = [
+            {"name": name, "quantity": rng.randint(5, 200), "price": price}
+            for name, price in rng.sample(MENU, rng.randint(1, 4))
+        ]
+        amount = round(sum(i["quantity"] * i["price"] for i in items), 2)
+        received = round(amount * rng.choice([0, 0.5, 1]), 2)
+        customer = rng.choice(customer_rows)
+        # 混合多种日期格式，贴近历史数据
+        due_str = rng.choice([
+            _iso(due),
+            due.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            due.strftime("%Y-%m-%d %H:%M"),
+        ])
+        order_rows.append({
+            "id": order_id,
+            "order_number": order_id,
+            "customerName": customer["name"],
+            "customerPhone": customer["phone"],
+            "customer_id": customer["id"],
+            "address": f"{rng.randint(1, 99)} Jalan Bench, Kuala Lumpur",
+            "items": items,
+            "status": rng.choice(STATUSES),
+            "dueTime": due_str,
+            "amount": amount,
+            "payment_received": received,
+            "balance": round(amount - received, 2),
+            "paymentStatus": "paid" if received >= amount else "unpaid",
+            "driverId": rng.choice(drivers) if drivers and rng.random() < 0.5 else None,
+            "created_at": _iso(created),
+        })
+
+    return {
+        "users": user_rows,
+        "vehicles": vehicle_rows,
+        "driver_assignments": assignment_rows,
+        "customers": customer_rows,
+        "orders": order_rows,
+        "order_items": [],
+        "inventory_items": [],
+        "audit_logs": [],
+    }
+
+
+def replace_order_items_rpc(fake: FakeSupabase):
+    """replace_order_items RPC 的内存实现，与 migration_v11 中的函数行为一致"""
+    def handler(params: dict) -> list[dict]:
+        order_id = params["p_order_id"]
+        rows = [
+            {
+                "id": str(uuid.uuid4()),
+                "order_id": order_id,
+                "position": position,
+                "product_id": item.get("id"),
+                "name": item.get("name") or "Unnamed Item",
+                "quantity": int(item.get("quantity") or 1),
+                "note": item.get("note"),
+                "price": item.get("price") or 0,
+                "is_prepared": bool(item.get("is_prepared", False)),
+                "status": item.get("status") or "pending",
+            }
+            for position, item in enumerate(params.get("p_items") or [])
+        ]
+        table = fake.tables.setdefault("order_items", [])
+        table[:] = [r for r in table if r["order_id"] != order_id] + rows
+        projection = [{k: r[src] for k, src in PROJECTION_FIELDS.items()} for r in rows]
+        for order in fake.tables.get("orders", []):
+            if order["id"] == order_id:
+                order["items"] = projection
+        return projection
+    return handler
+
+
+def create_order_with_items_rpc(fake: FakeSupabase):
+    """create_order_with_items RPC 的内存实现，与 migration_v16 中的函数行为一致"""
+    replace_items = replace_order_items_rpc(fake)
+
+    def handler(params: dict) -> dict:
+        fields = {k: v for k, v in (params.get("p_fields") or {}).items() if k != "items"}
+        orders = fake.tables.setdefault("orders", [])
+        if any(o["id"] == fields.get("id") for o in orders):
+            raise Exception('duplicate key value violates unique constraint "orders_pkey"')
+        order = {**fields, "items": []}
+        orders.append(order)
+        replace_items({"p_order_id": order["id"], "p_items": params.get("p_items")})
+        return dict(order)
+    return handler
+
+
+def next_order_number_rpc(fake: FakeSupabase):
+    """next_order_number RPC 的内存实现，与 migration_v13 中的函数行为一致"""
+    counters: dict[str, int] = {}
+    lock = threading.Lock()
+
+    def handler(params: dict) -> int:
+        prefix = params["p_prefix"]
+        with lock:
+            if prefix not in counters:
+                existing = [
+                    int(o["id"][len(prefix):]) for o in fake.tables.get("orders", [])
+                    if o["id"].startswith(prefix) and o["id"][len(prefix):].isdigit()
+                ]
+                counters[prefix] = max(existing, default=0)
+            counters[prefix] += 1
+            return counters[prefix]
+    return handler
+
+
+# orders.items 投影字段 -> order_items 列
+PROJECTION_FIELDS = {"id": "product_id", "name": "name", "quantity": "quantity", "note": "note", "price": "price"}
+
+
+def new_order_payload(rng: random.Random) -> dict:
+    items = [
+        {"name": name, "quantity": rng.randint(5, 100), "price": price}
+        for name, price in rng.sample(MENU, 2)
+    ]
+    return {
+        "customerName": "Bench Customer",
+        "customerPhone": f"01{rng.randint(10000000, 99999999)}",
+        "address": "1 Jalan Bench",
+        "items": items,
+        "status": "pending",
+        "dueTime": (datetime.now(timezone.utc) + timedelta(days=2)).isoformat(),
+        "amount": round(sum(i["quantity"] * i["price"] for i in items), 2),
+        "payment_received": 0,
+    }
+
+
+async def run_endpoint(client: httpx.AsyncClient, make_request, requests: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            response = await make_request(client, i)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    wall_started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    summary = summarize(latencies, time.perf_counter() - wall_started)
+    summary["errors"] = errors
+    return summary
+
+
+async def main_async(args):
+    rng = random.Random(args.seed)
+    print(f"Seeding {args.orders} orders, {args.users} users, {args.vehicles} vehicles...")
+    started = time.perf_counter()
+    fake = FakeSupabase(seed(args.orders, args.users, args.vehicles, rng))
+    fake.rpc_handlers["replace_order_items"] = replace_order_items_rpc(fake)
+    fake.rpc_handlers["next_order_number"] = next_order_number_rpc(fake)
+    fake.rpc_handlers["create_order_with_items"] = create_order_with_items_rpc(fake)
+    database._client = fake
+    print(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+    # 注入替身后再导入应用，保证所有模块拿到的都是 FakeSupabase
+    import main as app_module
+
+    headers = {"x-user-id": "bench-super-admin", "x-user-role": "super_admin"}
+    endpoints = {
+        "GET /orders": lambda c, i: c.get("/orders"),
+        "POST /orders": lambda c, i: c.post("/orders", json=new_order_payload(rng)),
+        "GET /super-admin/stats": lambda c, i: c.get("/super-admin/stats"),
+        "GET /vehicles/status": lambda c, i: c.get("/vehicles/status"),
+    }
+    selected = {k: v for k, v in endpoints.items() if not args.only or any(o in k for o in args.only)}
+
+    results: dict[str, dict] = {}
+    # 应用内异常按 500 计入结果，而不是中断整个基准测试
+    transport = httpx.ASGITransport(app=app_module.app, raise_app_exceptions=False)
+    async with app_module.app.router.lifespan_context(app_module.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers, timeout=None) as client:
+            for name, make_request in selected.items():
+                # 预热：填充各类进程内缓存
+                for i in range(min(3, args.requests)):
+                    await make_request(client, i)
+                results[name] = await run_endpoint(client, make_request, args.requests, args.concurrency)
+
+    print()
+    print(format_table(results))
+    errors = {k: v["errors"] for k, v in results.items() if v["errors"]}
+    if errors:
+        print(f"\nWARNING: non-2xx responses: {errors}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "orders": args.orders,
+                "users": args.users,
+                "vehicles": args.vehicles,
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "results": results,
+            }, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of hot API endpoints against an in-process Supabase fake")
+    parser.add_argument("--orders", type=int, default=10_000, help="number of synthetic orders (10k-1M)")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--vehicles", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", nargs="*", help="substring filter on endpoint names, e.g. --only orders stats")
+    parser.add_argument("--json", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    # 基准测试不应触发外部推送 / 日历同步
+    os.environ.pop("GOEASY_APPKEY", None)
+    os.environ.pop("GOOGLE_CALENDAR_CREDENTIALS_JSON", None)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+"""
+进程内的 Supabase 替身（仅用于基准测试）
+实现路由中用到的 postgrest 查询构建器子集、auth.admin 与 storage 接口，数据全部保存在内存字典中。
+注入方式：database._client = FakeSupabase(tables)，之后 `from database import supabase` 的调用都会落到这里。
+"""
+import copy
+import re
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Callable, Optional
+
+
+class FakeAPIError(Exception):
+    pass
+
+
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+def _singular(table: str) -> str:
+    return table[:-1] if table.endswith("s") else table
+
+
+def _split_top_level(columns: str) -> list[str]:
+    """按顶层逗号拆分 select 列表，忽略嵌套括号中的逗号"""
+    parts, depth, current = [], 0, ""
+    for ch in columns:
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0:
+            parts.append(current.strip())
+            current = ""
+        else:
+            current += ch
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+_EMBED = re.compile(r"^(?:(\w+):)?(\w+)(?:!\w+)?\((.*)\)$", re.S)
+
+
+def _like(pattern: str, case_insensitive: bool) -> re.Pattern:
+    regex = "^" + ".*".join(re.escape(p) for p in re.split(r"[%*]", pattern)) + "$"
+    return re.compile(regex, re.I if case_insensitive else 0)
+
+
+def _coerce(value: str) -> Any:
+    if value == "null":
+        return None
+    if value in ("true", "false"):
+        return value == "true"
+    return value
+
+
+class FakeQuery:
+    def __init__(self, db: "FakeSupabase", table: str):
+        self._db = db
+        self._table = table
+        self._op = "select"
+        self._columns = "*"
+        self._count = None
+        self._payload: Any = None
+        self._filters: list[Callable[[dict], bool]] = []
+        self._negate_next = False
+        self._order: list[tuple[str, bool]] = []
+        self._limit: Optional[int] = None
+        self._offset = 0
+        self._single = False
+        self._maybe_single = False
+        self._on_conflict = "id"
+        self._ignore_duplicates = False
+
+    # ── 操作 ──────────────────────────────────────────────────────────────
+
+    def select(self, *columns, count=None, **kwargs):
+        if self._op == "select":
+            self._columns = ",".join(columns) or "*"
+        self._count = count
+        return self
+
+    def insert(self, rows, **kwargs):
+        self._op, self._payload = "insert", rows
+        return self
+
+    def upsert(self, rows, on_conflict: str = "id", ignore_duplicates: bool = False, **kwargs):
+        self._op, self._payload, self._on_conflict = "upsert", rows, on_conflict or "id"
+        self._ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, values, **kwargs):
+        self._op, self._payload = "update", values
+        return self
+
+    def delete(self, **kwargs):
+        self._op = "delete"
+        return self
+
+    # ── 过滤 ──────────────────────────────────────────────────────────────
+
+    def _add(self, column: str, predicate: Callable[[Any], bool]):
+        negate, self._negate_next = self._negate_next, False
+        if "." in column:
+            # 针对嵌入资源的过滤（如 assignments.status），替身中忽略
+            return self
+
+        def check(row: dict) -> bool:
+            value = row.get(column)
+            try:
+                result = predicate(value)
+            except TypeError:
+                result = False
+            return not result if negate else result
+
+        self._filters.append(check)
+        return self
+
+    @property
+    def not_(self):
+        self._negate_next = True
+        return self
+
+    def eq(self, column, value):
+        return self._add(column, lambda v: v == value or (v is not None and str(v) == str(value)))
+
+    def neq(self, column, value):
+        return self._add(column, lambda v: v != value and str(v) != str(value))
+
+    def gt(self, column, value):
+        return self._add(column, lambda v: v is not None and v > value)
+
+    def gte(self, column, value):
+        return self._add(column, lambda v: v is not None and v >= value)
+
+    def lt(self, column, value):
+        return self._add(column, lambda v: v is not None and v < value)
+
+    def lte(self, column, value):
+        return self._add(column, lambda v: v is not None and v <= value)
+
+    def like(self, column, pattern):
+        regex = _like(pattern, False)
+        return self._add(column, lambda v: v is not None and bool(regex.match(str(v))))
+
+    def ilike(self, column, pattern):
+        regex = _like(pattern, True)
+        return self._add(column, lambda v: v is not None and bool(regex.match(str(v))))
+
+    def in_(self, column, values):
+        allowed = set(values)
+        return self._add(column, lambda v: v in allowed)
+
+    def is_(self, column, value):
+        expected = _coerce(value) if isinstance(value, str) else value
+        return self._add(column, lambda v: v is expected or v == expected)
+
+    def or_(self, filters: str, **kwargs):
+        """支持 `col.op.value,col.op.value` 形式的简单 OR 条件"""
+        clauses = []
+        for clause in _split_top_level(filters):
+            column, op, value = clause.split(".", 2)
+            probe = FakeQuery(self._db, self._table)
+            getattr(probe, {"in": "in_", "is": "is_"}.get(op, op))(
+                column, value.strip("()").split(",") if op == "in" else value
+            )
+            clauses.extend(probe._filters)
+        negate, self._negate_next = self._negate_next, False
+        self._filters.append(lambda row: any(c(row) for c in clauses) != negate)
+        return self
+
+    # ── 排序 / 分页 ──────────────────────────────────────────────────────
+
+    def order(self, column, desc: bool = False, **kwargs):
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, n: int, **kwargs):
+        self._limit = n
+        return self
+
+    def range(self, start: int, end: int, **kwargs):
+        self._offset, self._limit = start, end - start + 1
+        return self
+
+    def single(self):
+        self._single = True
+        return self
+
+    def maybe_single(self):
+        self._maybe_single = True
+        return self
+
+    # ── 执行 ──────────────────────────────────────────────────────────────
+
+    def _matching(self) -> list[dict]:
+        rows = self._db.tables.setdefault(self._table, [])
+        return [r for r in rows if all(f(r) for f in self._filters)]
+
+    def _project(self, row: dict, columns: str) -> dict:
+        out: dict = {}
+        for col in _split_top_level(columns):
+            embed = _EMBED.match(col)
+            if embed:
+                alias, table, sub_columns = embed.groups()
+                out[alias or table] = self._embed(row, table, sub_columns)
+            elif col == "*":
+                out.update(row)
+            else:
+                out[col] = row.get(col)
+        return out
+
+    def _embed(self, row: dict, table: str, columns: str):
+        child_rows = self._db.tables.get(table, [])
+        fk = self._db.foreign_keys.get((self._table, table))
+        if fk is None and f"{_singular(table)}_id" in row:
+            fk = f"{_singular(table)}_id"
+        if fk and fk in row:
+            # 多对一：父行持有外键
+            target = next((c for c in child_rows if c.get("id") == row[fk]), None)
+            return self._project(target, columns) if target else None
+        # 一对多：子表持有指向父表的外键
+        back_fk = self._db.foreign_keys.get((table, self._table), f"{_singular(self._table)}_id")
+        return [self._project(c, columns) for c in child_rows if c.get(back_fk) == row.get("id")]
+
+    def execute(self):
+        return getattr(self, f"_execute_{self._op}")()
+
+    def _execute_select(self):
+        rows = self._matching()
+        total = len(rows)
+        for column, desc in reversed(self._order):
+            rows.sort(key=lambda r: (r.get(column) is None, r.get(column) or ""), reverse=desc)
+        end = None if self._limit is None else self._offset + self._limit
+        rows = [self._project(r, self._columns) for r in rows[self._offset:end]]
+        rows = copy.deepcopy(rows)
+        count = total if self._count else None
+        if self._single:
+            if len(rows) != 1:
+                raise FakeAPIError(f"PGRST116: expected 1 row from {self._table}, got {len(rows)}")
+            return FakeResponse(rows[0], count)
+        if self._maybe_single:
+            return FakeResponse(rows[0] if rows else None, count)
+        return FakeResponse(rows, count)
+
+    def _execute_insert(self):
+        rows = self._payload if isinstance(self._payload, list) else [self._payload]
+        table = self._db.tables.setdefault(self._table, [])
+        existing = {r.get("id") for r in table}
+        inserted = []
+        for row in rows:
+            row = copy.deepcopy(row)
+            row.setdefault("id", str(uuid.uuid4()))
+            row.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+            if row["id"] in existing:
+                raise FakeAPIError(f"duplicate key value violates unique constraint \"{self._table}_pkey\"")
+            existing.add(row["id"])
+            table.append(row)
+            inserted.append(copy.deepcopy(row))
+        return FakeResponse(inserted)
+
+    def _execute_upsert(self):
+        rows = self._payload if isinstance(self._payload, list) else [self._payload]
+        table = self._db.tables.setdefault(self._table, [])
+        keys = [k.strip() for k in self._on_conflict.split(",")]
+        result = []
+        for row in rows:
+            match = next((r for r in table if all(r.get(k) == row.get(k) for k in keys)), None)
+            if match and self._ignore_duplicates:
+                continue
+            if match:
+                match.update(copy.deepcopy(row))
+                result.append(copy.deepcopy(match))
+            else:
+                self._payload = row
+                result.extend(self._execute_insert().data)
+        return FakeResponse(result)
+
+    def _execute_update(self):
+        updated = []
+        for row in self._matching():
+            row.update(copy.deepcopy(self._payload))
+            updated.append(copy.deepcopy(row))
+        return FakeResponse(updated)
+
+    def _execute_delete(self):
+        matched = self._matching()
+        ids = {id(r) for r in matched}
+        self._db.tables[self._table] = [r for r in self._db.tables.get(self._table, []) if id(r) not in ids]
+        return FakeResponse(copy.deepcopy(matched))
+
+
+class _FakeRPC:
+    def __init__(self, handler: Optional[Callable[[dict], Any]], params: dict):
+        self._handler = handler
+        self._params = params
+
+    def execute(self):
+        return FakeResponse(self._handler(self._params) if self._handler else None)
+
+
+class _FakeBucket:
+    def __init__(self, store: dict, bucket: str):
+        self._store = store
+        self._bucket = bucket
+
+    def upload(self, path, file, file_options=None):
+        self._store[(self._bucket, path)] = file
+        return SimpleNamespace(path=path)
+
+    def get_public_url(self, path):
+        return f"https://fake.supabase.local/storage/v1/object/public/{self._bucket}/{path}"
+
+    def remove(self, paths):
+        for path in paths:
+            self._store.pop((self._bucket, path), None)
+        return []
+
+
+class _FakeStorage:
+    def __init__(self):
+        self.objects: dict = {}
+
+    def from_(self, bucket: str):
+        return _FakeBucket(self.objects, bucket)
+
+
+class _FakeAuthAdmin:
+    def __init__(self, db: "FakeSupabase"):
+        self._db = db
+
+    def create_user(self, attributes: dict):
+        user = SimpleNamespace(
+            id=str(uuid.uuid4()),
+            email=attributes.get("email"),
+            user_metadata=attributes.get("user_metadata") or {},
+        )
+        self._db.auth_users[user.id] = user
+        return SimpleNamespace(user=user)
+
+    def update_user_by_id(self, user_id: str, attributes: dict):
+        user = self._db.auth_users.get(user_id)
+        if user and attributes.get("user_metadata"):
+            user.user_metadata.update(attributes["user_metadata"])
+        return SimpleNamespace(user=user)
+
+    def delete_user(self, user_id: str):
+        self._db.auth_users.pop(user_id, None)
+
+
+class _FakeAuth:
+    def __init__(self, db: "FakeSupabase"):
+        self._db = db
+        self.admin = _FakeAuthAdmin(db)
+
+    def get_user(self, token: str):
+        """基准测试中 token 即为用户 ID"""
+        row = next((u for u in self._db.tables.get("users", []) if u.get("id") == token), None)
+        if not row:
+            return None
+        return SimpleNamespace(user=SimpleNamespace(id=row["id"], user_metadata={"role": row.get("role")}))
+
+
+class FakeSupabase:
+    def __init__(
+        self,
+        tables: Optional[dict[str, list[dict]]] = None,
+        rpc_handlers: Optional[dict[str, Callable[[dict], Any]]] = None,
+        foreign_keys: Optional[dict[tuple[str, str], str]] = None,
+    ):
+        self.tables: dict[str, list[dict]] = tables or {}
+        self.rpc_handlers = rpc_handlers or {}
+        # (表, 被嵌入表) -> 外键列；未声明时按 `<单数表名>_id` 推断
+        self.foreign_keys = foreign_keys or {}
+        self.auth_users: dict = {}
+        self.auth = _FakeAuth(self)
+        self.storage = _FakeStorage()
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def from_(self, name: str) -> FakeQuery:
+        return self.table(name)
+
+    def rpc(self, fn: str, params: Optional[dict] = None, *args, **kwargs):
+        return _FakeRPC(self.rpc_handlers.get(fn), params or {})
@@ -0,0 +1,141 @@
+"""
+冷启动耗时分析
+1. 在全新子进程中执行 `python -X importtime -c "import main"`，汇总各模块的累计导入耗时，
+   用于确认 supabase / googleapiclient / Pillow 等重依赖没有在启动时被加载。
+2. 用 uvicorn 启动应用并轮询 /health，测量从进程启动到第一次成功响应的时间
+   （包含导入、lifespan 启动逻辑与事件循环就绪，即负载均衡器真正能接流量的时刻）。
+
+用法（在 backend 目录下）:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --runs 5 --top 30 --module main
+    python benchmarks/import_time.py --no-serve   # 只分析导入
+"""
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 这些模块应当延迟到首次使用时才导入
+LAZY_MODULES = ("supabase", "googleapiclient", "google.oauth2", "PIL")
+
+# import time:      self [us] |  cumulative | imported package
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def profile_once(module: str) -> tuple[float, list[tuple[str, int, int, int]]]:
+    """返回 (进程总耗时秒, [(模块, self_us, cumulative_us, 嵌套深度)])"""
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - started
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr[-2000:])
+        raise SystemExit(f"Importing {module} failed (exit code {proc.returncode})")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return elapsed, rows
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_health(app: str, timeout: float) -> float:
+    """启动 uvicorn 子进程，返回直到 /health 首次返回 200 的秒数"""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/health"
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if proc.poll() is not None:
+                sys.stderr.write(proc.stderr.read().decode(errors="replace")[-2000:])
+                raise SystemExit(f"uvicorn exited with code {proc.returncode} before /health answered")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError, TimeoutError):
+                pass
+            time.sleep(0.01)
+        raise SystemExit(f"/health did not answer within {timeout:.0f}s")
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile API cold-start import time")
+    parser.add_argument("--module", default="main", help="module to import (default: main)")
+    parser.add_argument("--runs", type=int, default=3, help="number of cold runs")
+    parser.add_argument("--top", type=int, default=20, help="number of slowest modules to list")
+    parser.add_argument("--app", default="main:app", help="ASGI app for the /health measurement")
+    parser.add_argument("--no-serve", action="store_true", help="skip the time-to-first-/health measurement")
+    parser.add_argument("--health-timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    wall_times = []
+    rows = []
+    for _ in range(args.runs):
+        elapsed, rows = profile_once(args.module)
+        wall_times.append(elapsed)
+
+    # 取最后一次运行的明细（前几次已预热磁盘缓存）
+    top_level = [r for r in rows if r[3] <= 1]
+    total_us = sum(r[1] for r in rows)
+
+    print(f"Module: {args.module}    runs: {args.runs}")
+    print(f"Process wall time  median {statistics.median(wall_times) * 1000:8.1f} ms"
+          f"   min {min(wall_times) * 1000:8.1f} ms")
+    print(f"Total import time  {total_us / 1000:8.1f} ms across {len(rows)} modules")
+    print()
+    print(f"Top {args.top} by cumulative time (top-level imports):")
+    print(f"{'cumulative ms':>14}  {'self ms':>8}  module")
+    for name, self_us, cumulative_us, _ in sorted(top_level, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:14.1f}  {self_us / 1000:8.1f}  {name}")
+
+    loaded = {r[0] for r in rows}
+    eager = [m for m in LAZY_MODULES if m in loaded]
+    print()
+    if eager:
+        print(f"WARNING: lazily-loaded dependencies imported at startup: {', '.join(eager)}")
+    else:
+        print("OK: optional dependencies are not imported at startup")
+
+
+    if not args.no_serve:
+        health_times = [time_to_health(args.app, args.health_timeout) for _ in range(args.runs)]
+        print()
+        print(f"Time to first /health  median {statistics.median(health_times) * 1000:8.1f} ms"
+              f"   min {min(health_times) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
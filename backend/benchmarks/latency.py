@@ -0,0 +1,58 @@
+"""
+基准测试共用的延迟统计工具
+"""
+import math
+from typing import Sequence
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    """nearest-rank 百分位，输入需已排序"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: Sequence[float], wall_seconds: float) -> dict:
+    """latencies 为秒；返回毫秒级统计与吞吐量"""
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "throughput_rps": round(len(values) / wall_seconds, 1) if wall_seconds > 0 else 0.0,
+        "min_ms": round(values[0] * 1000, 2) if values else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+    }
+
+
+def format_table(rows: dict[str, dict]) -> str:
+    width = max([28] + [len(name) + 2 for name in rows])
+    header = f"{'endpoint':<{width}}{'count':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    lines = [header, "-" * len(header)]
+    for name, s in rows.items():
+        lines.append(
+            f"{name:<{width}}{s['count']:>8}{s['throughput_rps']:>10}{s['p50_ms']:>10}"
+            f"{s['p95_ms']:>10}{s['p99_ms']:>10}{s['max_ms']:>10}"
+        )
+    return "\n".join(lines)
+
+
+# HDR 风格的百分位谱：越接近尾部采样越密
+SPECTRUM = (50.0, 75.0, 90.0, 95.0, 99.0, 99.9, 99.99, 100.0)
+
+
+def spectrum(latencies: Sequence[float]) -> dict[str, float]:
+    """返回 {百分位: 毫秒}"""
+    values = sorted(latencies)
+    return {f"{pct:g}": round(percentile(values, pct) * 1000, 2) for pct in SPECTRUM}
+
+
+def format_spectrum(name: str, latencies: Sequence[float]) -> str:
+    values = sorted(latencies)
+    lines = [f"{name}  (n={len(values)})", f"{'percentile':>12}{'latency ms':>14}{'count <=':>12}"]
+    for pct in SPECTRUM:
+        rank = max(1, math.ceil(pct / 100 * len(values))) if values else 0
+        lines.append(f"{pct:>11g}%{percentile(values, pct) * 1000:>14.2f}{rank:>12}")
+    return "\n".join(lines)
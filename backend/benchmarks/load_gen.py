@@ -0,0 +1,354 @@
+"""
+开环 (open-loop) 负载生成器
+按配置的到达率发起"会话"：每次到达按权重选择一个角色（管理员 / 厨房 / 司机），
+再按该角色的权重选择一个场景执行。到达时间与服务端响应无关，慢请求不会拖慢发压节奏，
+延迟从计划到达时刻开始计算，避免 coordinated omission。
+
+取代 archive/stress_test.py 中单线程、串行 requests 的压测方式。
+
+用法（在 backend 目录下，后端需已启动）:
+    python benchmarks/load_gen.py --profile 30s@5,60s@20,30s@20
+    python benchmarks/load_gen.py --profile spike --mix admin=1,kitchen=2,driver=6 --json run.json
+    python benchmarks/load_gen.py --profile ramp --compare run.json
+
+认证方式:
+    默认使用开发用 x-user-id / x-user-role 请求头，可用 --identity driver=<uuid> 指定真实用户 ID；
+    环境变量 LOADGEN_TOKEN_<ROLE>（如 LOADGEN_TOKEN_ADMIN）存在时改用 Bearer Token。
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import httpx
+
+from benchmarks.latency import summarize, spectrum, format_spectrum, format_table
+
+PROFILES = {
+    # 预置的发压曲线：每段为 (时长秒, 目标到达率/秒)，段内从上一段的速率线性过渡
+    "constant": "60s@10",
+    "ramp": "10s@1,60s@30,30s@30",
+    "spike": "30s@5,1s@5,10s@60,1s@5,30s@5",
+    "soak": "600s@5",
+}
+
+
+def parse_profile(spec: str) -> list[tuple[float, float]]:
+    spec = PROFILES.get(spec, spec)
+    stages = []
+    for part in spec.split(","):
+        duration, rate = part.strip().split("@")
+        stages.append((float(duration.rstrip("s")), float(rate)))
+    return stages
+
+
+def rate_at(stages: list[tuple[float, float]], t: float) -> float:
+    previous = stages[0][1]
+    for duration, rate in stages:
+        if t < duration:
+            return previous + (rate - previous) * (t / duration)
+        t -= duration
+        previous = rate
+    return 0.0
+
+
+def parse_weights(spec: str) -> dict[str, float]:
+    return {k.strip(): float(v) for k, v in (p.split("=") for p in spec.split(","))}
+
+
+def parse_identities(spec: str | None) -> dict[str, str]:
+    if not spec:
+        return {}
+    return {k.strip(): v.strip() for k, v in (p.split("=") for p in spec.split(","))}
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        # 每秒的完成数与错误数，便于定位压测过程中的拐点
+        self.timeline: dict[int, dict[str, int]] = defaultdict(lambda: {"completed": 0, "errors": 0})
+        self.started = time.perf_counter()
+
+    def record(self, name: str, scheduled: float, status: str):
+        now = time.perf_counter()
+        self.latencies[name].append(now - scheduled)
+        self.statuses[name][status] += 1
+        second = int(now - self.started)
+        self.timeline[second]["completed"] += 1
+        if not status.startswith("2"):
+            self.timeline[second]["errors"] += 1
+
+
+class LoadContext:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, identities: dict[str, str], rng: random.Random):
+        self.client = client
+        self.recorder = recorder
+        self.identities = identities
+        self.rng = rng
+        # 本次压测中创建的订单，供厨房 / 司机场景操作
+        self.order_ids: list[str] = []
+
+    def headers(self, role: str) -> dict:
+        token = os.getenv(f"LOADGEN_TOKEN_{role.upper()}")
+        if token:
+            return {"Authorization": f"Bearer {token}"}
+        return {"x-user-id": self.identities[role], "x-user-role": role}
+
+    async def request(self, name: str, role: str, scheduled: float, method: str, url: str, **kwargs):
+        try:
+            response = await self.client.request(method, url, headers=self.headers(role), **kwargs)
+            status = str(response.status_code)
+        except httpx.HTTPError as e:
+            response, status = None, type(e).__name__
+        self.recorder.record(name, scheduled, status)
+        return response
+
+    def pick_order(self) -> str | None:
+        return self.rng.choice(self.order_ids[-200:]) if self.order_ids else None
+
+
+# ── 场景 ──────────────────────────────────────────────────────────────────
+
+async def admin_list_orders(ctx: LoadContext, t0: float):
+    await ctx.request("GET /orders", "admin", t0, "GET", "/orders")
+
+
+async def admin_stats(ctx: LoadContext, t0: float):
+    await ctx.request("GET /super-admin/stats", "admin", t0, "GET", "/super-admin/stats")
+
+
+async def admin_fleet_status(ctx: LoadContext, t0: float):
+    await ctx.request("GET /vehicles/status", "admin", t0, "GET", "/vehicles/status")
+
+
+async def admin_create_and_assign(ctx: LoadContext, t0: float):
+    items = [{"name": "Nasi Lemak", "quantity": ctx.rng.randint(10, 80), "price": 10.5}]
+    payload = {
+        "customerName": "Load Test Customer",
+        "customerPhone": f"01{ctx.rng.randint(10000000, 99999999)}",
+        "address": "Load Test Lane, Cyberjaya",
+        "items": items,
+        "amount": round(items[0]["quantity"] * items[0]["price"], 2),
+        "status": "pending",
+        "dueTime": (datetime.now(timezone.utc) + timedelta(days=1)).isoformat(),
+    }
+    response = await ctx.request("POST /orders", "admin", t0, "POST", "/orders", json=payload)
+    if response is None or response.status_code != 200:
+        return
+    order_id = response.json()["id"]
+    ctx.order_ids.append(order_id)
+    await ctx.request(
+        "POST /orders/{id}/assign", "admin", time.perf_counter(), "POST",
+        f"/orders/{order_id}/assign", json={"driver_id": ctx.identities["driver"]},
+    )
+
+
+async def kitchen_board(ctx: LoadContext, t0: float):
+    await ctx.request("GET /orders?status", "kitchen", t0, "GET", "/orders", params={"status": "preparing"})
+
+
+async def kitchen_items(ctx: LoadContext, t0: float):
+    order_id = ctx.pick_order()
+    if order_id:
+        await ctx.request("GET /orders/items/{id}", "kitchen", t0, "GET", f"/orders/items/{order_id}")
+
+
+async def kitchen_complete(ctx: LoadContext, t0: float):
+    order_id = ctx.pick_order()
+    if order_id:
+        await ctx.request("POST /orders/{id}/kitchen-complete", "kitchen", t0, "POST", f"/orders/{order_id}/kitchen-complete")
+
+
+async def driver_heartbeat(ctx: LoadContext, t0: float):
+    await ctx.request("POST /users/me/heartbeat", "driver", t0, "POST", "/users/me/heartbeat")
+
+
+async def driver_orders(ctx: LoadContext, t0: float):
+    await ctx.request("GET /orders?status", "driver", t0, "GET", "/orders", params={"status": "ready"})
+
+
+async def driver_deliver(ctx: LoadContext, t0: float):
+    order_id = ctx.pick_order()
+    if not order_id:
+        return
+    await ctx.request(
+        "POST /orders/{id}/status", "driver", t0, "POST",
+        f"/orders/{order_id}/status", params={"status": "delivering"},
+    )
+    await ctx.request(
+        "POST /orders/{id}/status", "driver", time.perf_counter(), "POST",
+        f"/orders/{order_id}/status", params={"status": "completed"},
+    )
+
+
+Scenario = Callable[[LoadContext, float], Awaitable[None]]
+
+SCENARIOS: dict[str, list[tuple[Scenario, float]]] = {
+    "admin": [
+        (admin_list_orders, 40),
+        (admin_stats, 15),
+        (admin_fleet_status, 15),
+        (admin_create_and_assign, 30),
+    ],
+    "kitchen": [
+        (kitchen_board, 60),
+        (kitchen_items, 30),
+        (kitchen_complete, 10),
+    ],
+    "driver": [
+        (driver_heartbeat, 60),
+        (driver_orders, 25),
+        (driver_deliver, 15),
+    ],
+}
+
+
+async def run(args) -> dict:
+    stages = parse_profile(args.profile)
+    mix = parse_weights(args.mix)
+    identities = {role: f"loadgen-{role}" for role in SCENARIOS}
+    identities.update(parse_identities(args.identity))
+    rng = random.Random(args.seed)
+
+    roles = list(mix)
+    role_weights = [mix[r] for r in roles]
+    total_duration = sum(d for d, _ in stages)
+    recorder = Recorder()
+    in_flight: set[asyncio.Task] = set()
+    dropped = 0
+
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        ctx = LoadContext(client, recorder, identities, rng)
+        started = time.perf_counter()
+        next_arrival = started
+        print(f"Running {args.profile} for {total_duration:.0f}s against {args.base_url}...")
+
+        while True:
+            elapsed = next_arrival - started
+            if elapsed >= total_duration:
+                break
+            rate = rate_at(stages, elapsed)
+            if rate <= 0:
+                next_arrival += 0.1
+                continue
+
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            if len(in_flight) >= args.max_in_flight:
+                # 客户端自身饱和：记为丢弃而不是阻塞，保持开环语义
+                dropped += 1
+            else:
+                role = rng.choices(roles, weights=role_weights)[0]
+                scenarios = SCENARIOS[role]
+                scenario = rng.choices([s for s, _ in scenarios], weights=[w for _, w in scenarios])[0]
+                task = asyncio.create_task(scenario(ctx, next_arrival))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+
+            # 泊松到达：指数分布的到达间隔
+            next_arrival += rng.expovariate(rate)
+
+        if in_flight:
+            await asyncio.wait(in_flight, timeout=args.timeout)
+        wall = time.perf_counter() - started
+
+    all_latencies = [v for values in recorder.latencies.values() for v in values]
+    return {
+        "config": {
+            "base_url": args.base_url,
+            "profile": args.profile,
+            "stages": stages,
+            "mix": mix,
+            "max_in_flight": args.max_in_flight,
+            "seed": args.seed,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+        },
+        "wall_seconds": round(wall, 2),
+        "dropped_arrivals": dropped,
+        "overall": {**summarize(all_latencies, wall), "spectrum": spectrum(all_latencies)},
+        "requests": {
+            name: {
+                **summarize(values, wall),
+                "spectrum": spectrum(values),
+                "statuses": dict(recorder.statuses[name]),
+            }
+            for name, values in sorted(recorder.latencies.items())
+        },
+        "timeline": [{"second": s, **recorder.timeline[s]} for s in sorted(recorder.timeline)],
+        "_raw": recorder.latencies,
+    }
+
+
+def print_report(result: dict):
+    raw = result.pop("_raw")
+    print()
+    print(format_table({name: r for name, r in result["requests"].items()}))
+    print()
+    print(format_spectrum("ALL REQUESTS", [v for values in raw.values() for v in values]))
+    for name, values in sorted(raw.items()):
+        print()
+        print(format_spectrum(name, values))
+    print()
+    for name, r in result["requests"].items():
+        errors = {s: c for s, c in r["statuses"].items() if not s.startswith("2")}
+        if errors:
+            print(f"Errors for {name}: {errors}")
+    if result["dropped_arrivals"]:
+        print(f"WARNING: {result['dropped_arrivals']} arrivals dropped (client max in-flight reached)")
+
+
+def print_comparison(result: dict, baseline_path: str):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nComparison with {baseline_path}:")
+    print(f"{'request':<36}{'p50 Δ%':>10}{'p95 Δ%':>10}{'p99 Δ%':>10}{'rps Δ%':>10}")
+    for name, current in result["requests"].items():
+        before = baseline.get("requests", {}).get(name)
+        if not before:
+            continue
+
+        def delta(key):
+            return f"{(current[key] - before[key]) / before[key] * 100:+.1f}" if before[key] else "n/a"
+
+        print(f"{name:<36}{delta('p50_ms'):>10}{delta('p95_ms'):>10}{delta('p99_ms'):>10}{delta('throughput_rps'):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop load generator with weighted per-role scenarios")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--profile", default="constant",
+                        help=f"preset ({', '.join(PROFILES)}) or stages like '30s@5,60s@20'")
+    parser.add_argument("--mix", default="admin=1,kitchen=2,driver=5", help="role weights")
+    parser.add_argument("--identity", help="user ids per role, e.g. admin=<uuid>,driver=<uuid>")
+    parser.add_argument("--max-in-flight", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="write the result to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON result to compare against")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print_report(result)
+    if args.compare:
+        print_comparison(result, args.compare)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
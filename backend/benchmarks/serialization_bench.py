@@ -0,0 +1,85 @@
+"""
+响应序列化基准
+比较 List[Order] 在两种响应模式下的耗时（见 services/fast_json.py）：
+- response_model: 路由声明 response_model，由 FastAPI 校验并序列化（当前默认）
+- trusted: 不校验，按模型字段裁剪后 orjson 序列化
+
+每种模式都挂到一个最小的 FastAPI 应用上，经 httpx.ASGITransport 请求，计入框架本身的开销。
+
+用法（在 backend 目录下）:
+    python benchmarks/serialization_bench.py
+    python benchmarks/serialization_bench.py --sizes 200 2000 20000 --repeat 5
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from typing import List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import httpx
+from fastapi import FastAPI
+
+from models import Order
+from services import fast_json
+from benchmarks.endpoint_bench import seed
+
+MODES = ("response_model", "trusted")
+
+
+def build_app(rows: list[dict]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/response_model", response_model=List[Order])
+    async def default_mode():
+        return rows
+
+    @app.get("/trusted", response_model=List[Order])
+    async def trusted_mode():
+        return fast_json.json_response(List[Order], rows, mode="trusted")
+
+    return app
+
+
+async def measure(app: FastAPI, repeat: int) -> dict:
+    timings: dict[str, float] = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for mode in MODES:
+            best = float("inf")
+            for _ in range(repeat):
+                started = time.perf_counter()
+                response = await client.get(f"/{mode}")
+                best = min(best, time.perf_counter() - started)
+                response.raise_for_status()
+            timings[mode] = best
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON response modes for order lists")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 2_000, 20_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"orjson: {'available' if fast_json.orjson is not None else 'missing (trusted mode uses pydantic-core)'}")
+    header = f"{'orders':>8}" + "".join(f"{m + ' ms':>20}" for m in MODES) + f"{'speedup':>10}"
+    print(header)
+    print("-" * len(header))
+
+    for size in args.sizes:
+        rows = seed(size, users=20, vehicles=5, rng=random.Random(args.seed))["orders"]
+        timings = asyncio.run(measure(build_app(rows), args.repeat))
+        speedup = f"{timings['response_model'] / timings['trusted']:.1f}x"
+        print(f"{size:>8}" + "".join(f"{timings[m] * 1000:>20.1f}" for m in MODES) + f"{speedup:>10}")
+
+    print("\nspeedup = response_model time / trusted time")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,83 @@
 import os
 import logging
-from supabase import create_client, Client
+import threading
+from typing import TYPE_CHECKING, Optional
 from dotenv import load_dotenv
+from services.db_calls import InstrumentedQuery
 
-try:
-    from supabase import ClientOptions
-except ImportError:
-    ClientOptions = None
+if TYPE_CHECKING:
+    from supabase import Client
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
-# 获取 Supabase 配置
-url = os.getenv("SUPABASE_URL")
-key = os.getenv("SUPABASE_KEY")
-
-if not url or not key:
-    raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in .env file")
-
-# NOTE: 配置合理的超时，防止慢查询/网络抖动导致事件循环长时间挂起
-if ClientOptions:
-    try:
-        supabase: Client = create_client(
-            url, key,
-            options=ClientOptions(
-                postgrest_client_timeout=30,
-                storage_client_timeout=30,
-            )
-        )
-        logger.info("Supabase client initialized with 30s timeout")
-    except Exception:
-        supabase: Client = create_client(url, key)
-        logger.info("Supabase client initialized (no custom timeout)")
-else:
-    supabase: Client = create_client(url, key)
+_client: Optional["Client"] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> "Client":
+    """
+    首次使用时才导入 supabase 并创建客户端，缩短服务冷启动时间。
+    路由在线程池中并发调用，需加锁保证只创建一次。
+    """
+    global _client
+    if _client is not None:
+        return _client
+
+    with _client_lock:
+        if _client is not None:
+            return _client
+
+        from supabase import create_client
+        try:
+            from supabase import ClientOptions
+        except ImportError:
+            ClientOptions = None
+
+        # 获取 Supabase 配置
+        url = os.getenv("SUPABASE_URL")
+        key = os.getenv("SUPABASE_KEY")
+
+        if not url or not key:
+            raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in .env file")
+
+        # NOTE: 配置合理的超时，防止慢查询/网络抖动导致事件循环长时间挂起
+        if ClientOptions:
+            try:
+                _client = create_client(
+                    url, key,
+                    options=ClientOptions(
+                        postgrest_client_timeout=30,
+                        storage_client_timeout=30,
+                    )
+                )
+                logger.info("Supabase client initialized with 30s timeout")
+            except Exception:
+                _client = create_client(url, key)
+                logger.info("Supabase client initialized (no custom timeout)")
+        else:
+            _client = create_client(url, key)
+        return _client
+
+
+class _LazyClient:
+    """
+    代理对象：保持 `from database import supabase` 的用法不变，首次访问属性时才创建客户端。
+    table / rpc 返回的查询构建器会被包装，用于统计每个请求的数据库调用。
+    """
+
+    def table(self, table_name: str):
+        return InstrumentedQuery(get_client().table(table_name), table_name)
+
+    def from_(self, table_name: str):
+        return self.table(table_name)
+
+    def rpc(self, fn: str, params: Optional[dict] = None, *args, **kwargs):
+        return InstrumentedQuery(get_client().rpc(fn, params or {}, *args, **kwargs), f"rpc:{fn}", "rpc")
+
+    def __getattr__(self, name):
+        return getattr(get_client(), name)
+
+
+supabase: "Client" = _LazyClient()
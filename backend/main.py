@@ -1,20 +1,55 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime
+import asyncio
 import logging
 import re
 from contextlib import asynccontextmanager
 from routers import super_admin, admin_users, recipes, orders, products, users, vehicles, customers, audio, inventory
 from services.goeasy import close_client
+from middleware.metrics import MetricsMiddleware, render_prometheus
+from middleware.db_calls import DBCallMiddleware
+from middleware import single_flight, admission
+from services import stock_alerts, presence
+from services.customer_index import customer_index
+from services.user_directory import user_directory
+from services.readiness import check_readiness
+from fastapi.concurrency import run_in_threadpool
 
 # ── 资源生命周期管理 ──────────────────────────────────────────────────────────
+async def _warm_caches():
+    """预热进程内缓存；放在后台执行，不阻塞启动与就绪检查，未完成前各服务按需回退或首次访问时加载"""
+    try:
+        await run_in_threadpool(customer_index.load)
+    except Exception as e:
+        # 加载失败时 /customers 自动退回数据库查询
+        logger.error(f"Failed to load customer index: {e}")
+    try:
+        await user_directory.ensure_loaded()
+    except Exception as e:
+        # 首次访问时会再次尝试加载
+        logger.error(f"Failed to load user directory: {e}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 启动时逻辑
     logger.info("Initializing Kim Long API services...")
+    stock_alerts.start_scanner()
+    presence.start_sweeper()
+    warm_task = asyncio.create_task(_warm_caches())
     yield
     # 关闭时逻辑
     logger.info("Closing API services connections...")
+    if not warm_task.done():
+        warm_task.cancel()
+        try:
+            await warm_task
+        except asyncio.CancelledError:
+            pass
+    await stock_alerts.stop_scanner()
+    await presence.stop_sweeper()
     await close_client()
 
 # ── 配置日志 ──────────────────────────────────────────────────────────────
@@ -49,6 +84,11 @@ origins = [
 # 允许本地局域网和 127.0.0.1 的所有 3000-3005, 5173-5180 端口
 allow_origin_regex = r"http://(localhost|127\.0\.0\.1|192\.168\.\d+\.\d+):(300\d|51\d\d)"
 
+# 先注册的中间件位于内层：准入控制在请求合并之内，只有真正执行的请求占用并发名额；
+# 两者都在 CORS 之内，CORS 头（含 503 响应）按各请求的 Origin 单独生成
+app.add_middleware(admission.AdmissionMiddleware)
+app.add_middleware(single_flight.SingleFlightMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -56,8 +96,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-DB-Calls", "X-DB-Time", "X-Coalesced", "Retry-After", "X-Next-Cursor"],
 )
 
+app.add_middleware(DBCallMiddleware)
+# 最后注册的中间件位于最外层，延迟统计覆盖 CORS 处理
+app.add_middleware(MetricsMiddleware)
+
 
 # ── 注册路由 ──────────────────────────────────────────────────────────────
 app.include_router(orders.router)
@@ -87,3 +132,21 @@ async def health():
         "timestamp": datetime.utcnow().isoformat() + "Z",
         "version": "1.0.0"
     }
+
+@app.get("/ready")
+async def ready():
+    """
+    就绪探针：并发探测数据库、Storage、GoEasy、Google Calendar，返回各依赖状态与延迟。
+    关键依赖不可用时返回 503，供负载均衡器与 check-services.py 摘除实例。
+    """
+    report, is_ready = await check_readiness()
+    return JSONResponse(report, status_code=200 if is_ready else 503)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus 指标：按路由模板统计的请求数、进行中请求与延迟直方图，被合并的请求数与各准入池状态
+    """
+    body = render_prometheus() + single_flight.render_prometheus() + admission.render_prometheus()
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
@@ -0,0 +1,199 @@
+"""
+准入控制中间件
+按 (角色, 路由类别) 划分独立的并发池：写操作 (write)、普通读取 (read)、统计分析 (analytics)。
+后台大屏连续刷新 super_admin 全表统计时只会占满 admin:analytics 池，
+不会挤占司机 complete_order 等写请求在共享线程池中的名额。
+
+池内并发已满时请求排队；队列也满或排队超时则立即返回 503 + Retry-After，
+而不是让请求在线程池中无限堆积。各池的进行中 / 排队 / 拒绝数由 /metrics 输出。
+
+限额可通过环境变量 ADMISSION_LIMITS 覆盖，格式为 "角色:类别=并发/队列"，逗号分隔，
+角色可写 * 表示全部角色，例如 "*:analytics=2/4,driver:write=32/64"。
+
+角色只按请求头中声称的值选择池（不做远程 Token 校验，见 middleware.auth.claimed_role），
+且只取 UserRole 中的角色，其余一律归入 anonymous，池的数量是固定的。
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Optional
+
+from middleware.auth import claimed_role
+
+logger = logging.getLogger(__name__)
+
+# 路由类别 -> (并发上限, 排队上限)
+DEFAULT_LIMITS = {
+    "write": (16, 32),
+    "read": (16, 64),
+    "analytics": (2, 4),
+}
+
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10"))
+RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER", "2"))
+
+# 探针与文档不受准入控制，过载时也要能回答
+EXEMPT_PATHS = {"/", "/health", "/ready", "/metrics", "/docs", "/redoc", "/openapi.json"}
+
+ANALYTICS_PREFIXES = ("/super-admin", "/inventory/requirements")
+READ_METHODS = {"GET", "HEAD"}
+
+
+def _parse_overrides(spec: str) -> dict[tuple[str, str], tuple[int, int]]:
+    overrides = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        try:
+            pool, limits = part.split("=")
+            role, route_class = pool.split(":")
+            concurrency, queue = limits.split("/")
+            overrides[(role, route_class)] = (int(concurrency), int(queue))
+        except ValueError:
+            logger.error(f"Ignoring malformed ADMISSION_LIMITS entry: {part!r}")
+    return overrides
+
+
+LIMIT_OVERRIDES = _parse_overrides(os.getenv("ADMISSION_LIMITS", ""))
+
+
+def route_class(method: str, path: str) -> str:
+    if method not in READ_METHODS:
+        return "write"
+    if any(path == p or path.startswith(p + "/") for p in ANALYTICS_PREFIXES):
+        return "analytics"
+    return "read"
+
+
+class Pool:
+    def __init__(self, concurrency: int, max_queue: int):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.active = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected: dict[str, int] = {"queue_full": 0, "timeout": 0}
+        self.wait_seconds = 0.0
+        self._slots = asyncio.Semaphore(concurrency)
+
+    async def acquire(self) -> Optional[str]:
+        """占用一个名额；被拒绝时返回原因"""
+        if self._slots.locked():
+            if self.queued >= self.max_queue:
+                self.rejected["queue_full"] += 1
+                return "queue_full"
+            self.queued += 1
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=QUEUE_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                self.rejected["timeout"] += 1
+                return "timeout"
+            finally:
+                self.queued -= 1
+                self.wait_seconds += time.perf_counter() - started
+        else:
+            await self._slots.acquire()
+        self.active += 1
+        self.admitted += 1
+        return None
+
+    def release(self):
+        self.active -= 1
+        self._slots.release()
+
+
+# (role, route_class) -> Pool，首次出现时按限额创建
+_pools: dict[tuple[str, str], Pool] = {}
+
+
+def _get_pool(role: str, cls: str) -> Pool:
+    key = (role, cls)
+    pool = _pools.get(key)
+    if pool is None:
+        limits = LIMIT_OVERRIDES.get(key) or LIMIT_OVERRIDES.get(("*", cls)) or DEFAULT_LIMITS[cls]
+        pool = _pools[key] = Pool(*limits)
+    return pool
+
+
+async def _reject(send, pool_name: str, reason: str):
+    body = json.dumps({"detail": f"Server busy ({pool_name}: {reason}), please retry shortly"}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(RETRY_AFTER_SECONDS).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        # 不在此校验凭证：无效凭证由处理函数返回 401，校验本身也计入池内并发
+        role = claimed_role(scope)
+        cls = route_class(scope["method"], scope["path"])
+        pool = _get_pool(role, cls)
+
+        reason = await pool.acquire()
+        if reason is not None:
+            logger.warning(f"Admission rejected {scope['method']} {scope['path']} in {role}:{cls} ({reason})")
+            await _reject(send, f"{role}:{cls}", reason)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            pool.release()
+
+
+def render_prometheus() -> str:
+    def labels(role, cls, **extra):
+        pairs = {"role": role, "class": cls, **extra}
+        escaped = {k: str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for k, v in pairs.items()}
+        return "{" + ",".join(f'{k}="{v}"' for k, v in escaped.items()) + "}"
+
+    pools = sorted(_pools.items())
+    lines = [
+        "# HELP admission_pool_active Requests currently holding a slot in each admission pool.",
+        "# TYPE admission_pool_active gauge",
+    ]
+    lines += [f"admission_pool_active{labels(*key)} {p.active}" for key, p in pools]
+    lines += [
+        "# HELP admission_pool_queued Requests waiting for a slot in each admission pool.",
+        "# TYPE admission_pool_queued gauge",
+    ]
+    lines += [f"admission_pool_queued{labels(*key)} {p.queued}" for key, p in pools]
+    lines += [
+        "# HELP admission_pool_limit Configured concurrency and queue limits per pool.",
+        "# TYPE admission_pool_limit gauge",
+    ]
+    for key, p in pools:
+        lines.append(f"admission_pool_limit{labels(*key, kind='concurrency')} {p.concurrency}")
+        lines.append(f"admission_pool_limit{labels(*key, kind='queue')} {p.max_queue}")
+    lines += [
+        "# HELP admission_admitted_total Requests admitted per pool.",
+        "# TYPE admission_admitted_total counter",
+    ]
+    lines += [f"admission_admitted_total{labels(*key)} {p.admitted}" for key, p in pools]
+    lines += [
+        "# HELP admission_rejected_total Requests rejected with 503 per pool and reason.",
+        "# TYPE admission_rejected_total counter",
+    ]
+    for key, p in pools:
+        for reason, count in sorted(p.rejected.items()):
+            lines.append(f"admission_rejected_total{labels(*key, reason=reason)} {count}")
+    lines += [
+        "# HELP admission_queue_wait_seconds_total Total time requests spent queued per pool.",
+        "# TYPE admission_queue_wait_seconds_total counter",
+    ]
+    lines += [f"admission_queue_wait_seconds_total{labels(*key)} {p.wait_seconds:.6f}" for key, p in pools]
+    return "\n".join(lines) + "\n"
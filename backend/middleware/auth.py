@@ -3,12 +3,15 @@
 通过 Supabase JWT 验证用户身份，并提供基于角色的访问控制
 """
 import os
+import json
+import base64
 import logging
 from typing import Optional
 
 from fastapi import Depends, HTTPException, Header
 from database import supabase
 from models import UserRole
+from services.user_directory import user_directory
 
 logger = logging.getLogger(__name__)
 
@@ -49,11 +52,9 @@ async def get_current_user(
             
             # 可选：尝试从数据库同步/验证，但不应因为 DB 缺失而导致 401/403 (对于刚创建的 Admin)
             try:
-                db_response = await run_in_threadpool(
-                    supabase.table("users").select("role").eq("id", user_id).single().execute
-                )
-                if db_response.data and db_response.data.get("role"):
-                    role = db_response.data.get("role")
+                db_user = await user_directory.get(user_id)
+                if db_user and db_user.get("role"):
+                    role = db_user["role"]
                 else:
                     logger.warning("No role found in DB for user %s, using metadata role: %s", user_id, role)
             except Exception as e:
@@ -72,12 +73,64 @@ async def get_current_user(
     )
 
 
+_KNOWN_ROLES = {role.value for role in UserRole}
+
+
+def _unverified_jwt_claims(token: str) -> dict:
+    """只解码 JWT 载荷、不校验签名；结果不能用于鉴权"""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+        return claims if isinstance(claims, dict) else {}
+    except (IndexError, ValueError):
+        return {}
+
+
+def claimed_role(scope) -> str:
+    """
+    不做远程校验，直接从请求头读出调用者声称的角色，供准入控制选择并发池。
+    JWT 只解码 user_metadata.role，不调用 auth.get_user；真正的身份校验仍由路由依赖完成，
+    伪造角色只会让请求进入另一个同样有限额的池。未知角色与未携带凭证一律归为 "anonymous"。
+    """
+    headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope.get("headers", [])}
+    authorization = headers.get("authorization") or ""
+    if headers.get("x-user-id") and headers.get("x-user-role"):
+        role = headers["x-user-role"]
+    elif authorization.startswith("Bearer "):
+        claims = _unverified_jwt_claims(authorization[len("Bearer "):])
+        metadata = claims.get("user_metadata")
+        role = metadata.get("role") if isinstance(metadata, dict) else None
+    else:
+        role = None
+    return role if role in _KNOWN_ROLES else "anonymous"
+
+
+async def _revalidate_role(current_user: dict, allowed: set[str]) -> dict:
+    """
+    辅助函数：目录中的角色最长 REFRESH_INTERVAL_SECONDS 才刷新一次，其他 worker 上的降级
+    不会立即同步到这里。通过目录判断有权限时，再按主键从数据库读取一次当前角色确认。
+    users 表中没有该用户时保留原角色（与 get_current_user 回退到 metadata 角色一致）。
+    """
+    if current_user.get("role") not in allowed:
+        return current_user
+    try:
+        role = await user_directory.fetch_role(current_user.get("id"))
+    except Exception as e:
+        logger.error("Role revalidation failed for user %s: %s", current_user.get("id"), str(e))
+        raise HTTPException(status_code=503, detail="Unable to verify permissions, please retry")
+    if role and role != current_user.get("role"):
+        return {**current_user, "role": role}
+    return current_user
+
+
 async def require_admin(
     current_user: dict = Depends(get_current_user),
 ) -> dict:
     """
     权限守卫：允许 admin 或 super_admin 访问。（适用于常规后台操作）
     """
+    current_user = await _revalidate_role(current_user, {UserRole.ADMIN.value, UserRole.SUPER_ADMIN.value})
     if current_user.get("role") not in [UserRole.ADMIN.value, UserRole.SUPER_ADMIN.value]:
         logger.warning(
             "Unauthorized admin access attempt by user %s (role: %s)",
@@ -98,6 +151,7 @@ async def require_super_admin(
     权限守卫：仅允许 super_admin 角色访问。（适用于最高层级敏感提权控制）
     作为 FastAPI 路由的依赖项注入使用。
     """
+    current_user = await _revalidate_role(current_user, {UserRole.SUPER_ADMIN.value})
     if current_user.get("role") != UserRole.SUPER_ADMIN.value:
         logger.warning(
             "Unauthorized super_admin access attempt by user %s (role: %s)",
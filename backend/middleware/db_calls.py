@@ -0,0 +1,44 @@
+"""
+数据库调用统计中间件
+为每个请求建立独立的统计上下文，在响应头中返回 X-DB-Calls / X-DB-Time，
+单个请求的调用次数超过 DB_CALL_WARN_THRESHOLD 时记录警告，便于发现 N+1 查询。
+"""
+import os
+import logging
+
+from services.db_calls import begin_request, end_request
+
+logger = logging.getLogger(__name__)
+
+DB_CALL_WARN_THRESHOLD = int(os.getenv("DB_CALL_WARN_THRESHOLD", "10"))
+
+
+class DBCallMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats, token = begin_request()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-calls", str(stats.calls).encode()))
+                headers.append((b"x-db-time", f"{stats.total_seconds * 1000:.1f}ms".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            end_request(token)
+            if stats.calls > DB_CALL_WARN_THRESHOLD:
+                route = getattr(scope.get("route"), "path", scope.get("path"))
+                logger.warning(
+                    f"{scope['method']} {route} made {stats.calls} DB calls "
+                    f"({stats.total_seconds * 1000:.1f}ms): {stats.summary()}"
+                )
@@ -0,0 +1,107 @@
+"""
+请求指标中间件
+纯 ASGI 中间件，按 路由模板 / 方法 / 状态码 统计请求数与延迟直方图，并记录进行中的请求数，
+由 /metrics 以 Prometheus 文本格式输出。使用路由模板（如 /orders/{order_id:path}）
+而不是原始路径作为标签，避免订单号等路径参数导致标签基数膨胀。
+"""
+import time
+from bisect import bisect_left
+
+# 延迟直方图桶上限（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+UNMATCHED_ROUTE = "__unmatched__"
+
+# (method, route, status) -> [各桶计数..., +Inf 计数]
+_histograms: dict[tuple[str, str, str], list[int]] = {}
+# (method, route, status) -> 延迟总和（秒）
+_latency_sums: dict[tuple[str, str, str], float] = {}
+# method -> 进行中的请求数
+_in_flight: dict[str, int] = {}
+
+
+def _route_template(scope) -> str:
+    # FastAPI 的 APIRoute 匹配后会把自身写入 scope["route"]
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+def _observe(method: str, route: str, status: int, elapsed: float):
+    key = (method, route, str(status))
+    buckets = _histograms.get(key)
+    if buckets is None:
+        buckets = _histograms[key] = [0] * (len(LATENCY_BUCKETS) + 1)
+        _latency_sums[key] = 0.0
+    buckets[bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+    _latency_sums[key] += elapsed
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        started = time.perf_counter()
+        _in_flight[method] = _in_flight.get(method, 0) + 1
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _in_flight[method] -= 1
+            _observe(method, _route_template(scope), status_code, time.perf_counter() - started)
+
+
+def _labels(**labels) -> str:
+    parts = []
+    for name, value in labels.items():
+        escaped = str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        parts.append(f'{name}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def render_prometheus() -> str:
+    """以 Prometheus text exposition format 输出全部指标"""
+    lines = [
+        "# HELP http_requests_in_flight Requests currently being processed.",
+        "# TYPE http_requests_in_flight gauge",
+    ]
+    for method, count in sorted(_in_flight.items()):
+        lines.append(f"http_requests_in_flight{_labels(method=method)} {count}")
+
+    lines += [
+        "# HELP http_requests_total Total HTTP requests by route template, method and status.",
+        "# TYPE http_requests_total counter",
+    ]
+    for (method, route, status), buckets in sorted(_histograms.items()):
+        lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {sum(buckets)}")
+
+    lines += [
+        "# HELP http_request_duration_seconds Request latency by route template, method and status.",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    for (method, route, status), buckets in sorted(_histograms.items()):
+        cumulative = 0
+        for upper, count in zip(LATENCY_BUCKETS, buckets):
+            cumulative += count
+            labels = _labels(method=method, route=route, status=status, le=upper)
+            lines.append(f"http_request_duration_seconds_bucket{labels} {cumulative}")
+        cumulative += buckets[-1]
+        labels = _labels(method=method, route=route, status=status, le="+Inf")
+        lines.append(f"http_request_duration_seconds_bucket{labels} {cumulative}")
+        base = _labels(method=method, route=route, status=status)
+        lines.append(f"http_request_duration_seconds_sum{base} {_latency_sums[(method, route, status)]:.6f}")
+        lines.append(f"http_request_duration_seconds_count{base} {cumulative}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,154 @@
+"""
+请求合并 (single-flight) 中间件
+GoEasy 推送 order_update 后，厨房平板、司机手机和后台会在同一时刻用相同参数重新拉取列表。
+对白名单内的只读 GET 接口，相同 (路径, 规范化查询参数, 凭证) 的并发请求只执行一次处理函数，
+其余请求等待并复用同一份已序列化的响应。只合并进行中的请求，完成后不缓存结果。
+中间件不校验 Token（不调用 auth.get_user）：键中只放凭证请求头的摘要，凭证完全相同的请求才会共享响应，
+身份校验仍由领头请求的路由依赖完成，伪造的凭证拿不到其他调用者的响应。
+带条件请求头 (If-None-Match 等) 的请求响应取决于请求头本身（可能是 304），不参与合并。
+
+必须注册在 CORSMiddleware 之内（先于它注册），CORS 响应头按各自的 Origin 单独生成。
+"""
+import asyncio
+import hashlib
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode
+
+# 可合并的路径前缀：响应只取决于路径、查询参数和调用者身份
+COALESCED_PREFIXES = (
+    "/orders",
+    "/vehicles/status",
+    "/super-admin/stats",
+    "/super-admin/financials",
+    "/super-admin/ai-summary",
+    "/products",
+    "/recipes",
+    "/inventory/items",
+)
+
+# 决定调用者身份的请求头，原样参与合并键
+CREDENTIAL_HEADERS = (b"authorization", b"x-user-id", b"x-user-role")
+
+# 响应取决于这些请求头的请求不合并
+CONDITIONAL_HEADERS = {b"if-none-match", b"if-modified-since"}
+
+# key -> 领头请求的结果 future: (status, headers, body, route)
+_in_flight: dict[tuple, asyncio.Future] = {}
+# 路径前缀 -> 被合并（未执行处理函数）的请求数
+_coalesced: dict[str, int] = {}
+
+
+def _matched_prefix(path: str) -> Optional[str]:
+    for prefix in COALESCED_PREFIXES:
+        if path == prefix or path.startswith(prefix + "/"):
+            return prefix
+    return None
+
+
+def _normalized_query(scope) -> str:
+    pairs = parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)
+    return urlencode(sorted(pairs))
+
+
+def _credential_digest(scope) -> str:
+    """凭证请求头的摘要；未携带凭证的请求彼此相同"""
+    headers = dict(scope.get("headers", []))
+    digest = hashlib.sha256()
+    for name in CREDENTIAL_HEADERS:
+        digest.update(headers.get(name, b""))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+async def _replay(result, send):
+    status, headers, body, _ = result
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": headers + [(b"x-coalesced", b"1")],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class SingleFlightMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+        prefix = _matched_prefix(scope["path"])
+        if prefix is None or any(name in CONDITIONAL_HEADERS for name, _ in scope["headers"]):
+            await self.app(scope, receive, send)
+            return
+
+        key = (scope["path"], _normalized_query(scope), _credential_digest(scope))
+        leader = _in_flight.get(key)
+        if leader is not None:
+            _coalesced[prefix] = _coalesced.get(prefix, 0) + 1
+            try:
+                # shield: 跟随者断开连接不能取消领头请求的结果
+                result = await asyncio.shield(leader)
+            except asyncio.CancelledError:
+                if not leader.cancelled():
+                    raise
+                # 领头请求被取消（客户端断开），自行处理
+                await self.app(scope, receive, send)
+                return
+            # 兜底：304 只对发送了条件请求头的请求有意义，绝不复用给其他请求
+            if result[0] == 304:
+                await self.app(scope, receive, send)
+                return
+            # 供外层 MetricsMiddleware 按路由模板记录
+            if result[3] is not None:
+                scope["route"] = result[3]
+            await _replay(result, send)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        _in_flight[key] = future
+        try:
+            await self._lead(scope, receive, send, future)
+        finally:
+            _in_flight.pop(key, None)
+            if not future.done():
+                future.cancel()
+
+    async def _lead(self, scope, receive, send, future: asyncio.Future):
+        status = 500
+        headers: list = []
+        chunks: list[bytes] = []
+
+        async def send_wrapper(message):
+            nonlocal status, headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+                # 没有跟随者时避免 "exception was never retrieved" 警告
+                future.exception()
+            raise
+        if not future.done():
+            future.set_result((status, headers, b"".join(chunks), scope.get("route")))
+
+
+def render_prometheus() -> str:
+    lines = [
+        "# HELP http_requests_coalesced_total GET requests served from a concurrent identical request.",
+        "# TYPE http_requests_coalesced_total counter",
+    ]
+    for prefix, count in sorted(_coalesced.items()):
+        lines.append(f'http_requests_coalesced_total{{prefix="{prefix}"}} {count}')
+    return "\n".join(lines) + "\n"
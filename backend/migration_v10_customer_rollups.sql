@@ -0,0 +1,93 @@
+-- Customer Profiles & Rollups Migration (v10)
+-- Run this in the Supabase SQL Editor
+-- 订单通过 customer_id 关联客户；客户表上的汇总字段由触发器按增量维护，
+-- 查看客户概况时无需再扫描 orders。
+
+-- 1. 客户：规范化电话 + 汇总字段
+ALTER TABLE public.customers
+ADD COLUMN IF NOT EXISTS phone_normalized TEXT,
+ADD COLUMN IF NOT EXISTS order_count INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN IF NOT EXISTS lifetime_value NUMERIC NOT NULL DEFAULT 0,
+ADD COLUMN IF NOT EXISTS outstanding_balance NUMERIC NOT NULL DEFAULT 0,
+ADD COLUMN IF NOT EXISTS last_order_at TIMESTAMP WITH TIME ZONE;
+
+-- 规范化规则与 services/customer_index.canonical_phone 保持一致：仅保留数字，60 开头转为 0 开头；
+-- 没有数字的号码记为 NULL
+UPDATE public.customers
+SET phone_normalized = NULLIF(CASE
+    WHEN regexp_replace(phone, '\D', '', 'g') LIKE '60%'
+        THEN '0' || substr(regexp_replace(phone, '\D', '', 'g'), 3)
+    ELSE regexp_replace(phone, '\D', '', 'g')
+END, '')
+WHERE phone_normalized IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_customers_phone_normalized ON public.customers (phone_normalized);
+
+-- 2. 订单：customer_id 外键
+ALTER TABLE public.orders
+ADD COLUMN IF NOT EXISTS customer_id UUID REFERENCES public.customers(id) ON DELETE SET NULL;
+
+CREATE INDEX IF NOT EXISTS idx_orders_customer_created ON public.orders (customer_id, created_at DESC);
+
+-- 3. 回填历史订单的 customer_id（按规范化电话匹配）
+UPDATE public.orders o
+SET customer_id = c.id
+FROM public.customers c
+WHERE o.customer_id IS NULL
+  AND c.phone_normalized = NULLIF(CASE
+    WHEN regexp_replace(o."customerPhone", '\D', '', 'g') LIKE '60%'
+        THEN '0' || substr(regexp_replace(o."customerPhone", '\D', '', 'g'), 3)
+    ELSE regexp_replace(o."customerPhone", '\D', '', 'g')
+  END, '');
+
+-- 4. 增量维护汇总：先减去旧行的贡献，再加上新行的贡献（已取消订单不计入）
+CREATE OR REPLACE FUNCTION public.maintain_customer_rollups()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.customer_id IS NOT NULL
+       AND OLD.status IS DISTINCT FROM 'cancelled' THEN
+        UPDATE public.customers
+        SET order_count = order_count - 1,
+            lifetime_value = lifetime_value - COALESCE(OLD.amount, 0),
+            outstanding_balance = outstanding_balance - GREATEST(COALESCE(OLD.balance, 0), 0)
+        WHERE id = OLD.customer_id;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.customer_id IS NOT NULL
+       AND NEW.status IS DISTINCT FROM 'cancelled' THEN
+        UPDATE public.customers
+        SET order_count = order_count + 1,
+            lifetime_value = lifetime_value + COALESCE(NEW.amount, 0),
+            outstanding_balance = outstanding_balance + GREATEST(COALESCE(NEW.balance, 0), 0),
+            last_order_at = GREATEST(COALESCE(last_order_at, NEW.created_at), NEW.created_at)
+        WHERE id = NEW.customer_id;
+    END IF;
+
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_orders_customer_rollups ON public.orders;
+CREATE TRIGGER trg_orders_customer_rollups
+AFTER INSERT OR DELETE OR UPDATE OF customer_id, amount, balance, status ON public.orders
+FOR EACH ROW EXECUTE FUNCTION public.maintain_customer_rollups();
+
+-- 5. 一次性全量回填汇总
+UPDATE public.customers c
+SET order_count = COALESCE(agg.order_count, 0),
+    lifetime_value = COALESCE(agg.lifetime_value, 0),
+    outstanding_balance = COALESCE(agg.outstanding_balance, 0),
+    last_order_at = agg.last_order_at
+FROM (
+    SELECT customer_id,
+           COUNT(*) AS order_count,
+           SUM(COALESCE(amount, 0)) AS lifetime_value,
+           SUM(GREATEST(COALESCE(balance, 0), 0)) AS outstanding_balance,
+           MAX(created_at) AS last_order_at
+    FROM public.orders
+    WHERE customer_id IS NOT NULL AND status IS DISTINCT FROM 'cancelled'
+    GROUP BY customer_id
+) agg
+WHERE agg.customer_id = c.id;
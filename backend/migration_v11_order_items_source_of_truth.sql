@@ -0,0 +1,266 @@
+-- Order Items Source of Truth Migration (v11)
+-- Run this in the Supabase SQL Editor
+-- order_items 成为订单明细的唯一数据源；orders.items 改为由触发器维护的只读投影，
+-- 应用只通过 replace_order_items RPC 写入一次，不再双写。
+-- 整个脚本在一个事务内执行：第 6 步校验失败会回滚全部改动。
+
+BEGIN;
+
+-- 1. 补齐 order_items 字段；position 记录明细在订单中的顺序
+ALTER TABLE public.order_items
+ADD COLUMN IF NOT EXISTS product_id TEXT,
+ADD COLUMN IF NOT EXISTS price NUMERIC DEFAULT 0,
+ADD COLUMN IF NOT EXISTS is_prepared BOOLEAN DEFAULT FALSE,
+ADD COLUMN IF NOT EXISTS position INTEGER;
+
+-- 早期建表脚本没有外键，先清理孤儿行再补上级联外键
+DELETE FROM public.order_items i
+WHERE NOT EXISTS (SELECT 1 FROM public.orders o WHERE o.id = i.order_id);
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint
+        WHERE conrelid = 'public.order_items'::regclass AND contype = 'f'
+    ) THEN
+        ALTER TABLE public.order_items
+        ADD CONSTRAINT order_items_order_id_fkey
+        FOREIGN KEY (order_id) REFERENCES public.orders(id) ON DELETE CASCADE;
+    END IF;
+END;
+$$;
+
+CREATE INDEX IF NOT EXISTS idx_order_items_order_position ON public.order_items (order_id, position);
+
+-- 2. 迁移前快照：把 orders.items（迄今为止前端实际编辑的数据）展开成行
+CREATE TEMP TABLE order_items_json ON COMMIT DROP AS
+SELECT
+    o.id AS order_id,
+    (e.ordinality - 1)::INTEGER AS position,
+    e.value->>'id' AS product_id,
+    COALESCE(e.value->>'name', 'Unnamed Item') AS name,
+    COALESCE((e.value->>'quantity')::NUMERIC::INTEGER, 1) AS quantity,
+    e.value->>'note' AS note,
+    COALESCE((e.value->>'price')::NUMERIC, 0) AS price
+FROM public.orders o
+CROSS JOIN LATERAL jsonb_array_elements(
+    CASE WHEN jsonb_typeof(o.items::JSONB) = 'array' THEN o.items::JSONB ELSE '[]'::JSONB END
+) WITH ORDINALITY AS e(value, ordinality);
+
+-- 3. 找出 order_items 与 JSON 不一致的订单（同步失败或 sync_order_items.py 未覆盖的情况）
+CREATE TEMP TABLE drifted_orders ON COMMIT DROP AS
+SELECT DISTINCT COALESCE(j.order_id, t.order_id) AS order_id
+FROM (
+    SELECT order_id, name, quantity, count(*) AS n FROM order_items_json GROUP BY 1, 2, 3
+) j
+FULL OUTER JOIN (
+    SELECT order_id, name, quantity, count(*) AS n FROM public.order_items GROUP BY 1, 2, 3
+) t USING (order_id, name, quantity)
+WHERE j.n IS DISTINCT FROM t.n;
+
+-- 4a. 不一致的订单按 JSON 重建明细，按菜名保留厨房已勾选的状态
+CREATE TEMP TABLE prepared_names ON COMMIT DROP AS
+SELECT DISTINCT order_id, name
+FROM public.order_items
+WHERE is_prepared AND order_id IN (SELECT order_id FROM drifted_orders);
+
+DELETE FROM public.order_items WHERE order_id IN (SELECT order_id FROM drifted_orders);
+
+INSERT INTO public.order_items (order_id, position, product_id, name, quantity, note, price, is_prepared, status)
+SELECT
+    j.order_id, j.position, j.product_id, j.name, j.quantity, j.note, j.price,
+    p.name IS NOT NULL,
+    CASE WHEN p.name IS NOT NULL THEN 'ready' ELSE 'pending' END
+FROM order_items_json j
+JOIN drifted_orders d USING (order_id)
+LEFT JOIN prepared_names p USING (order_id, name);
+
+-- 4b. 一致的订单只回填顺序与价格等字段（同名同量的多行按创建顺序一一对应）
+UPDATE public.order_items t
+SET position = j.position,
+    product_id = COALESCE(t.product_id, j.product_id),
+    note = j.note,
+    price = j.price
+FROM (
+    SELECT *, row_number() OVER (PARTITION BY order_id, name, quantity ORDER BY position) AS rn
+    FROM order_items_json
+) j,
+(
+    SELECT id, order_id, name, quantity,
+           row_number() OVER (PARTITION BY order_id, name, quantity ORDER BY created_at, id) AS rn
+    FROM public.order_items
+) r
+WHERE t.id = r.id
+  AND t.position IS NULL
+  AND r.order_id = j.order_id AND r.name = j.name AND r.quantity = j.quantity AND r.rn = j.rn;
+
+-- 5. 投影：orders.items 由 order_items 生成，字段与 models.OrderItem 一致
+CREATE OR REPLACE FUNCTION public.order_items_projection(p_order_id TEXT)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT COALESCE(
+        jsonb_agg(
+            jsonb_build_object(
+                'id', product_id, 'name', name, 'quantity', quantity, 'note', note, 'price', price
+            ) ORDER BY position, created_at, id
+        ),
+        '[]'::JSONB
+    )
+    FROM public.order_items
+    WHERE order_id = p_order_id;
+$$;
+
+-- 语句级触发器：一次批量写入只刷新一次受影响订单；只改 is_prepared / status 时不改动 orders
+CREATE OR REPLACE FUNCTION public.refresh_order_items_projection()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM set_config('app.order_items_projection', 'on', true);
+
+    IF TG_OP = 'INSERT' THEN
+        UPDATE public.orders o
+        SET items = public.order_items_projection(o.id)
+        WHERE o.id IN (SELECT order_id FROM new_rows);
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE public.orders o
+        SET items = public.order_items_projection(o.id)
+        WHERE o.id IN (SELECT order_id FROM old_rows);
+    ELSE
+        UPDATE public.orders o
+        SET items = public.order_items_projection(o.id)
+        WHERE o.id IN (
+            SELECT order_id FROM (
+                (SELECT id, order_id, product_id, name, quantity, note, price, position FROM new_rows
+                 EXCEPT
+                 SELECT id, order_id, product_id, name, quantity, note, price, position FROM old_rows)
+                UNION ALL
+                (SELECT id, order_id, product_id, name, quantity, note, price, position FROM old_rows
+                 EXCEPT
+                 SELECT id, order_id, product_id, name, quantity, note, price, position FROM new_rows)
+            ) changed
+        );
+    END IF;
+
+    PERFORM set_config('app.order_items_projection', 'off', true);
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_order_items_projection_insert ON public.order_items;
+CREATE TRIGGER trg_order_items_projection_insert
+AFTER INSERT ON public.order_items
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION public.refresh_order_items_projection();
+
+DROP TRIGGER IF EXISTS trg_order_items_projection_update ON public.order_items;
+CREATE TRIGGER trg_order_items_projection_update
+AFTER UPDATE ON public.order_items
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION public.refresh_order_items_projection();
+
+DROP TRIGGER IF EXISTS trg_order_items_projection_delete ON public.order_items;
+CREATE TRIGGER trg_order_items_projection_delete
+AFTER DELETE ON public.order_items
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION public.refresh_order_items_projection();
+
+-- 一次性重建全部投影
+SELECT set_config('app.order_items_projection', 'on', true);
+UPDATE public.orders o SET items = public.order_items_projection(o.id);
+SELECT set_config('app.order_items_projection', 'off', true);
+
+-- 6. 校验：每张订单的投影必须与迁移前的 JSON 明细（顺序、菜名、数量、单价）完全一致
+DO $$
+DECLARE
+    v_mismatched INTEGER;
+    v_unordered INTEGER;
+BEGIN
+    SELECT count(*) INTO v_mismatched
+    FROM (
+        SELECT order_id,
+               jsonb_agg(jsonb_build_array(name, quantity, price) ORDER BY position) AS items
+        FROM order_items_json
+        GROUP BY order_id
+    ) j
+    FULL OUTER JOIN (
+        SELECT o.id AS order_id,
+               (SELECT jsonb_agg(
+                           jsonb_build_array(e->>'name', (e->>'quantity')::INTEGER, (e->>'price')::NUMERIC)
+                           ORDER BY ord)
+                FROM jsonb_array_elements(o.items::JSONB) WITH ORDINALITY AS x(e, ord)) AS items
+        FROM public.orders o
+    ) p USING (order_id)
+    WHERE j.items IS DISTINCT FROM p.items;
+
+    SELECT count(*) INTO v_unordered FROM public.order_items WHERE position IS NULL;
+
+    IF v_mismatched > 0 OR v_unordered > 0 THEN
+        RAISE EXCEPTION 'order_items migration verification failed: % orders differ, % items without position',
+            v_mismatched, v_unordered;
+    END IF;
+    RAISE NOTICE 'order_items migration verified';
+END;
+$$;
+
+-- 7. 守卫：orders.items 只能由投影触发器写入，防止旧代码绕过 order_items 直接修改
+CREATE OR REPLACE FUNCTION public.guard_order_items_projection()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF current_setting('app.order_items_projection', true) IS DISTINCT FROM 'on' THEN
+        IF TG_OP = 'INSERT' THEN
+            IF NEW.items IS NOT NULL AND NEW.items::JSONB <> '[]'::JSONB THEN
+                RAISE EXCEPTION 'orders.items is derived from order_items; write items via replace_order_items()';
+            END IF;
+            NEW.items := '[]'::JSONB;
+        ELSIF NEW.items IS DISTINCT FROM OLD.items THEN
+            RAISE EXCEPTION 'orders.items is derived from order_items; write items via replace_order_items()';
+        END IF;
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_orders_items_guard ON public.orders;
+CREATE TRIGGER trg_orders_items_guard
+BEFORE INSERT OR UPDATE OF items ON public.orders
+FOR EACH ROW EXECUTE FUNCTION public.guard_order_items_projection();
+
+-- 8. 写入 RPC：在一个事务内整体替换订单明细，返回新的投影
+CREATE OR REPLACE FUNCTION public.replace_order_items(p_order_id TEXT, p_items JSONB)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    PERFORM 1 FROM public.orders WHERE id = p_order_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'ORDER_NOT_FOUND';
+    END IF;
+
+    DELETE FROM public.order_items WHERE order_id = p_order_id;
+
+    INSERT INTO public.order_items (order_id, position, product_id, name, quantity, note, price, is_prepared, status)
+    SELECT
+        p_order_id,
+        (x.ord - 1)::INTEGER,
+        x.e->>'id',
+        COALESCE(x.e->>'name', 'Unnamed Item'),
+        COALESCE((x.e->>'quantity')::NUMERIC::INTEGER, 1),
+        x.e->>'note',
+        COALESCE((x.e->>'price')::NUMERIC, 0),
+        COALESCE((x.e->>'is_prepared')::BOOLEAN, FALSE),
+        COALESCE(x.e->>'status', 'pending')
+    FROM jsonb_array_elements(COALESCE(p_items, '[]'::JSONB)) WITH ORDINALITY AS x(e, ord);
+
+    RETURN public.order_items_projection(p_order_id);
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.replace_order_items(TEXT, JSONB) TO service_role, authenticated;
+
+COMMIT;
@@ -0,0 +1,108 @@
+-- Customer Phone Uniqueness Migration (v12)
+-- Run this in the Supabase SQL Editor
+-- phone_normalized 改为唯一索引，下单时可以按规范化电话 upsert 客户，
+-- 并发下单不会再为同一号码创建多个客户；同时修正 last_order_at 在订单修改 / 删除后不回退的问题。
+
+BEGIN;
+
+-- 0. 早期回填把没有数字的号码写成了空串，统一改为 NULL（无号码的客户互不相同，不能合并）
+UPDATE public.customers
+SET phone_normalized = NULL
+WHERE phone_normalized = '';
+
+-- 1. 合并重复客户：同一规范化电话保留最早创建的一条，订单改挂到保留的客户上
+CREATE TEMP TABLE duplicate_customers ON COMMIT DROP AS
+SELECT id, keep_id
+FROM (
+    SELECT id,
+           first_value(id) OVER (PARTITION BY phone_normalized ORDER BY created_at, id) AS keep_id
+    FROM public.customers
+    WHERE phone_normalized IS NOT NULL AND phone_normalized <> ''
+) ranked
+WHERE id <> keep_id;
+
+UPDATE public.orders o
+SET customer_id = d.keep_id
+FROM duplicate_customers d
+WHERE o.customer_id = d.id;
+
+DELETE FROM public.customers c
+USING duplicate_customers d
+WHERE c.id = d.id;
+
+-- 2. 普通索引换成唯一索引：只约束非空号码。
+--    空串由 CHECK 约束排除、NULL 本身互不冲突，因此索引不带 WHERE 条件也只作用于非空号码；
+--    保持为完整索引，下单时 upsert(on_conflict="phone_normalized") 才能匹配到它
+--    （ON CONFLICT (phone_normalized) 无法推断带谓词的部分索引）
+ALTER TABLE public.customers DROP CONSTRAINT IF EXISTS customers_phone_normalized_not_empty;
+ALTER TABLE public.customers
+ADD CONSTRAINT customers_phone_normalized_not_empty CHECK (phone_normalized IS NULL OR phone_normalized <> '');
+
+DROP INDEX IF EXISTS public.idx_customers_phone_normalized;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_customers_phone_normalized_unique ON public.customers (phone_normalized);
+
+-- 3. 汇总触发器：订单被修改 / 删除后，按剩余订单重新计算原客户的 last_order_at
+CREATE OR REPLACE FUNCTION public.maintain_customer_rollups()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.customer_id IS NOT NULL
+       AND OLD.status IS DISTINCT FROM 'cancelled' THEN
+        UPDATE public.customers
+        SET order_count = order_count - 1,
+            lifetime_value = lifetime_value - COALESCE(OLD.amount, 0),
+            outstanding_balance = outstanding_balance - GREATEST(COALESCE(OLD.balance, 0), 0)
+        WHERE id = OLD.customer_id;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.customer_id IS NOT NULL
+       AND NEW.status IS DISTINCT FROM 'cancelled' THEN
+        UPDATE public.customers
+        SET order_count = order_count + 1,
+            lifetime_value = lifetime_value + COALESCE(NEW.amount, 0),
+            outstanding_balance = outstanding_balance + GREATEST(COALESCE(NEW.balance, 0), 0),
+            last_order_at = GREATEST(COALESCE(last_order_at, NEW.created_at), NEW.created_at)
+        WHERE id = NEW.customer_id;
+    END IF;
+
+    -- 最近下单时间无法按增量回退，走 idx_orders_customer_created 取剩余订单的最大值
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.customer_id IS NOT NULL THEN
+        UPDATE public.customers
+        SET last_order_at = (
+            SELECT max(created_at)
+            FROM public.orders
+            WHERE customer_id = OLD.customer_id AND status IS DISTINCT FROM 'cancelled'
+        )
+        WHERE id = OLD.customer_id;
+    END IF;
+
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_orders_customer_rollups ON public.orders;
+CREATE TRIGGER trg_orders_customer_rollups
+AFTER INSERT OR DELETE OR UPDATE OF customer_id, amount, balance, status, created_at ON public.orders
+FOR EACH ROW EXECUTE FUNCTION public.maintain_customer_rollups();
+
+-- 4. 合并客户后重新全量计算汇总
+UPDATE public.customers c
+SET order_count = COALESCE(agg.order_count, 0),
+    lifetime_value = COALESCE(agg.lifetime_value, 0),
+    outstanding_balance = COALESCE(agg.outstanding_balance, 0),
+    last_order_at = agg.last_order_at
+FROM public.customers base
+LEFT JOIN (
+    SELECT customer_id,
+           COUNT(*) AS order_count,
+           SUM(COALESCE(amount, 0)) AS lifetime_value,
+           SUM(GREATEST(COALESCE(balance, 0), 0)) AS outstanding_balance,
+           MAX(created_at) AS last_order_at
+    FROM public.orders
+    WHERE customer_id IS NOT NULL AND status IS DISTINCT FROM 'cancelled'
+    GROUP BY customer_id
+) agg ON agg.customer_id = base.id
+WHERE base.id = c.id;
+
+COMMIT;
@@ -0,0 +1,49 @@
+-- Order Number Counter Migration (v13)
+-- Run this in the Supabase SQL Editor
+-- 订单号 KM-YY/MM/DD/NNN 的流水号改由数据库按日原子分配。
+-- 原先由应用查询当天最大流水号再加一，并发下单时多个请求会算出同一个号码。
+
+BEGIN;
+
+-- 1. 每个日期前缀一行计数器
+CREATE TABLE IF NOT EXISTS public.order_number_counters (
+    prefix TEXT PRIMARY KEY,
+    last_seq INTEGER NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now()) NOT NULL
+);
+
+ALTER TABLE public.order_number_counters ENABLE ROW LEVEL SECURITY;
+
+-- 2. 分配 RPC：计数器行上的行锁保证同一前缀的并发调用依次递增；
+--    某前缀首次分配时从 orders 中已有的最大流水号继续，兼容迁移前创建的订单
+CREATE OR REPLACE FUNCTION public.next_order_number(p_prefix TEXT)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_seq INTEGER;
+BEGIN
+    UPDATE public.order_number_counters
+    SET last_seq = last_seq + 1, updated_at = timezone('utc'::text, now())
+    WHERE prefix = p_prefix
+    RETURNING last_seq INTO v_seq;
+
+    IF NOT FOUND THEN
+        INSERT INTO public.order_number_counters (prefix, last_seq)
+        SELECT p_prefix, COALESCE(max(substr(id, length(p_prefix) + 1)::INTEGER), 0) + 1
+        FROM public.orders
+        WHERE left(id, length(p_prefix)) = p_prefix
+          AND substr(id, length(p_prefix) + 1) ~ '^\d+$'
+        ON CONFLICT (prefix) DO UPDATE
+        SET last_seq = public.order_number_counters.last_seq + 1, updated_at = timezone('utc'::text, now())
+        RETURNING last_seq INTO v_seq;
+    END IF;
+
+    RETURN v_seq;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.next_order_number(TEXT) TO service_role, authenticated;
+
+COMMIT;
@@ -0,0 +1,44 @@
+-- Update Order With Items Migration (v14)
+-- Run this in the Supabase SQL Editor
+-- 修改订单时表头字段与明细在同一个事务内写入：明细写入失败时表头修改一并回滚，
+-- 不会留下表头已更新、明细仍是旧数据的订单。依赖 v11 中的 replace_order_items。
+
+CREATE OR REPLACE FUNCTION public.update_order_with_items(p_order_id TEXT, p_fields JSONB, p_items JSONB)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_assignments TEXT;
+    v_order JSONB;
+BEGIN
+    PERFORM 1 FROM public.orders WHERE id = p_order_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'ORDER_NOT_FOUND';
+    END IF;
+
+    -- 只更新 orders 表中实际存在的列（与应用端遇到 PGRST204 时移除未知列的处理一致）；
+    -- id 与 items 不允许通过此函数修改
+    SELECT string_agg(format('%I = r.%I', c.column_name, c.column_name), ', ')
+    INTO v_assignments
+    FROM information_schema.columns c
+    WHERE c.table_schema = 'public'
+      AND c.table_name = 'orders'
+      AND c.column_name NOT IN ('id', 'items')
+      AND COALESCE(p_fields, '{}'::JSONB) ? c.column_name;
+
+    IF v_assignments IS NOT NULL THEN
+        EXECUTE format(
+            'UPDATE public.orders o SET %s FROM jsonb_populate_record(NULL::public.orders, $1) r WHERE o.id = $2',
+            v_assignments
+        ) USING p_fields, p_order_id;
+    END IF;
+
+    PERFORM public.replace_order_items(p_order_id, p_items);
+
+    SELECT to_jsonb(o) INTO v_order FROM public.orders o WHERE o.id = p_order_id;
+    RETURN v_order;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.update_order_with_items(TEXT, JSONB, JSONB) TO service_role, authenticated;
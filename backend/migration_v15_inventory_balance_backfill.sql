@@ -0,0 +1,51 @@
+-- Inventory Balance Backfill Migration (v15)
+-- Run this in the Supabase SQL Editor (after migration_v8_inventory_log_balances.sql)
+-- v8 的 inventory_log_balances 视图每次查询都要对整张 inventory_logs 做窗口计算，
+-- 按物料分页读取流水时过滤条件无法下推。流水只追加、历史结余不会再变，
+-- 因此把结余一次性回填到 balance_after，视图改为直接读取该列，按 item_id 过滤只扫描该物料的行。
+
+BEGIN;
+
+-- 1. 用 v8 视图的推算结果回填历史流水（v7 之后的行已自带 balance_after）
+UPDATE public.inventory_logs l
+SET balance_after = b.running_balance
+FROM public.inventory_log_balances b
+WHERE b.id = l.id
+  AND l.balance_after IS NULL;
+
+-- 2. 兜底：不经 adjust_stock RPC 写入的流水（旧版客户端先改库存再记流水）按当前库存补上结余
+CREATE OR REPLACE FUNCTION public.fill_inventory_log_balance()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF NEW.balance_after IS NULL THEN
+        SELECT stock_quantity INTO NEW.balance_after
+        FROM public.inventory_items
+        WHERE id = NEW.item_id;
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_inventory_logs_fill_balance ON public.inventory_logs;
+CREATE TRIGGER trg_inventory_logs_fill_balance
+BEFORE INSERT ON public.inventory_logs
+FOR EACH ROW EXECUTE FUNCTION public.fill_inventory_log_balance();
+
+-- 3. 视图只做列映射，配合 idx_inventory_logs_item_created 按物料分页
+CREATE OR REPLACE VIEW public.inventory_log_balances AS
+SELECT
+    l.id,
+    l.item_id,
+    l.type,
+    l.quantity,
+    l.user_id,
+    l.remark,
+    l.created_at,
+    l.balance_after AS running_balance
+FROM public.inventory_logs l;
+
+GRANT SELECT ON public.inventory_log_balances TO service_role, authenticated;
+
+COMMIT;
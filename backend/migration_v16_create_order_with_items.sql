@@ -0,0 +1,45 @@
+-- Create Order With Items Migration (v16)
+-- Run this in the Supabase SQL Editor
+-- 新建订单时表头与明细在同一个事务内写入：明细写入失败时订单一并回滚，
+-- 不再由应用先插入订单、再写明细、失败后尝试删除订单补偿。依赖 v11 中的 replace_order_items。
+
+CREATE OR REPLACE FUNCTION public.create_order_with_items(p_fields JSONB, p_items JSONB)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_columns TEXT;
+    v_values TEXT;
+    v_order_id TEXT;
+    v_order JSONB;
+BEGIN
+    -- 只写入 orders 表中实际存在的列（与 update_order_with_items 一致）；
+    -- 未提供的列使用表默认值，items 由 replace_order_items 生成投影
+    SELECT string_agg(format('%I', c.column_name), ', '),
+           string_agg(format('r.%I', c.column_name), ', ')
+    INTO v_columns, v_values
+    FROM information_schema.columns c
+    WHERE c.table_schema = 'public'
+      AND c.table_name = 'orders'
+      AND c.column_name <> 'items'
+      AND COALESCE(p_fields, '{}'::JSONB) ? c.column_name;
+
+    IF v_columns IS NULL THEN
+        RAISE EXCEPTION 'ORDER_FIELDS_EMPTY';
+    END IF;
+
+    -- 订单号冲突时抛出 unique_violation，由应用重新分配号码后重试
+    EXECUTE format(
+        'INSERT INTO public.orders (%s) SELECT %s FROM jsonb_populate_record(NULL::public.orders, $1) r RETURNING id',
+        v_columns, v_values
+    ) INTO v_order_id USING p_fields;
+
+    PERFORM public.replace_order_items(v_order_id, p_items);
+
+    SELECT to_jsonb(o) INTO v_order FROM public.orders o WHERE o.id = v_order_id;
+    RETURN v_order;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.create_order_with_items(JSONB, JSONB) TO service_role, authenticated;
@@ -0,0 +1,139 @@
+-- Atomic Vehicle Assignment Migration (v6)
+-- Run this in the Supabase SQL Editor
+-- 将派车/解绑的多次远程调用合并为单个事务 RPC，并用行锁 + 部分唯一索引保证
+-- 每辆车、每位司机同一时间最多只有一条 active 指派。
+
+-- 1. 确保 users 表上的车辆冗余字段存在（RPC 中直接写入）
+ALTER TABLE public.users
+ADD COLUMN IF NOT EXISTS vehicle_plate TEXT,
+ADD COLUMN IF NOT EXISTS vehicle_model TEXT,
+ADD COLUMN IF NOT EXISTS vehicle_type TEXT,
+ADD COLUMN IF NOT EXISTS vehicle_status TEXT DEFAULT 'idle';
+
+-- 2. 清理历史脏数据：同一车辆/司机存在多条 active 指派时，仅保留最新一条
+UPDATE public.driver_assignments a
+SET status = 'completed', returned_at = timezone('utc'::text, now())
+WHERE a.status = 'active'
+  AND EXISTS (
+    SELECT 1 FROM public.driver_assignments b
+    WHERE b.status = 'active'
+      AND b.id <> a.id
+      AND (b.vehicle_id = a.vehicle_id OR b.driver_id = a.driver_id)
+      AND (b.assigned_at, b.id) > (a.assigned_at, a.id)
+  );
+
+-- 3. 部分唯一索引：数据库层面兜底 "一车一司机"
+CREATE UNIQUE INDEX IF NOT EXISTS uq_driver_assignments_active_vehicle
+ON public.driver_assignments (vehicle_id) WHERE status = 'active';
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_driver_assignments_active_driver
+ON public.driver_assignments (driver_id) WHERE status = 'active';
+
+-- 4. 派车 RPC
+CREATE OR REPLACE FUNCTION public.assign_vehicle(p_driver_id UUID, p_vehicle_id UUID)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_now TIMESTAMPTZ := timezone('utc'::text, now());
+    v_vehicle public.vehicles%ROWTYPE;
+    v_existing public.driver_assignments%ROWTYPE;
+    v_assignment public.driver_assignments%ROWTYPE;
+BEGIN
+    -- 先锁车辆再锁司机，两位管理员同时派车时在此串行化
+    SELECT * INTO v_vehicle FROM public.vehicles WHERE id = p_vehicle_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'VEHICLE_NOT_FOUND';
+    END IF;
+
+    PERFORM 1 FROM public.users WHERE id = p_driver_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'DRIVER_NOT_FOUND';
+    END IF;
+
+    IF v_vehicle.status = 'busy' THEN
+        SELECT * INTO v_existing FROM public.driver_assignments
+        WHERE vehicle_id = p_vehicle_id AND status = 'active';
+        IF FOUND AND v_existing.driver_id = p_driver_id THEN
+            RETURN jsonb_build_object('result', 'already_assigned', 'assignment', to_jsonb(v_existing));
+        END IF;
+        RAISE EXCEPTION 'VEHICLE_BUSY';
+    END IF;
+
+    IF v_vehicle.status = 'repair' THEN
+        RAISE EXCEPTION 'VEHICLE_IN_REPAIR';
+    END IF;
+
+    -- 结束该司机此前的指派（以及该车辆残留的 active 指派），并释放旧车辆
+    WITH closed AS (
+        UPDATE public.driver_assignments
+        SET status = 'completed', returned_at = v_now
+        WHERE status = 'active'
+          AND (driver_id = p_driver_id OR vehicle_id = p_vehicle_id)
+        RETURNING vehicle_id
+    )
+    UPDATE public.vehicles
+    SET status = 'available', updated_at = v_now
+    WHERE id IN (SELECT vehicle_id FROM closed) AND id <> p_vehicle_id;
+
+    INSERT INTO public.driver_assignments (driver_id, vehicle_id, status)
+    VALUES (p_driver_id, p_vehicle_id, 'active')
+    RETURNING * INTO v_assignment;
+
+    UPDATE public.vehicles
+    SET status = 'busy', updated_at = v_now
+    WHERE id = p_vehicle_id;
+
+    UPDATE public.users
+    SET vehicle_plate = v_vehicle.plate_no,
+        vehicle_model = v_vehicle.model,
+        vehicle_type = v_vehicle.type,
+        vehicle_status = 'occupied'
+    WHERE id = p_driver_id;
+
+    RETURN jsonb_build_object('result', 'assigned', 'assignment', to_jsonb(v_assignment));
+END;
+$$;
+
+-- 5. 解绑 RPC
+CREATE OR REPLACE FUNCTION public.unassign_vehicle(p_driver_id UUID)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_now TIMESTAMPTZ := timezone('utc'::text, now());
+    v_assignment public.driver_assignments%ROWTYPE;
+BEGIN
+    PERFORM 1 FROM public.users WHERE id = p_driver_id FOR UPDATE;
+
+    -- 唯一索引保证最多命中一行
+    UPDATE public.driver_assignments
+    SET status = 'completed', returned_at = v_now
+    WHERE driver_id = p_driver_id AND status = 'active'
+    RETURNING * INTO v_assignment;
+
+    IF FOUND THEN
+        UPDATE public.vehicles
+        SET status = 'available', updated_at = v_now
+        WHERE id = v_assignment.vehicle_id;
+    END IF;
+
+    -- 即使没有活跃指派也清理冗余字段，防止数据不一致
+    UPDATE public.users
+    SET vehicle_plate = NULL,
+        vehicle_model = NULL,
+        vehicle_type = NULL,
+        vehicle_status = 'idle'
+    WHERE id = p_driver_id;
+
+    IF v_assignment.id IS NULL THEN
+        RETURN jsonb_build_object('result', 'none', 'assignment', NULL);
+    END IF;
+    RETURN jsonb_build_object('result', 'unassigned', 'assignment', to_jsonb(v_assignment));
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.assign_vehicle(UUID, UUID) TO service_role, authenticated;
+GRANT EXECUTE ON FUNCTION public.unassign_vehicle(UUID) TO service_role, authenticated;
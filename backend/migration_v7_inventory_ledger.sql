@@ -0,0 +1,109 @@
+-- Atomic Stock Adjustment Migration (v7)
+-- Run this in the Supabase SQL Editor
+-- 库存调整改为单事务 RPC：锁定库存行、更新数量并追加 inventory_logs 流水，
+-- 避免 "读-算-写" 在并发下丢失更新。流水表只追加，不允许客户端修改/删除。
+
+-- 1. 流水记录调整后的结余，便于按物料计算 running balance
+ALTER TABLE public.inventory_logs
+ADD COLUMN IF NOT EXISTS balance_after NUMERIC;
+
+CREATE INDEX IF NOT EXISTS idx_inventory_logs_item_created
+ON public.inventory_logs (item_id, created_at DESC);
+
+-- 2. 只追加 (append-only)：收回客户端角色的 UPDATE / DELETE 权限
+REVOKE UPDATE, DELETE ON public.inventory_logs FROM anon, authenticated;
+
+-- 3. 单条调整 RPC：返回调整前后数量
+CREATE OR REPLACE FUNCTION public.adjust_stock(
+    p_item_id public.inventory_items.id%TYPE,
+    p_type TEXT,
+    p_quantity NUMERIC,
+    p_user_id public.inventory_logs.user_id%TYPE,
+    p_remark TEXT DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_old NUMERIC;
+    v_new NUMERIC;
+    v_name TEXT;
+    v_log_id public.inventory_logs.id%TYPE;
+BEGIN
+    IF p_type NOT IN ('IN', 'OUT', 'ADJUST') THEN
+        RAISE EXCEPTION 'INVALID_ADJUSTMENT_TYPE';
+    END IF;
+
+    SELECT stock_quantity, name INTO v_old, v_name
+    FROM public.inventory_items
+    WHERE id = p_item_id
+    FOR UPDATE;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'ITEM_NOT_FOUND';
+    END IF;
+
+    v_old := COALESCE(v_old, 0);
+    v_new := CASE p_type
+        WHEN 'IN' THEN v_old + p_quantity
+        WHEN 'OUT' THEN v_old - p_quantity
+        ELSE p_quantity
+    END;
+
+    UPDATE public.inventory_items
+    SET stock_quantity = v_new,
+        updated_at = timezone('utc'::text, now())
+    WHERE id = p_item_id;
+
+    v_log_id := gen_random_uuid();
+    INSERT INTO public.inventory_logs (id, item_id, type, quantity, user_id, remark, balance_after)
+    VALUES (v_log_id, p_item_id, p_type, p_quantity, p_user_id, p_remark, v_new);
+
+    RETURN jsonb_build_object(
+        'item_id', p_item_id,
+        'name', v_name,
+        'type', p_type,
+        'quantity', p_quantity,
+        'old_quantity', v_old,
+        'new_quantity', v_new,
+        'log_id', v_log_id
+    );
+END;
+$$;
+
+-- 4. 批量调整 RPC（如进货单 GRN 多行）：全部成功或全部回滚
+-- 按 item_id 排序加锁，避免两个批次交叉锁行造成死锁
+CREATE OR REPLACE FUNCTION public.adjust_stock_batch(
+    p_adjustments JSONB,
+    p_user_id public.inventory_logs.user_id%TYPE
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_row JSONB;
+    v_item_id public.inventory_items.id%TYPE;
+    v_results JSONB := '[]'::jsonb;
+BEGIN
+    FOR v_row IN
+        SELECT value FROM jsonb_array_elements(p_adjustments) ORDER BY value->>'item_id'
+    LOOP
+        v_item_id := v_row->>'item_id';
+        v_results := v_results || jsonb_build_array(
+            public.adjust_stock(
+                v_item_id,
+                v_row->>'type',
+                (v_row->>'quantity')::NUMERIC,
+                p_user_id,
+                v_row->>'remark'
+            )
+        );
+    END LOOP;
+    RETURN v_results;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.adjust_stock TO service_role, authenticated;
+GRANT EXECUTE ON FUNCTION public.adjust_stock_batch TO service_role, authenticated;
@@ -0,0 +1,68 @@
+-- Inventory Running Balance View (v8)
+-- Run this in the Supabase SQL Editor (after migration_v7_inventory_ledger.sql)
+-- 按物料计算每条流水之后的结余：ADJUST 行重置结余，IN/OUT 在其基础上累加，
+-- 第一次 ADJUST 之前的流水从期初库存起算。
+-- v7 之后写入的流水自带 balance_after，优先使用；更早的历史行由窗口函数推算。
+
+CREATE INDEX IF NOT EXISTS idx_inventory_logs_created_id
+ON public.inventory_logs (created_at DESC, id DESC);
+
+CREATE OR REPLACE VIEW public.inventory_log_balances AS
+WITH segmented AS (
+    SELECT
+        l.*,
+        CASE l.type
+            WHEN 'IN' THEN l.quantity
+            WHEN 'OUT' THEN -l.quantity
+            ELSE l.quantity
+        END AS delta,
+        COUNT(*) FILTER (WHERE l.type = 'ADJUST') OVER (
+            PARTITION BY l.item_id ORDER BY l.created_at, l.id
+        ) AS adjust_segment
+    FROM public.inventory_logs l
+),
+running AS (
+    SELECT
+        s.*,
+        SUM(s.delta) OVER (
+            PARTITION BY s.item_id, s.adjust_segment ORDER BY s.created_at, s.id
+        ) AS segment_sum
+    FROM segmented s
+),
+-- 第一次 ADJUST 之前的流水从物料的期初库存起算：
+-- 优先用该段内第一条 balance_after 反推；没有 ADJUST 时由当前库存减去全部流水得到；
+-- 两者都不可用（有 ADJUST 且无 balance_after 的旧数据）时无从推算，按 0 处理
+openings AS (
+    SELECT
+        i.id AS item_id,
+        COALESCE(
+            (SELECT r.balance_after - r.segment_sum
+             FROM running r
+             WHERE r.item_id = i.id AND r.adjust_segment = 0 AND r.balance_after IS NOT NULL
+             ORDER BY r.created_at, r.id
+             LIMIT 1),
+            CASE WHEN NOT EXISTS (
+                SELECT 1 FROM public.inventory_logs l WHERE l.item_id = i.id AND l.type = 'ADJUST'
+            ) THEN i.stock_quantity - COALESCE(
+                (SELECT SUM(r.delta) FROM running r WHERE r.item_id = i.id), 0
+            ) END,
+            0
+        ) AS opening_balance
+    FROM public.inventory_items i
+)
+SELECT
+    r.id,
+    r.item_id,
+    r.type,
+    r.quantity,
+    r.user_id,
+    r.remark,
+    r.created_at,
+    COALESCE(
+        r.balance_after,
+        r.segment_sum + CASE WHEN r.adjust_segment = 0 THEN COALESCE(o.opening_balance, 0) ELSE 0 END
+    ) AS running_balance
+FROM running r
+LEFT JOIN openings o ON o.item_id = r.item_id;
+
+GRANT SELECT ON public.inventory_log_balances TO service_role, authenticated;
@@ -0,0 +1,6 @@
+-- Product Image Variants Migration (v9)
+-- Run this in the Supabase SQL Editor
+-- 记录产品图片的多尺寸变体 URL: {"thumb": "...", "card": "...", "full": "..."}
+
+ALTER TABLE public.products
+ADD COLUMN IF NOT EXISTS image_variants JSONB;
@@ -45,6 +45,7 @@ class OrderStatus(str, Enum):
     READY = 'ready'
     DELIVERING = 'delivering'
     COMPLETED = 'completed'
+    CANCELLED = 'cancelled'
 
 
 class PaymentMethod(str, Enum):
@@ -100,6 +101,7 @@ class OrderBase(BaseModel):
     billingUnit: Optional[str] = 'PAX'
     billingQuantity: Optional[float] = 0.0
     billingPricePerUnit: Optional[float] = 0.0
+    customer_id: Optional[str] = None
 
     @model_validator(mode='after')
     def validate_finance_logic(self) -> 'OrderBase':
@@ -169,6 +171,10 @@ class Product(BaseModel):
     price: Optional[float] = None
     category: Optional[str] = None
     image_url: Optional[str] = None
+    image_variants: Optional[dict] = None
+    # 仅列表接口输出：按请求尺寸选出的图片与 srcset，不写入数据库
+    image_src: Optional[str] = None
+    image_srcset: Optional[str] = None
 
 
 class User(BaseModel):
@@ -187,6 +193,7 @@ class User(BaseModel):
     department: Optional[str] = None
     position: Optional[str] = None
     permissions: Optional[dict] = None
+    is_online: Optional[bool] = False
 
 
 class CustomerBase(BaseModel):
@@ -206,6 +213,10 @@ class CustomerUpdate(BaseModel):
 
 class Customer(CustomerBase):
     id: str
+    order_count: Optional[int] = 0
+    lifetime_value: Optional[float] = 0.0
+    outstanding_balance: Optional[float] = 0.0
+    last_order_at: Optional[datetime] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
@@ -5,6 +5,7 @@ from database import supabase
 from models import User, UserRole, UserStatus, UserUpdate, UserCreateInternal
 from middleware.auth import require_admin
 from services.audit import record_audit, AuditActions
+from services.user_directory import user_directory
 import logging
 
 logger = logging.getLogger(__name__)
@@ -91,6 +92,7 @@ async def create_internal_user(
         try:
             response = await run_in_threadpool(supabase.table("users").insert(insert_data).execute)
             logger.info(f"DB Insert Response: {response}")
+            user_directory.upsert(response.data[0] if response.data else insert_data)
         except Exception as db_sync_err:
             logger.error(f"DB Sync to 'users' table failed: {db_sync_err}")
             raise Exception(f"Database Sync Failed: {db_sync_err}")
@@ -148,6 +150,7 @@ async def update_user_status(
     )
     if not response.data:
         raise HTTPException(status_code=404, detail="User not found")
+    user_directory.upsert(response.data[0])
     
     # 如果用户不再是 ACTIVE 状态（如被删除或停用），自动释放其占用的车辆
     if status != UserStatus.ACTIVE:
@@ -190,9 +193,19 @@ async def update_user_status(
                     "vehicle_status": "idle"
                 }).eq("id", user_id).execute
             )
+            user_directory.upsert({
+                "id": user_id,
+                "vehicle_plate": None,
+                "vehicle_model": None,
+                "vehicle_type": None,
+                "vehicle_status": "idle"
+            })
         except Exception as e:
             # 清理过程中的错误不应阻止主状态更新，但应记录
             print(f"Warning: Failed to cleanup vehicle resources for user {user_id}: {e}")
+
+        from routers.vehicles import invalidate_fleet_status_cache
+        invalidate_fleet_status_cache()
         
     # 记录审计日志
     await record_audit(
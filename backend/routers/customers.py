@@ -5,6 +5,7 @@ from models import Customer, CustomerCreate, CustomerUpdate
 from fastapi.concurrency import run_in_threadpool
 from middleware.auth import require_admin, get_current_user
 from services.audit import record_audit, AuditActions
+from services.customer_index import customer_index, canonical_phone
 
 router = APIRouter(
     prefix="/customers",
@@ -18,7 +19,18 @@ async def get_customers(
 ):
     """
     Get all customers or search by name/phone
+    索引已加载时在内存中选出排序后的前 N 个客户 id，再按主键读取完整行（汇总字段始终为最新值）
     """
+    if customer_index.loaded:
+        ids = customer_index.search(q, limit)
+        if not ids:
+            return []
+        response = await run_in_threadpool(
+            supabase.table("customers").select("*").in_("id", ids).execute
+        )
+        rows = {row["id"]: row for row in response.data or []}
+        return [rows[cid] for cid in ids if cid in rows]
+
     query = supabase.table("customers").select("*")
     if q:
         # Search in name or phone
@@ -31,6 +43,7 @@ async def get_customers(
 
 @router.get("/{customer_id}", response_model=Customer)
 async def get_customer(customer_id: str):
+    # NOTE: 汇总字段由数据库触发器维护，这里按主键读取最新值而不使用内存索引
     response = await run_in_threadpool(
         supabase.table("customers").select("*").eq("id", customer_id).execute
     )
@@ -38,18 +51,38 @@ async def get_customer(customer_id: str):
         raise HTTPException(status_code=404, detail="Customer not found")
     return response.data[0]
 
+@router.get("/{customer_id}/orders")
+async def get_customer_orders(
+    customer_id: str,
+    limit: int = Query(50, ge=1, le=200)
+):
+    """
+    客户历史订单（按 customer_id 走索引，不再按电话文本扫描 orders）
+    """
+    response = await run_in_threadpool(
+        supabase.table("orders")
+        .select("id, status, amount, balance, paymentStatus, dueTime, created_at")
+        .eq("customer_id", customer_id)
+        .order("created_at", desc=True)
+        .limit(limit)
+        .execute
+    )
+    return response.data or []
+
 @router.post("", response_model=Customer)
 async def create_customer(
     customer: CustomerCreate,
     current_user: dict = Depends(get_current_user)
 ):
     customer_data = customer.model_dump(exclude_none=True)
+    customer_data["phone_normalized"] = canonical_phone(customer_data.get("phone"))
     try:
         response = await run_in_threadpool(
             supabase.table("customers").insert(customer_data).execute
         )
         if not response.data:
             raise HTTPException(status_code=400, detail="Could not create customer")
+        customer_index.upsert(response.data[0])
         
         await record_audit(
             actor_id=current_user.get("id"),
@@ -71,11 +104,14 @@ async def update_customer(
     current_user: dict = Depends(get_current_user)
 ):
     update_data = update.model_dump(exclude_none=True)
+    if "phone" in update_data:
+        update_data["phone_normalized"] = canonical_phone(update_data["phone"])
     response = await run_in_threadpool(
         supabase.table("customers").update(update_data).eq("id", customer_id).execute
     )
     if not response.data:
         raise HTTPException(status_code=404, detail="Customer not found")
+    customer_index.upsert(response.data[0])
         
     await record_audit(
         actor_id=current_user.get("id"),
@@ -96,6 +132,7 @@ async def delete_customer(
     )
     if not response.data:
         raise HTTPException(status_code=404, detail="Customer not found")
+    customer_index.remove(customer_id)
         
     await record_audit(
         actor_id=current_user.get("id"),
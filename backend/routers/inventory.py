@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from typing import List, Optional
+import base64
 from database import supabase
 from models import InventoryItem, InventoryLog
 from pydantic import BaseModel
 import uuid
 from middleware.auth import require_admin, get_current_user
 from services.audit import record_audit, AuditActions
+from services.ingredient_planner import get_requirements, invalidate_requirements_cache
+from services import stock_alerts
 from fastapi.concurrency import run_in_threadpool
 from datetime import datetime
 
@@ -30,10 +33,77 @@ class StockAdjustment(BaseModel):
     quantity: float
     remark: Optional[str] = None
 
+class StockAdjustmentBatch(BaseModel):
+    """进货单 (GRN) 等多行调整，一次事务内完成"""
+    adjustments: List[StockAdjustment]
+    reference: Optional[str] = None  # 单据号，仅用于审计
+
+# adjust_stock RPC 抛出的业务错误 -> HTTP 响应
+_ADJUST_ERRORS = {
+    "ITEM_NOT_FOUND": (404, "Item not found"),
+    "INVALID_ADJUSTMENT_TYPE": (400, "type must be one of IN, OUT, ADJUST"),
+}
+
+def _raise_adjust_error(e: Exception):
+    error_msg = str(e)
+    for code, (status_code, detail) in _ADJUST_ERRORS.items():
+        if code in error_msg:
+            raise HTTPException(status_code=status_code, detail=detail)
+    raise HTTPException(status_code=500, detail=f"Database error: {error_msg}")
+
+# 流水查询只返回前端需要的列
+LOG_COLUMNS = "id, item_id, type, quantity, user_id, remark, created_at, inventory_items(name)"
+
+
+def _encode_cursor(row: dict) -> str:
+    raw = f"{row.get('created_at')}|{row.get('id')}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _apply_cursor(query, cursor: Optional[str]):
+    """
+    游标分页 (keyset)：按 (created_at, id) 倒序，只取游标之后的行，
+    无论翻到第几页都只扫描索引中的 limit 行
+    """
+    if not cursor:
+        return query
+    try:
+        created_at, row_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|", 1)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return query.or_(
+        f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt."{row_id}")'
+    )
+
+
+def _paginate(query, cursor: Optional[str], limit: Optional[int], default_limit: int, response: Response) -> list:
+    """
+    执行分页查询，并通过 X-Next-Cursor 响应头返回下一页游标（保持列表响应格式兼容前端）。
+    未传 limit 时按 default_limit 分页，任何请求都不会一次读取整张表。
+    """
+    query = _apply_cursor(query, cursor).order("created_at", desc=True).order("id", desc=True)
+    limit = limit or default_limit
+    rows = query.limit(limit + 1).execute().data or []
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1])
+    return rows
+
+
 @router.get("/items", response_model=List[InventoryItem])
-async def get_inventory_items():
-    response = await run_in_threadpool(supabase.table("inventory_items").select("*").order("created_at", desc=True).execute)
-    return response.data
+async def get_inventory_items(
+    response: Response,
+    category: Optional[str] = Query(None, description="分类筛选"),
+    q: Optional[str] = Query(None, description="按名称或编码搜索"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="每页条数（默认 200）"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 X-Next-Cursor"),
+):
+    query = supabase.table("inventory_items").select("*")
+    if category:
+        query = query.eq("category", category)
+    if q:
+        query = query.or_(f"name.ilike.%{q}%,code.ilike.%{q}%")
+    return await run_in_threadpool(_paginate, query, cursor, limit, 200, response)
 
 @router.post("/items", response_model=InventoryItem)
 async def create_inventory_item(
@@ -44,6 +114,7 @@ async def create_inventory_item(
     data["id"] = str(uuid.uuid4())
     
     response = await run_in_threadpool(supabase.table("inventory_items").insert(data).execute)
+    await stock_alerts.observe_item(response.data[0])
     
     await record_audit(
         actor_id=current_user.get("id"),
@@ -64,6 +135,9 @@ async def update_inventory_item(
     response = await run_in_threadpool(
         supabase.table("inventory_items").update(item_update).eq("id", item_id).execute
     )
+    invalidate_requirements_cache()
+    if response.data:
+        await stock_alerts.observe_item(response.data[0])
     
     await record_audit(
         actor_id=current_user.get("id"),
@@ -79,54 +153,134 @@ async def adjust_stock(
     adjustment: StockAdjustment,
     current_user: dict = Depends(require_admin)
 ):
-    # 1. Get current stock
-    item_res = await run_in_threadpool(supabase.table("inventory_items").select("stock_quantity, name").eq("id", adjustment.item_id).single().execute)
-    if not item_res.data:
-        raise HTTPException(status_code=404, detail="Item not found")
-    
-    current_qty = item_res.data["stock_quantity"]
-    new_qty = current_qty
-    
-    if adjustment.type == 'IN':
-        new_qty += adjustment.quantity
-    elif adjustment.type == 'OUT':
-        new_qty -= adjustment.quantity
-    elif adjustment.type == 'ADJUST':
-        new_qty = adjustment.quantity
-    
-    # 2. Update stock
-    await run_in_threadpool(supabase.table("inventory_items").update({"stock_quantity": new_qty}).eq("id", adjustment.item_id).execute)
-    
-    # 3. Log the change
-    log_data = {
-        "id": str(uuid.uuid4()),
-        "item_id": adjustment.item_id,
-        "type": adjustment.type,
-        "quantity": adjustment.quantity,
-        "user_id": current_user.get("id"),
-        "remark": adjustment.remark
-    }
-    await run_in_threadpool(supabase.table("inventory_logs").insert(log_data).execute)
+    """
+    原子调整库存：adjust_stock RPC 在单个事务内锁行、更新数量并追加流水
+    (见 migration_v7_inventory_ledger.sql)
+    """
+    try:
+        response = await run_in_threadpool(
+            supabase.rpc("adjust_stock", {
+                "p_item_id": adjustment.item_id,
+                "p_type": adjustment.type,
+                "p_quantity": adjustment.quantity,
+                "p_user_id": current_user.get("id"),
+                "p_remark": adjustment.remark,
+            }).execute
+        )
+    except Exception as e:
+        _raise_adjust_error(e)
+
+    result = response.data or {}
+    invalidate_requirements_cache()
+    await stock_alerts.observe_stock(adjustment.item_id, result.get("new_quantity"))
     
     await record_audit(
         actor_id=current_user.get("id"),
         actor_role=current_user.get("role"),
         action=f"INVENTORY_{adjustment.type}",
         target=adjustment.item_id,
-        detail={"old_qty": current_qty, "new_qty": new_qty, "adjustment": adjustment.model_dump()}
+        detail={"old_qty": result.get("old_quantity"), "new_qty": result.get("new_quantity"), "adjustment": adjustment.model_dump()}
     )
     
-    return {"message": "Stock adjusted successfully", "new_quantity": new_qty}
+    return {"message": "Stock adjusted successfully", "new_quantity": result.get("new_quantity")}
+
+@router.post("/adjust/batch")
+async def adjust_stock_batch(
+    batch: StockAdjustmentBatch,
+    current_user: dict = Depends(require_admin)
+):
+    """
+    批量调整库存（全部成功或全部回滚），返回每行调整后的结余
+    """
+    if not batch.adjustments:
+        raise HTTPException(status_code=400, detail="adjustments must not be empty")
+
+    try:
+        response = await run_in_threadpool(
+            supabase.rpc("adjust_stock_batch", {
+                "p_adjustments": [a.model_dump() for a in batch.adjustments],
+                "p_user_id": current_user.get("id"),
+            }).execute
+        )
+    except Exception as e:
+        _raise_adjust_error(e)
+
+    results = response.data or []
+    invalidate_requirements_cache()
+    for r in results:
+        await stock_alerts.observe_stock(r.get("item_id"), r.get("new_quantity"))
+
+    await record_audit(
+        actor_id=current_user.get("id"),
+        actor_role=current_user.get("role"),
+        action="INVENTORY_BATCH",
+        target=batch.reference,
+        detail={
+            "lines": len(results),
+            "changes": [
+                {"item_id": r.get("item_id"), "old_qty": r.get("old_quantity"), "new_qty": r.get("new_quantity")}
+                for r in results
+            ],
+        }
+    )
+
+    return {"message": "Stock adjusted successfully", "results": results}
+
+@router.get("/requirements")
+async def get_ingredient_requirements(
+    start_date: str = Query(..., description="起始日期 (YYYY-MM-DD)"),
+    end_date: str = Query(..., description="结束日期 (YYYY-MM-DD)"),
+    refresh: bool = Query(False, description="忽略缓存重新计算"),
+    current_user: dict = Depends(require_admin)
+):
+    """
+    根据日期范围内到期订单与菜谱计算食材需求，并与库存比较生成缺口报告
+    """
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be earlier than start_date")
+    return await run_in_threadpool(get_requirements, start_date, end_date, refresh)
+
+@router.get("/alerts")
+async def get_stock_alerts(current_user: dict = Depends(get_current_user)):
+    """
+    当前低于安全库存的物料（直接读取内存，不查询数据库）
+    """
+    return stock_alerts.get_alerts()
 
 @router.get("/logs", response_model=List[dict])
-async def get_inventory_logs(item_id: Optional[str] = None):
+async def get_inventory_logs(
+    response: Response,
+    item_id: Optional[str] = None,
+    type: Optional[str] = Query(None, description="IN / OUT / ADJUST"),
+    start_date: Optional[str] = Query(None, description="起始日期 (YYYY-MM-DD)"),
+    end_date: Optional[str] = Query(None, description="结束日期 (YYYY-MM-DD)"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="每页条数（默认 50）"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 X-Next-Cursor"),
+):
     # Join with inventory_items to get the name for the frontend
-    query = supabase.table("inventory_logs").select("*, inventory_items(name)").order("created_at", desc=True)
+    query = supabase.table("inventory_logs").select(LOG_COLUMNS)
     if item_id:
         query = query.eq("item_id", item_id)
-    
-    response = await run_in_threadpool(query.execute)
-    return response.data
+    if type:
+        query = query.eq("type", type)
+    if start_date:
+        query = query.gte("created_at", start_date)
+    if end_date:
+        query = query.lte("created_at", f"{end_date}T23:59:59.999999")
+    return await run_in_threadpool(_paginate, query, cursor, limit, 50, response)
+
+@router.get("/items/{item_id}/ledger", response_model=List[dict])
+async def get_item_ledger(
+    item_id: str,
+    response: Response,
+    limit: int = Query(100, ge=1, le=500, description="每页条数"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 X-Next-Cursor"),
+):
+    """
+    单个物料的流水及每条之后的结余（结余存于 balance_after，见 migration_v15_inventory_balance_backfill.sql）
+    """
+    query = supabase.table("inventory_log_balances").select("*").eq("item_id", item_id)
+    return await run_in_threadpool(_paginate, query, cursor, limit, 100, response)
 
 @router.delete("/items/{item_id}")
 async def delete_inventory_item(
@@ -138,6 +292,7 @@ async def delete_inventory_item(
     response = await run_in_threadpool(
         supabase.table("inventory_items").delete().eq("id", item_id).execute
     )
+    stock_alerts.forget_item(item_id)
     
     await record_audit(
         actor_id=current_user.get("id"),
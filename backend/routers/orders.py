@@ -6,7 +6,9 @@ from database import supabase
 from models import Order, OrderCreate, OrderUpdate, OrderStatus, UserRole
 from fastapi.concurrency import run_in_threadpool
 from middleware.auth import get_current_user, require_admin
-from services.audit import record_audit, AuditActions
+from services.audit import record_audit, AuditActions, build_create_detail, build_diff_detail
+from services.fast_json import json_response
+from services.ingredient_planner import invalidate_requirements_cache
 
 router = APIRouter(
     prefix="/orders",
@@ -15,44 +17,51 @@ router = APIRouter(
 
 logger = logging.getLogger(__name__)
 
-async def _sync_items_to_table(order_id: str, items: list):
+async def _create_with_items(fields: dict, items: list) -> dict:
     """
-    辅助函数：将订单项同步到 order_items 表。
-    采用先删后增的策略确保与 orders 表中的 JSON 数据保持一致。
+    辅助函数：在一个事务内插入订单表头并写入明细，返回新建的订单
+    (见 migration_v16_create_order_with_items.sql)。明细写入失败时订单一并回滚，不会留下没有明细的订单。
+    """
+    response = await run_in_threadpool(
+        supabase.rpc("create_order_with_items", {"p_fields": fields, "p_items": items or []}).execute
+    )
+    if not response.data:
+        raise HTTPException(status_code=400, detail="Could not create order")
+    return response.data
+
+
+async def _update_with_items(order_id: str, fields: dict, items: list) -> dict:
+    """
+    辅助函数：在一个事务内更新订单表头并整体替换明细，返回更新后的订单
+    (见 migration_v14_update_order_with_items.sql)。任一步失败都会整体回滚，订单不会只改了一半。
     """
-    if not items:
-        return
-    
     try:
-        from fastapi.concurrency import run_in_threadpool
-        # 1. 清除旧数据
-        await run_in_threadpool(
-            supabase.table("order_items").delete().eq("order_id", order_id).execute
+        response = await run_in_threadpool(
+            supabase.rpc("update_order_with_items", {
+                "p_order_id": order_id,
+                "p_fields": fields,
+                "p_items": items or [],
+            }).execute
         )
-        
-        # 2. 准备新数据
-        prep_items = []
-        for item in items:
-            prep_items.append({
-                "order_id": order_id,
-                "product_id": item.get("id"),
-                "name": item.get("name", "Unnamed Item"),
-                "quantity": item.get("quantity", 1),
-                "status": item.get("status", "pending"),
-                "is_prepared": item.get("is_prepared", False),
-                "note": item.get("note"),
-                "price": item.get("price", 0)
-            })
-        
-        # 3. 批量插入
-        if prep_items:
-            await run_in_threadpool(
-                supabase.table("order_items").insert(prep_items).execute
-            )
-            
     except Exception as e:
-        # 即使同步失败也不中断主流程
-        print(f"WARNING: Failed to sync items for order {order_id}: {e}")
+        if "ORDER_NOT_FOUND" in str(e):
+            raise HTTPException(status_code=404, detail="Order not found")
+        logger.error(f"Failed to update order {order_id} with items: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to update order: {e}")
+    if not response.data:
+        raise HTTPException(status_code=404, detail="Order not found or update failed")
+    return response.data
+
+
+async def _next_order_id(prefix: str) -> str:
+    """
+    辅助函数：按日期前缀原子分配下一个订单号。
+    流水号由数据库计数器分配 (见 migration_v13_order_number_counter.sql)，并发下单不会拿到同一个号码。
+    """
+    response = await run_in_threadpool(
+        supabase.rpc("next_order_number", {"p_prefix": prefix}).execute
+    )
+    return f"{prefix}{int(response.data):03d}"
 
 
 @router.get("", response_model=List[Order])
@@ -91,7 +100,7 @@ async def get_orders(
         .limit(200)  # Increase limit to 200 for better visibility
         .execute
     )
-    return response.data
+    return json_response(List[Order], response.data)
 
 # ─── Finance Summary (Public for Admin Role) ──────────────────────────────────
 
@@ -105,40 +114,16 @@ async def get_orders(
 async def get_order_items(order_id: str):
     order_id = order_id.strip()
     """
-    获取指定订单的所有 order_items（含 is_prepared 状态）
+    获取指定订单的所有 order_items（含 is_prepared 状态），按订单内顺序排列
     """
-    from fastapi.concurrency import run_in_threadpool
-    import postgrest
-    try:
-        response = await run_in_threadpool(
-            supabase.table("order_items")
-            .select("*")
-            .eq("order_id", order_id)
-            .order("created_at", desc=False)
-            .execute
-        )
-        return response.data or []
-    except postgrest.exceptions.APIError as e:
-        if "PGRST205" in str(e):
-            # Fallback to reading the JSON items from orders table
-            res = await run_in_threadpool(
-                supabase.table("orders").select("items").eq("id", order_id).execute
-            )
-            if res.data and res.data[0].get("items"):
-                fallback_items = []
-                for idx, it in enumerate(res.data[0]["items"]):
-                    fallback_items.append({
-                        "id": str(idx),
-                        "order_id": order_id,
-                        "product_id": it.get("id"),
-                        "name": it.get("name"),
-                        "quantity": it.get("quantity"),
-                        "note": it.get("note"),
-                        "is_prepared": False,
-                        "status": "pending"
-                    })
-                return fallback_items
-        return []
+    response = await run_in_threadpool(
+        supabase.table("order_items")
+        .select("*")
+        .eq("order_id", order_id)
+        .order("position", desc=False)
+        .execute
+    )
+    return response.data or []
 
 
 @router.patch("/items/{item_id}/prepared")
@@ -170,10 +155,9 @@ async def mark_item_prepared(item_id: str, payload: dict, current_user: dict = D
         
         return response.data[0]
     except postgrest.exceptions.APIError as e:
-        err_msg = str(e)
-        if "PGRST205" in err_msg or "22P02" in err_msg:
-            # 假装更新成功，不阻塞前端流程 (这种情况通常发生在旧数据未同步到 order_items 表时)
-            return {"id": item_id, "is_prepared": is_prepared, "status": "ready" if is_prepared else "pending"}
+        # 22P02: item_id 不是合法 UUID
+        if "22P02" in str(e):
+            raise HTTPException(status_code=404, detail="Order item not found")
         raise e
 
 
@@ -195,9 +179,8 @@ async def create_order(
     """
     创建新订单并写入数据库。
     - 自动生成 UUID 作为订单 ID（防止 DB 未设置 default gen_random_uuid()）
-    - 若数据库 schema 尚未完成迁移（缺列），自动过滤未知字段后重试
+    - 若数据库 schema 尚未完成迁移（缺列），未知字段由 create_order_with_items RPC 忽略
     """
-    import re
     import uuid
     from services.google_calendar import sync_order_to_calendar
     from services.goeasy import publish_message, notify_order_update
@@ -207,80 +190,69 @@ async def create_order(
     if 'status' not in order_data or not order_data['status']:
         order_data['status'] = 'pending'
     # Generate custom order ID: KM-YY/MM/DD/xxx
+    generated_prefix = None
     if 'id' not in order_data or not order_data['id']:
         from datetime import datetime
         today_str = datetime.now().strftime("%y/%m/%d")
-        prefix = f"KM-{today_str}/"
-        
-        # Query existing orders with the same day prefix to determine the next sequence number
-        res = await run_in_threadpool(
-            supabase.table("orders").select("id").ilike("id", f"{prefix}%").execute
-        )
-        
-        max_num = 0
-        if res.data:
-            for row in res.data:
-                try:
-                    # Extract the last part of the ID (the sequence number)
-                    parts = row['id'].split('/')
-                    if parts:
-                        num = int(parts[-1])
-                        if num > max_num:
-                            max_num = num
-                except (ValueError, IndexError):
-                    pass
-        
-        new_num = max_num + 1
-        generated_id = f"{prefix}{new_num:03d}"
-        
+        generated_prefix = f"KM-{today_str}/"
         # Set both id and order_number to the standard format
-        order_data['id'] = generated_id
-        order_data['order_number'] = generated_id
+        order_data['id'] = order_data['order_number'] = await _next_order_id(generated_prefix)
+
+    # 按规范化电话关联已有客户档案；新客户在订单写入成功后再创建
+    from services.customer_profiles import find_customer_id, link_new_customer
+    if not order_data.get('customer_id'):
+        customer_id = await find_customer_id(order_data)
+        if customer_id:
+            order_data['customer_id'] = customer_id
 
     # Sync to calendar BEFORE inserting into DB to get the event ID (if calendar is configured)
     calendar_event_id = sync_order_to_calendar(order_data)
     if calendar_event_id:
         order_data['calendar_event_id'] = calendar_event_id
 
+    # 明细只写入 order_items，orders.items 由数据库投影生成
+    items = order_data.pop("items", [])
+
+    # 表头与明细在同一个事务内写入；数据库中不存在的列由 RPC 忽略
     max_retries = 10
     for attempt in range(max_retries):
         try:
-            response = await run_in_threadpool(
-                supabase.table("orders").insert(order_data).execute
-            )
-            if not response.data:
-                raise HTTPException(status_code=400, detail="Could not create order")
-            
-            # GoEasy Notification
-            await notify_order_update(response.data[0], action="create")
-            
-            # Sync items for granular production tracking
-            items = order_data.get("items", [])
-            await _sync_items_to_table(response.data[0]["id"], items)
-            
-            # Record Audit
-            await record_audit(
-                actor_id=current_user.get("id"),
-                actor_role=current_user.get("role"),
-                action=AuditActions.ORDER_CREATE,
-                target=response.data[0]["id"],
-                detail=order_data
-            )
-            
-            return response.data[0]
+            created = await _create_with_items(order_data, items)
         except HTTPException:
             raise
         except Exception as e:
-            err_msg = str(e)
-            # PGRST204: 列不在 schema cache，提取列名后移除再重试
-            match = re.search(r"Could not find the '(\w+)' column", err_msg)
-            if match:
-                bad_col = match.group(1)
-                order_data.pop(bad_col, None)
+            # 流水号已被手工录入的订单占用时，重新分配下一个号码
+            if generated_prefix is not None and "duplicate key" in str(e):
+                order_data['id'] = order_data['order_number'] = await _next_order_id(generated_prefix)
                 continue
-            # 其他错误直接抛出
-            import traceback
-            raise HTTPException(status_code=500, detail=traceback.format_exc())
+            # 其他错误：事务已回滚，撤销已同步的日历事件后抛出
+            logger.error(f"Failed to create order {order_data.get('id')}: {e}")
+            if calendar_event_id:
+                from services.google_calendar import delete_calendar_event
+                delete_calendar_event(calendar_event_id)
+            raise HTTPException(status_code=500, detail=f"Failed to create order: {e}")
+
+        if not created.get('customer_id'):
+            customer_id = await link_new_customer(created)
+            if customer_id:
+                created['customer_id'] = customer_id
+
+        # 订单变动影响食材需求计算
+        invalidate_requirements_cache()
+
+        # GoEasy Notification
+        await notify_order_update(created, action="create")
+
+        # Record Audit
+        await record_audit(
+            actor_id=current_user.get("id"),
+            actor_role=current_user.get("role"),
+            action=AuditActions.ORDER_CREATE,
+            target=created["id"],
+            detail=build_create_detail({**order_data, "items": items})
+        )
+
+        return created
 
     raise HTTPException(status_code=500, detail="Order creation failed after max retries")
 
@@ -300,8 +272,10 @@ async def update_order(
         old_res = await run_in_threadpool(
             supabase.table("orders").select("*").eq("id", order_id).execute
         )
-        old_cal_id = old_res.data[0].get("calendar_event_id") if old_res.data else None
+        old_order = old_res.data[0] if old_res.data else {}
+        old_cal_id = old_order.get("calendar_event_id")
     except Exception:
+        old_order = {}
         old_cal_id = None
     
     # Sync with calendar
@@ -314,47 +288,58 @@ async def update_order(
     except Exception as e:
         print(f"Calendar sync failed during update: {e}")
 
-    max_retries = 10
-    import re
-    for attempt in range(max_retries):
-        try:
-            response = await run_in_threadpool(
-                supabase.table("orders").update(order_data).eq("id", order_id).execute
-            )
+    # 明细只写入 order_items，orders.items 由数据库投影生成
+    items = order_data.pop("items", None)
+
+    if items is not None:
+        # 表头与明细在同一个事务内写入
+        updated_order = await _update_with_items(order_id, order_data, items)
+    else:
+        updated_order = None
+        max_retries = 10
+        import re
+        for attempt in range(max_retries):
+            try:
+                if order_data:
+                    response = await run_in_threadpool(
+                        supabase.table("orders").update(order_data).eq("id", order_id).execute
+                    )
+                else:
+                    response = await run_in_threadpool(
+                        supabase.table("orders").select("*").eq("id", order_id).execute
+                    )
+            except Exception as e:
+                err_msg = str(e)
+                match = re.search(r"Could not find the '(\w+)' column", err_msg)
+                if match:
+                    bad_col = match.group(1)
+                    order_data.pop(bad_col, None)
+                    continue
+                import traceback
+                raise HTTPException(status_code=500, detail=traceback.format_exc())
             if not response.data:
                 raise HTTPException(status_code=404, detail="Order not found or update failed")
-            
-            # GoEasy Notification
-            from services.goeasy import notify_order_update
-            await notify_order_update(response.data[0], action="update")
-            
-            # Sync items if provided
-            if "items" in order_data:
-                await _sync_items_to_table(order_id, order_data["items"])
-            
-            # Record Audit
-            await record_audit(
-                actor_id=current_user.get("id"),
-                actor_role=current_user.get("role"),
-                action=AuditActions.ORDER_UPDATE,
-                target=order_id,
-                detail=order_data
-            )
-            
-            return response.data[0]
-        except HTTPException:
-            raise
-        except Exception as e:
-            err_msg = str(e)
-            match = re.search(r"Could not find the '(\w+)' column", err_msg)
-            if match:
-                bad_col = match.group(1)
-                order_data.pop(bad_col, None)
-                continue
-            import traceback
-            raise HTTPException(status_code=500, detail=traceback.format_exc())
+            updated_order = response.data[0]
+            break
+        if updated_order is None:
+            raise HTTPException(status_code=500, detail="Order update failed after max retries")
+
+    invalidate_requirements_cache()
+
+    # GoEasy Notification
+    from services.goeasy import notify_order_update
+    await notify_order_update(updated_order, action="update")
+
+    # Record Audit
+    await record_audit(
+        actor_id=current_user.get("id"),
+        actor_role=current_user.get("role"),
+        action=AuditActions.ORDER_UPDATE,
+        target=order_id,
+        detail=build_diff_detail(old_order, order_data if items is None else {**order_data, "items": items})
+    )
 
-    raise HTTPException(status_code=500, detail="Order update failed after max retries")
+    return updated_order
 
 @router.patch("/{order_id:path}/approve")
 async def approve_order(
@@ -429,6 +414,9 @@ async def update_order_status(
             raise HTTPException(status_code=404, detail=f"Order {order_id} not found in database")
         raise HTTPException(status_code=403, detail=f"Permission denied or update failed. DB Error: {getattr(response, 'error', 'None')}")
     
+    # 取消订单会改变需求计算范围
+    invalidate_requirements_cache()
+
     # GoEasy Notification
     from services.goeasy import notify_order_update
     await notify_order_update(response.data[0], action="status_update")
@@ -644,6 +632,8 @@ async def partial_update_order(
     if new_cal_id:
         update_data['calendar_event_id'] = new_cal_id
 
+    items = update_data.pop("items", None)
+
     # Determine Audit Action
     audit_action = AuditActions.ORDER_UPDATE
     if "driverId" in update_data:
@@ -653,17 +643,20 @@ async def partial_update_order(
             audit_action = AuditActions.ORDER_ASSIGN_DRIVER
 
     # Write to DB (single write, includes start_time if automated)
-    response = await run_in_threadpool(
-        supabase.table("orders").update(update_data).eq("id", order_id).execute
-    )
-    if not response.data:
-        raise HTTPException(status_code=404, detail="Update failed")
-
-    updated_order = response.data[0]
+    if items is not None:
+        # 明细只写入 order_items，与表头在同一个事务内写入，orders.items 由数据库投影生成
+        updated_order = await _update_with_items(order_id, update_data, items)
+    elif update_data:
+        response = await run_in_threadpool(
+            supabase.table("orders").update(update_data).eq("id", order_id).execute
+        )
+        if not response.data:
+            raise HTTPException(status_code=404, detail="Update failed")
+        updated_order = response.data[0]
+    else:
+        updated_order = old_order
 
-    # Sync items if provided in partial update
-    if "items" in update_data:
-        await _sync_items_to_table(order_id, update_data["items"])
+    invalidate_requirements_cache()
 
     # GoEasy Notification — triggers kitchen & driver page refresh
     from services.goeasy import notify_order_update
@@ -675,7 +668,7 @@ async def partial_update_order(
         actor_role=current_user.get("role"),
         action=audit_action,
         target=order_id,
-        detail={**update_data, "automated": is_automated}
+        detail=build_diff_detail(old_order, update_data if items is None else {**update_data, "items": items}, automated=is_automated)
     )
 
     return updated_order
@@ -716,6 +709,8 @@ async def delete_order(
     # 4. Cleanup external resources (Calendar)
     if res.data and res.data[0].get("calendar_event_id"):
         delete_calendar_event(res.data[0]["calendar_event_id"])
+
+    invalidate_requirements_cache()
         
     # 5. GoEasy Notification
     from services.goeasy import publish_message
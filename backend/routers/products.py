@@ -1,5 +1,8 @@
-from fastapi import APIRouter, File, UploadFile
+from fastapi import APIRouter, File, UploadFile, Header, Response, Query, Form
 from typing import List, Optional
+import hashlib
+import json
+import time
 from database import supabase
 from models import Product
 from pydantic import BaseModel
@@ -8,6 +11,8 @@ from middleware.auth import require_admin, get_current_user
 from services.audit import record_audit, AuditActions
 from fastapi import Depends
 from fastapi.concurrency import run_in_threadpool
+from services.image_variants import generate_variants, content_key, variant_path, with_display_image, VARIANT_WIDTHS
+import asyncio
 
 router = APIRouter(
     prefix="/products",
@@ -24,17 +29,86 @@ class ProductCreate(BaseModel):
     price: Optional[float] = None   # 价格选填，可为空
     category: Optional[str] = None
     image_url: Optional[str] = None
+    image_variants: Optional[dict] = None
 
 
-@router.get("", response_model=List[Product])
-async def get_products():
-    """读取所有产品，无须鉴权，供前端与厨房读取"""
+# 菜单快照：按 menu_version 缓存预序列化的 JSON，版本号最多每隔几秒校验一次
+MENU_VERSION_CHECK_SECONDS = 5
+# products 为校验后的行；bodies 按图片尺寸缓存 {variant: (etag, body)}
+_menu_snapshot: dict = {"version": None, "products": None, "bodies": {}, "checked_at": 0.0}
+
+
+async def _read_menu_version() -> Optional[str]:
+    try:
+        res = await run_in_threadpool(
+            supabase.table("system_config").select("value").eq("key", "menu_version").execute
+        )
+        if res.data:
+            return (res.data[0].get("value") or {}).get("version")
+    except Exception as e:
+        print("Failed to read menu version:", e)
+    return None
+
+
+async def _get_menu_snapshot() -> dict:
+    """返回当前菜单快照；仅当 menu_version 变化（或尚未加载）时重新读取 products 表"""
+    now = time.monotonic()
+    if _menu_snapshot["products"] is not None and now - _menu_snapshot["checked_at"] < MENU_VERSION_CHECK_SECONDS:
+        return _menu_snapshot
+
+    version = await _read_menu_version()
+    if _menu_snapshot["products"] is not None and version is not None and version == _menu_snapshot["version"]:
+        _menu_snapshot["checked_at"] = now
+        return _menu_snapshot
+
     response = await run_in_threadpool(supabase.table("products").select("*").execute)
-    return response.data
+    _menu_snapshot.update({
+        "version": version,
+        "products": [Product.model_validate(row).model_dump(mode="json") for row in (response.data or [])],
+        "bodies": {},
+        "checked_at": now,
+    })
+    return _menu_snapshot
+
+
+def _serialize_snapshot(snapshot: dict, variant: str) -> tuple[str, bytes]:
+    """按图片尺寸序列化并缓存快照，同一版本只序列化一次"""
+    cached = snapshot["bodies"].get(variant)
+    if cached:
+        return cached
+    products = [with_display_image(p, variant) for p in snapshot["products"]]
+    body = json.dumps(products, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+    snapshot["bodies"][variant] = (etag, body)
+    return etag, body
+
+
+@router.get("", response_model=List[Product])
+async def get_products(
+    variant: str = Query("card", description="列表图片尺寸: thumb / card / full"),
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    读取所有产品，无须鉴权，供前端与厨房读取。
+    image_url 始终是原图（管理端编辑表单会原样回写）；image_src 为 variant 指定尺寸的图片，
+    image_srcset 列出全部尺寸，浏览器可按显示宽度自行选择最小的合适图片。
+    支持 ETag / If-None-Match：菜单未变化时返回 304，不重复传输。
+    """
+    if variant not in VARIANT_WIDTHS:
+        from fastapi import HTTPException
+        raise HTTPException(status_code=400, detail=f"variant must be one of {', '.join(VARIANT_WIDTHS)}")
+
+    snapshot = await _get_menu_snapshot()
+    etag, body = _serialize_snapshot(snapshot, variant)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 async def bump_menu_version():
-    """辅助函数：变动时更新系统配置的菜单版本号"""
+    """辅助函数：变动时更新系统配置的菜单版本号，并使本进程的菜单快照失效"""
+    _menu_snapshot["products"] = None
     try:
         await run_in_threadpool(
             supabase.table("system_config").upsert({
@@ -102,28 +176,69 @@ async def update_product(
     return response.data[0]
 
 
-@router.post("/upload")
-async def upload_product_image(file: UploadFile = File(...)):
-    """
-    Backend endpoint to handle image uploads and bypass RLS.
-    """
-    contents = await file.read()
-    file_ext = file.filename.split('.')[-1] if file.filename and '.' in file.filename else 'jpg'
-    path = f"products/{uuid.uuid4()}.{file_ext}"
-    
+async def _upload_to_storage(path: str, contents: bytes, content_type: str) -> str:
     # Upload to Supabase Storage using service_role using threadpool for sync storage calls
     await run_in_threadpool(
         supabase.storage.from_("delivery-photos").upload,
         path=path,
         file=contents,
-        file_options={"content-type": file.content_type, "upsert": "true"}
+        file_options={"content-type": content_type, "upsert": "true"}
     )
-    
-    # Get public URL
-    public_url = await run_in_threadpool(
+    return await run_in_threadpool(
         supabase.storage.from_("delivery-photos").get_public_url, path
     )
-    return {"url": public_url}
+
+
+@router.post("/upload")
+async def upload_product_image(
+    file: UploadFile = File(...),
+    product_id: Optional[str] = Form(None),
+    current_user: dict = Depends(require_admin)
+):
+    """
+    Backend endpoint to handle image uploads and bypass RLS.
+    原图原样保存并作为 image_url；另生成 thumb / card / full 三种尺寸放在 image_variants，
+    均按内容哈希存放。管理端在保存产品时一并提交返回的 url 与 variants；
+    传入 product_id 时直接写回该产品。
+    """
+    contents = await file.read()
+    file_ext = file.filename.split('.')[-1] if file.filename and '.' in file.filename else 'jpg'
+    variants = await generate_variants(contents)
+
+    if variants is None:
+        # 无法生成变体（Pillow 缺失或非图片）时保留原有行为：只存原图
+        path = f"products/{uuid.uuid4()}.{file_ext}"
+        public_url = await _upload_to_storage(path, contents, file.content_type)
+        image_variants = None
+    else:
+        key = content_key(contents)
+        names = list(variants.keys())
+        public_url, *urls = await asyncio.gather(
+            _upload_to_storage(f"products/{key}/original.{file_ext}", contents, file.content_type),
+            *[
+                _upload_to_storage(variant_path(key, name), variants[name], "image/webp")
+                for name in names
+            ]
+        )
+        image_variants = dict(zip(names, urls))
+
+    if product_id:
+        update = {"image_url": public_url}
+        if image_variants:
+            update["image_variants"] = image_variants
+        await run_in_threadpool(
+            supabase.table("products").update(update).eq("id", product_id).execute
+        )
+        await bump_menu_version()
+        await record_audit(
+            actor_id=current_user.get("id"),
+            actor_role=current_user.get("role"),
+            action=AuditActions.PRODUCT_UPDATE,
+            target=product_id,
+            detail=update
+        )
+
+    return {"url": public_url, "variants": image_variants}
 
 
 @router.delete("/{product_id}")
@@ -6,6 +6,7 @@ from models import Recipe
 import uuid
 from middleware.auth import require_admin, get_current_user
 from services.audit import record_audit, AuditActions
+from services.ingredient_planner import invalidate_requirements_cache
 from fastapi import Depends
 
 router = APIRouter(
@@ -37,6 +38,7 @@ async def create_recipe(
     response = await run_in_threadpool(supabase.table("recipes").insert(data).execute)
     if not response.data:
         raise HTTPException(status_code=400, detail="Could not create recipe")
+    invalidate_requirements_cache()
         
     await record_audit(
         actor_id=current_user.get("id"),
@@ -66,6 +68,7 @@ async def update_recipe(
     )
     if not response.data:
         raise HTTPException(status_code=404, detail="Recipe not found")
+    invalidate_requirements_cache()
         
     await record_audit(
         actor_id=current_user.get("id"),
@@ -85,6 +88,7 @@ async def delete_recipe(
     response = await run_in_threadpool(
         supabase.table("recipes").delete().eq("id", recipe_id).execute
     )
+    invalidate_requirements_cache()
     
     await record_audit(
         actor_id=current_user.get("id"),
@@ -12,9 +12,13 @@ from models import (
     AuditLog, StatsOverview, Order, User,
 )
 from services.audit import record_audit, AuditActions
+from services.user_directory import user_directory
+from services.fast_json import json_response
+from services.analytics import (
+    aggregate_stats_overview, aggregate_financials, aggregate_ai_summary, ai_summary_windows,
+)
 from middleware.auth import require_super_admin, require_admin
-from datetime import datetime, timezone, timedelta
-import dateutil.parser
+from datetime import datetime, timezone
 
 logger = logging.getLogger(__name__)
 
@@ -45,104 +49,11 @@ async def get_stats_overview(
         .execute
     )
     all_orders_data = all_orders_resp.data or []
+    stats = aggregate_stats_overview(all_orders_data, datetime.now(timezone.utc))
 
-    # Business Timezone: GMT+8
-    now_utc = datetime.now(timezone.utc)
-    now_biz = now_utc + timedelta(hours=8)
-    now_naive = now_biz.replace(tzinfo=None)
-    today_str = now_naive.strftime("%Y-%m-%d")
-    month_ago = now_naive - timedelta(days=31)
-
-    total_orders = len(all_orders_data)
-    total_revenue = 0.0
-    today_orders = 0
-    today_revenue = 0.0
-    month_orders = 0
-    month_revenue = 0.0
-    total_unpaid = 0.0
-    
-    status_counts: dict[str, int] = {}
-
-    def get_field(obj, *keys):
-        for k in keys:
-            if k in obj: return obj[k]
-        return None
-
-    for o in all_orders_data:
-        # Status count (Normalized to lowercase for frontend mapping)
-        s = str(o.get("status", "unknown")).lower()
-        status_counts[s] = status_counts.get(s, 0) + 1
-        
-        # Amount extraction
-        amt = float(get_field(o, "amount", "Amount") or 0.0)
-        bal = float(get_field(o, "balance", "Balance") or 0.0)
-        total_revenue += amt
-        total_unpaid += bal
-
-        # Date parsing
-        due_raw = get_field(o, "dueTime", "duetime")
-        ca_raw = get_field(o, "created_at", "createdAt")
-        dt = None
-        try:
-            if due_raw: dt = dateutil.parser.parse(str(due_raw))
-            elif ca_raw: dt = dateutil.parser.parse(str(ca_raw))
-        except: continue
-        if not dt: continue
-
-        dt_naive = dt.replace(tzinfo=None)
-        dt_str = dt_naive.strftime("%Y-%m-%d")
-        
-        # Today calculation
-        is_today = (dt_str == today_str)
-        if is_today:
-            today_orders += 1
-            today_revenue += amt 
-            
-        # Month calculation (Last 31 days)
-        if dt_naive >= month_ago:
-            month_orders += 1
-            month_revenue += amt
-
-    # Ensure Recent Activity shows the latest 20 orders by sorting descending
-    all_orders_data.sort(key=lambda x: str(x.get('created_at', '')), reverse=True)
-
-    # Monthly sales history (Last 12 months)
-    # buckets[0] is 11 months ago, buckets[11] is current month
-    buckets = [0.0] * 12
-    for o in all_orders_data:
-        amt = float(get_field(o, "amount", "Amount") or 0.0)
-        due_raw = get_field(o, "dueTime", "duetime")
-        ca_raw = get_field(o, "created_at", "createdAt")
-        dt = None
-        try:
-            if due_raw: dt = dateutil.parser.parse(str(due_raw))
-            elif ca_raw: dt = dateutil.parser.parse(str(ca_raw))
-        except: continue
-        if not dt: continue
-        dt_naive = dt.replace(tzinfo=None)
-        
-        # Calculate month offset relative to current month (0 = current, 1 = last month, ...)
-        month_diff = (now_naive.year - dt_naive.year) * 12 + (now_naive.month - dt_naive.month)
-        if 0 <= month_diff < 12:
-            buckets[11 - month_diff] = round(buckets[11 - month_diff] + amt, 2)
-    
     # 拉取用户总数
-    users_resp = await run_in_threadpool(supabase.table("users").select("id", count="exact").execute)
-    total_users = users_resp.count if hasattr(users_resp, "count") else len(users_resp.data or [])
-
-    return {
-        "total_orders": total_orders,
-        "total_revenue": total_revenue,
-        "today_orders": today_orders,
-        "today_revenue": round(today_revenue, 2),
-        "month_revenue": round(month_revenue, 2),
-        "month_orders": month_orders,
-        "total_users": total_users,
-        "total_unpaid": round(total_unpaid, 2),
-        "orders_by_status": status_counts,
-        "recent_orders": all_orders_data[:20],
-        "monthly_sales": buckets
-    }
+    stats["total_users"] = len(await user_directory.all())
+    return json_response(StatsOverview, stats)
 
 
 # ═══════════════════════════════════════════
@@ -156,9 +67,7 @@ async def list_all_users(
     """
     获取所有用户列表
     """
-    from fastapi.concurrency import run_in_threadpool
-    response = await run_in_threadpool(supabase.table("users").select("*").execute)
-    return response.data or []
+    return await user_directory.all()
 
 
 @router.patch("/users/{user_id}")
@@ -217,6 +126,7 @@ async def update_user(
             raise HTTPException(status_code=404, detail="User not found in business table")
     except Exception as db_err:
         raise HTTPException(status_code=500, detail=f"Database update failed: {str(db_err)}")
+    user_directory.upsert(response.data[0])
 
     # GoEasy Notification
     from services.goeasy import publish_message
@@ -281,6 +191,9 @@ async def delete_user(
     except Exception as e:
         print(f"Warning: Failed to cleanup vehicle resources during hard-delete for user {user_id}: {e}")
 
+    from routers.vehicles import invalidate_fleet_status_cache
+    invalidate_fleet_status_cache()
+
     # 1. 从 Supabase Auth 系统彻底删除账号
     try:
         await run_in_threadpool(supabase.auth.admin.delete_user, user_id)
@@ -290,6 +203,7 @@ async def delete_user(
 
     # 2. 从业务数据库 users 表中删除
     response = await run_in_threadpool(supabase.table("users").delete().eq("id", user_id).execute)
+    user_directory.remove(user_id)
 
     await record_audit(
         actor_id=current_user.get("id"),
@@ -387,12 +301,20 @@ async def get_audit_logs(
     page_size: int = Query(20, ge=1, le=100, description="每页条数"),
     action: Optional[str] = Query(None, description="操作类型筛选"),
     search: Optional[str] = Query(None, description="搜索关键词 (Target 或 Actor ID)"),
+    start_date: Optional[str] = Query(None, description="起始日期 (YYYY-MM-DD)"),
+    end_date: Optional[str] = Query(None, description="结束日期 (YYYY-MM-DD)"),
+    include_archive: bool = Query(False, description="是否同时读取已归档的历史日志"),
     current_user: dict = Depends(require_super_admin),
 ):
     """
-    分页查询审计日志，支持操作类型筛选和关键字搜索，按时间倒序
+    分页查询审计日志，支持操作类型筛选和关键字搜索，按时间倒序。
+    include_archive=true 时，在热表数据之后无缝衔接本地归档分段中的更早记录。
     """
+    from fastapi.concurrency import run_in_threadpool
+    from services.audit_archive import read_archived_logs
+
     offset = (page - 1) * page_size
+    end_bound = f"{end_date}T23:59:59.999999" if end_date else None
 
     query = supabase.table("audit_logs").select("*", count="exact")
     
@@ -404,7 +326,11 @@ async def get_audit_logs(
         # but we can use 'or' method with a string filter
         query = query.or_(f"target.ilike.%{search}%,actor_id.ilike.%{search}%")
 
-    from fastapi.concurrency import run_in_threadpool
+    if start_date:
+        query = query.gte("created_at", start_date)
+    if end_bound:
+        query = query.lte("created_at", end_bound)
+
     response = await run_in_threadpool(
         query.order("created_at", desc=True)
         .range(offset, offset + page_size - 1)
@@ -414,17 +340,27 @@ async def get_audit_logs(
     data = response.data or []
     total = response.count if hasattr(response, "count") and response.count is not None else 0
 
+    # 归档行均早于热表中的行，因此按倒序排列时直接拼接在热表之后
+    if include_archive:
+        archive_offset = max(0, offset - total)
+        archive_limit = page_size - len(data)
+        archived, archived_total = await run_in_threadpool(
+            read_archived_logs,
+            archive_offset,
+            archive_limit,
+            action,
+            search,
+            start_date,
+            end_bound,
+        )
+        data.extend(archived)
+        total += archived_total
+
     # 尝试关联查询操作人信息
     actor_ids = list(set(row.get("actor_id") for row in data if row.get("actor_id")))
     if actor_ids:
         try:
-            users_resp = await run_in_threadpool(
-                supabase.table("users")
-                .select("id, name, email")
-                .in_("id", actor_ids)
-                .execute
-            )
-            user_map = {u["id"]: u for u in (users_resp.data or [])}
+            user_map = await user_directory.get_many(actor_ids)
             for row in data:
                 u = user_map.get(row.get("actor_id"))
                 if u:
@@ -442,6 +378,53 @@ async def get_audit_logs(
     }
 
 
+@router.get("/audit-logs/history/{target:path}")
+async def get_audit_history(
+    target: str,
+    current_user: dict = Depends(require_super_admin),
+):
+    """
+    回放某个目标（如订单 ID）的全部审计记录，返回每一步之后的完整状态
+    """
+    from fastapi.concurrency import run_in_threadpool
+    from services.audit import reconstruct_history
+
+    response = await run_in_threadpool(
+        supabase.table("audit_logs")
+        .select("*")
+        .eq("target", target)
+        .order("created_at", desc=False)
+        .execute
+    )
+    return reconstruct_history(response.data or [])
+
+
+@router.post("/audit-logs/archive")
+async def archive_audit_logs(
+    retention_days: int = Query(90, ge=1, description="热表保留天数，更早的日志将被归档"),
+    current_user: dict = Depends(require_super_admin),
+):
+    """
+    将超过保留期的审计日志归档到本地压缩分段，并从 audit_logs 热表中移除
+    """
+    from fastapi.concurrency import run_in_threadpool
+    from services.audit_archive import archive_audit_logs as run_archive
+
+    try:
+        result = await run_in_threadpool(run_archive, retention_days)
+    except Exception as e:
+        logger.error(f"Audit log archival failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Archival failed: {str(e)}")
+
+    await record_audit(
+        actor_id=current_user.get("id"),
+        actor_role=current_user.get("role"),
+        action=AuditActions.AUDIT_ARCHIVE,
+        detail=result,
+    )
+    return result
+
+
 # ═══════════════════════════════════════════
 # 5. 全局订单监控与审批
 # ═══════════════════════════════════════════
@@ -480,14 +463,6 @@ async def get_financials(
     统一逻辑：使用 dueTime 作为交付日期过滤。
     """
     from fastapi.concurrency import run_in_threadpool
-    from datetime import datetime, timezone, timedelta
-    import dateutil.parser
-
-    # Business Timezone: GMT+8
-    now_utc = datetime.now(timezone.utc)
-    now_biz = now_utc + timedelta(hours=8)
-    now_naive = now_biz.replace(tzinfo=None)
-    today_str = now_naive.strftime("%Y-%m-%d")
 
     # Fetch orders without a restrictive created_at filter to avoid format mismatch issues.
     # We rely on Python logic (is_in_period) to filter the results.
@@ -499,80 +474,7 @@ async def get_financials(
     
     response = await run_in_threadpool(query.execute)
     all_orders = response.data or []
-
-    period_revenue = 0
-    period_order_count = 0
-    today_revenue = 0
-    today_order_count = 0
-    pm_stats: dict = {}
-
-    # Defensive helper to get values regardless of case
-    def get_field(obj, *keys):
-        for k in keys:
-            if k in obj: return obj[k]
-        return None
-
-    for o in all_orders:
-        amount = float(get_field(o, "amount", "Amount") or 0.0)
-        payment_received = float(get_field(o, "payment_received", "paymentReceived") or 0.0)
-        p_status = str(get_field(o, "paymentStatus", "paymentstatus", "payment_status") or "").lower()
-        p_method = str(get_field(o, "paymentMethod", "paymentmethod", "payment_method") or "cash").lower()
-        
-        # NOTE: 统一使用 created_at（下单日期）作为月份归类的基准
-        # 优先使用 created_at，与前端表格过滤逻辑保持一致
-        created_at_raw = get_field(o, "created_at", "createdAt")
-        due_time_raw = get_field(o, "dueTime", "duetime", "due_time")
-        
-        # Robust Date Parsing - Using the more flexible dateutil.parser.parse
-        dt = None
-        try:
-            if created_at_raw:
-                dt = dateutil.parser.parse(str(created_at_raw))
-            elif due_time_raw:
-                dt = dateutil.parser.parse(str(due_time_raw))
-        except:
-            continue
-            
-        if not dt: continue
-        
-        # Use the business-aware dates defined outside the loop (now_naive, today_str)
-        dt_naive = dt.replace(tzinfo=None)
-        dt_str = dt_naive.strftime("%Y-%m-%d")
-        is_today = (dt_str == today_str)
-        is_in_period = False
-        
-        if range == "today":
-            is_in_period = is_today
-        elif range == "month":
-            # NOTE: 使用自然月（本月1日起），而不是过去31天
-            # 这样确保统计数字与前端 MONTH 过滤的表格完全一致
-            is_in_period = (dt_naive.year == now_naive.year and dt_naive.month == now_naive.month)
-        else: # all
-            is_in_period = True
-            
-        # 1. Main Metrics
-        if is_today:
-            today_revenue += amount
-            today_order_count += 1
-            
-        if is_in_period:
-            period_revenue += amount
-            period_order_count += 1
-            
-            # 2. Collection Stats (The core "Collection Data")
-            # Logic: Use payment_received, but fallback to amount if status is paid
-            actual_payment = payment_received
-            if actual_payment == 0 and p_status == 'paid':
-                actual_payment = amount
-                
-            if actual_payment > 0:
-                if p_method not in pm_stats:
-                    pm_stats[p_method] = {"method": p_method, "amount": 0.0, "count": 0}
-                pm_stats[p_method]["amount"] = round(pm_stats[p_method]["amount"] + actual_payment, 2)
-                pm_stats[p_method]["count"] += 1
-        
-
-        # (End of order loop)
+    summary = aggregate_financials(all_orders, range, datetime.now(timezone.utc))
 
     # Global Unpaid Total: SUM(balance)
     unpaid_query = supabase.table("orders").select("balance").neq("status", "cancelled").gt("balance", 0)
@@ -580,14 +482,7 @@ async def get_financials(
     unpaid_orders = unpaid_response.data or []
     total_unpaid_balance = sum(round(float(uo.get("balance") or 0.0), 2) for uo in unpaid_orders)
 
-    return {
-        "periodRevenue": round(period_revenue, 2),
-        "periodOrders": period_order_count,
-        "todayRevenue": round(today_revenue, 2),
-        "todayOrders": today_order_count,
-        "totalUnpaidBalance": round(total_unpaid_balance, 2),
-        "collections": list(pm_stats.values()),
-    }
+    return {**summary, "totalUnpaidBalance": round(total_unpaid_balance, 2)}
 @router.get("/ai-summary")
 async def get_ai_summary(
     current_user: dict = Depends(require_admin),
@@ -596,118 +491,28 @@ async def get_ai_summary(
     AI 营业额监督助手：分析波动、预测趋势、检测异常
     """
     from fastapi.concurrency import run_in_threadpool
-    from datetime import datetime, timezone, timedelta
-    import dateutil.parser
-    import calendar
 
     now = datetime.now(timezone.utc)
-    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    # 1. 获取过去 14 天的所有已完成订单用于计算平均值 (增加窗口冗余)
-    history_start = today_start - timedelta(days=14)
+    windows = ai_summary_windows(now)
+
+    # 1. 过去 14 天的订单用于计算日均营收
     history_resp = await run_in_threadpool(
         supabase.table("orders")
         .select("amount, dueTime, created_at, paymentStatus, payment_received")
-        .gte("created_at", history_start.isoformat())
+        .gte("created_at", windows["history_start"].isoformat())
         .neq("status", "cancelled")
         .execute
     )
-    history_orders = history_resp.data or []
-    
-    daily_revenue = {}
-    for o in history_orders:
-        payment = o.get("payment_received") or 0.0
-        if payment <= 0: continue
-        
-        try:
-            dt_str = o.get("dueTime") or o.get("created_at")
-            dt = dateutil.parser.isoparse(dt_str).strftime("%Y-%m-%d")
-            daily_revenue[dt] = daily_revenue.get(dt, 0) + payment
-        except: continue
-
-    # 计算 7 天平均值 (不含今天)
-    today_str = now.strftime("%Y-%m-%d")
-    other_days_revenue = [v for k, v in daily_revenue.items() if k != today_str]
-    avg_7d = sum(other_days_revenue) / len(other_days_revenue) if other_days_revenue else 0
-    today_rev = daily_revenue.get(today_str, 0)
-
-    # 2. 计算月度环比增长 (MTD vs Last Month MTD)
-    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    # 上月同期起点与终点
-    last_month_end = (month_start - timedelta(days=1)).replace(day=now.day, hour=23, minute=59, second=59)
-    # 处理日期溢出（例如 3月31日对应2月28/29日）
-    last_month_days = calendar.monthrange((month_start - timedelta(days=1)).year, (month_start - timedelta(days=1)).month)[1]
-    if now.day > last_month_days:
-        last_month_end = last_month_end.replace(day=last_month_days)
-    
-    last_month_start = last_month_end.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
 
-    # 获取本月至今与上月同期的订单
+    # 2. 本月至今与上月同期的订单
     comparison_resp = await run_in_threadpool(
         supabase.table("orders")
         .select("amount, paymentStatus, payment_received, created_at")
-        .gte("created_at", last_month_start.isoformat())
+        .gte("created_at", windows["last_month_start"].isoformat())
         .neq("status", "cancelled")
         .execute
     )
-    comp_orders = comparison_resp.data or []
-    
-    mtd_rev = 0
-    last_mtd_rev = 0
-    
-    for o in comp_orders:
-        amt = float(o.get("amount") or 0.0)
-        pay = float(o.get("payment_received") or 0.0)
-        
-        ca = dateutil.parser.isoparse(o.get("created_at"))
-        if ca >= month_start:
-            mtd_rev += pay
-        elif last_month_start <= ca <= last_month_end:
-            last_mtd_rev += pay
-
-    # 3. 线性预测本月总额
-    days_in_month = calendar.monthrange(now.year, now.month)[1]
-    predicted_total = (mtd_rev / now.day) * days_in_month if now.day > 0 else 0
-
-    # 4. 异常检测：高额未付订单 (> RM 500)
-    unpaid_high_value = [o for o in comp_orders if dateutil.parser.isoparse(o.get("created_at")) >= month_start and o.get("paymentStatus") != "paid" and float(o.get("amount", 0)) > 500]
-
-    # 5. 波动预警与分析
-    warnings = []
-    if avg_7d > 0 and today_rev < (avg_7d * 0.3):
-        warnings.append({
-            "type": "low_revenue",
-            "message": f"今日营收 (RM {today_rev:.2f}) 低于过去 7 天平均水平的 30%，建议检查运营。",
-            "severity": "warning"
-        })
-    
-    if last_mtd_rev > 0 and mtd_rev < last_mtd_rev * 0.8:
-        warnings.append({
-            "type": "mtd_decline",
-            "message": f"本月进度 (RM {mtd_rev:.2f}) 较上月同期 (RM {last_mtd_rev:.2f}) 落后超过 20%。",
-            "severity": "info"
-        })
 
-    return {
-        "today_vs_avg": {
-            "today": today_rev,
-            "avg_7d": avg_7d,
-            "ratio": (today_rev / avg_7d) if avg_7d > 0 else 1
-        },
-        "monthly_growth": (mtd_rev - last_mtd_rev) / last_mtd_rev if last_mtd_rev > 0 else 0,
-        "prediction": {
-            "current": mtd_rev,
-            "predicted": predicted_total,
-            "days_passed": now.day,
-            "total_days": days_in_month
-        },
-        "anomalies": [
-            {
-                "id": f"KM-{now.strftime('%y%m')}-XXX",
-                "amount": float(o.get("amount", 0)),
-                "status": "unpaid"
-            } for o in unpaid_high_value[:3]
-        ],
-        "warnings": warnings
-    }
+    return aggregate_ai_summary(history_resp.data or [], comparison_resp.data or [], now)
 
 
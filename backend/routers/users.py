@@ -4,6 +4,7 @@ from typing import List
 from database import supabase
 from models import User, UserRole
 from fastapi.concurrency import run_in_threadpool
+from services.user_directory import user_directory
 
 logger = logging.getLogger(__name__)
 
@@ -14,30 +15,28 @@ router = APIRouter(
 
 @router.get("/", response_model=List[User])
 async def get_users():
-    response = await run_in_threadpool(supabase.table("users").select("*").execute)
-    return response.data
+    return await user_directory.all()
 
 @router.get("/{user_id}", response_model=User)
 async def get_user(user_id: str):
-    response = await run_in_threadpool(supabase.table("users").select("*").eq("id", user_id).execute)
-    if not response.data:
+    user = await user_directory.get(user_id)
+    if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return response.data[0]
+    return user
 
 # Simple login simulation by checking email/role exists
 @router.post("/login")
 async def login(email: str, role: UserRole):
     # In a real app, use Supabase Auth (GoTrue).
     # Here we just check if a user with this email and role exists in our 'users' table
-    response = await run_in_threadpool(
-        supabase.table("users").select("*").eq("email", email).eq("role", role).execute
-    )
-    if not response.data:
+    user = await user_directory.by_email(email)
+    if not user or user.get("role") != role:
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    return response.data[0]
+    return user
 
 
-from middleware.auth import get_current_user
+from middleware.auth import get_current_user, require_admin
+from services import presence
 
 @router.get("/me/profile", response_model=User)
 async def get_current_user_profile(
@@ -48,16 +47,37 @@ async def get_current_user_profile(
     后端使用 service_role key 绕过 RLS 限制。
     """
     user_id = current_user.get("id")
-    response = await run_in_threadpool(supabase.table("users").select("*").eq("id", user_id).execute)
-    if not response.data:
+    user_data = await user_directory.get(user_id)
+    if not user_data:
         raise HTTPException(status_code=404, detail="User not found in database")
     
-    user_data = response.data[0]
     logger.info(f"[Auth] Profile fetch for {user_id}: Role={user_data.get('role')}, Permissions={user_data.get('permissions')}")
     
     return user_data
 
 
+@router.post("/me/heartbeat")
+async def send_heartbeat(current_user: dict = Depends(get_current_user)):
+    """
+    司机端在线心跳，仅更新内存；上线/离线切换时才写库并推送
+    """
+    await presence.heartbeat(current_user.get("id"))
+    return {"online": True, "timeout_seconds": presence.HEARTBEAT_TIMEOUT_SECONDS}
+
+
+@router.post("/me/offline")
+async def send_offline(current_user: dict = Depends(get_current_user)):
+    """司机端退出登录时主动下线"""
+    await presence.go_offline(current_user.get("id"))
+    return {"online": False}
+
+
+@router.get("/presence/online")
+async def get_online_users(current_user: dict = Depends(require_admin)):
+    """当前在线用户及最近心跳时间"""
+    return presence.online_users()
+
+
 from services.audit import record_audit, AuditActions
 
 @router.patch("/me/profile", response_model=User)
@@ -74,6 +94,7 @@ async def update_current_user_profile(user_id: str, profile_data: dict):
     response = await run_in_threadpool(supabase.table("users").update(update_data).eq("id", user_id).execute)
     if not response.data:
         raise HTTPException(status_code=404, detail="User not found")
+    user_directory.upsert(response.data[0])
         
     # Record Audit (Self update)
     await record_audit(
@@ -5,15 +5,30 @@ from database import supabase
 from models import Vehicle, VehicleCreate, VehicleUpdate, DriverAssignment, DriverAssignmentBase, VehicleStatus
 from middleware.auth import require_admin, get_current_user
 from services.audit import record_audit, AuditActions
+from services.user_directory import user_directory
 from fastapi import Depends
 import datetime
+import logging
+import time
 import postgrest
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(
     prefix="/vehicles",
     tags=["vehicles"]
 )
 
+# 车队状态缓存：指派/解绑时主动失效，TTL 兜底其他入口（如用户表变更）
+FLEET_STATUS_TTL_SECONDS = 30
+_fleet_status_cache: dict = {"data": None, "expires_at": 0.0}
+
+
+def invalidate_fleet_status_cache():
+    """使车队状态缓存失效，下次请求 /vehicles/status 时重新查询"""
+    _fleet_status_cache["data"] = None
+    _fleet_status_cache["expires_at"] = 0.0
+
 @router.get("/", response_model=List[Vehicle])
 async def get_vehicles():
     """获取所有车辆信息"""
@@ -70,6 +85,7 @@ async def update_vehicle(
         )
         if not response.data:
             raise HTTPException(status_code=404, detail="Vehicle not found")
+        invalidate_fleet_status_cache()
             
         await record_audit(
             actor_id=current_user.get("id"),
@@ -102,6 +118,7 @@ async def delete_vehicle(
     )
     if not response.data:
         raise HTTPException(status_code=404, detail="Vehicle not found or already deleted")
+    invalidate_fleet_status_cache()
         
     await record_audit(
         actor_id=current_user.get("id"),
@@ -111,78 +128,61 @@ async def delete_vehicle(
     )
     return {"message": "Vehicle deleted successfully"}
 
+# RPC 抛出的业务错误 -> HTTP 响应
+_ASSIGNMENT_ERRORS = {
+    "VEHICLE_NOT_FOUND": (404, "Vehicle not found"),
+    "DRIVER_NOT_FOUND": (404, "Driver not found"),
+    "VEHICLE_BUSY": (400, "车辆已被占用 (Busy)"),
+    "VEHICLE_IN_REPAIR": (400, "车辆正在维修中 (Repair)"),
+}
+
+
+def _raise_assignment_error(e: Exception):
+    error_msg = str(e)
+    for code, (status_code, detail) in _ASSIGNMENT_ERRORS.items():
+        if code in error_msg:
+            raise HTTPException(status_code=status_code, detail=detail)
+    if "23505" in error_msg:
+        # 并发派车被唯一索引拦截
+        raise HTTPException(status_code=409, detail="车辆或司机已有进行中的指派，请刷新后重试")
+    raise HTTPException(status_code=500, detail=f"Database error: {error_msg}")
+
+
 @router.post("/assign")
 async def assign_vehicle(
     assignment: DriverAssignmentBase,
     current_user: dict = Depends(require_admin)
 ):
-    """将车辆派发给司机"""
-    # 1. 检查车辆当前状态
-    vehicle_resp = await run_in_threadpool(
-        supabase.table("vehicles").select("*").eq("id", assignment.vehicle_id).execute
-    )
-    if not vehicle_resp.data:
-        raise HTTPException(status_code=404, detail="Vehicle not found")
-    
-    vehicle = vehicle_resp.data[0]
-    if vehicle["status"] == VehicleStatus.BUSY:
-        # Check if already assigned to THIS driver
-        assign_check = await run_in_threadpool(
-            supabase.table("driver_assignments")
-            .select("*")
-            .eq("vehicle_id", assignment.vehicle_id)
-            .eq("driver_id", assignment.driver_id)
-            .eq("status", "active")
-            .execute
-        )
-        if assign_check.data:
-            return {"message": "Vehicle already assigned to you", "assignment": assign_check.data[0]}
-        raise HTTPException(status_code=400, detail="车辆已被占用 (Busy)")
-    if vehicle["status"] == VehicleStatus.REPAIR:
-        raise HTTPException(status_code=400, detail="车辆正在维修中 (Repair)")
-
-    # 2. 如果司机之前有其他活跃的分配，将其结束
-    await run_in_threadpool(
-        supabase.table("driver_assignments").update({
-            "status": "completed",
-            "returned_at": datetime.datetime.utcnow().isoformat()
-        }).eq("driver_id", assignment.driver_id).eq("status", "active").execute
-    )
-
-    # 3. 创建新的分配记录
-    assign_resp = await run_in_threadpool(
-        supabase.table("driver_assignments").insert({
-            "driver_id": assignment.driver_id,
-            "vehicle_id": assignment.vehicle_id,
-            "status": "active"
-        }).execute
-    )
-    
-    if not assign_resp.data:
-        raise HTTPException(status_code=500, detail="Failed to create assignment")
-
-    # 4. 更新车辆状态为 BUSY (已占用)
-    await run_in_threadpool(
-        supabase.table("vehicles").update({
-            "status": VehicleStatus.BUSY,
-            "updated_at": datetime.datetime.utcnow().isoformat()
-        }).eq("id", assignment.vehicle_id).execute
-    )
+    """
+    将车辆派发给司机。
+    由 assign_vehicle RPC 在单个事务内完成：锁定车辆/司机、结束旧指派、
+    创建新指派、更新车辆状态与司机冗余字段 (见 migration_v6_vehicle_assignment_rpc.sql)
+    """
+    from services.goeasy import publish_message
 
-    # 5. 更新 driver 用户档案的冗余字段（车牌、型号、类型）以保持前台列表显示一致
     try:
-        await run_in_threadpool(
-            supabase.table("users").update({
-                "vehicle_plate": vehicle["plate_no"],
-                "vehicle_model": vehicle.get("model"),
-                "vehicle_type": vehicle.get("type"),
-                "vehicle_status": "occupied"
-            }).eq("id", assignment.driver_id).execute
+        response = await run_in_threadpool(
+            supabase.rpc("assign_vehicle", {
+                "p_driver_id": assignment.driver_id,
+                "p_vehicle_id": assignment.vehicle_id,
+            }).execute
         )
     except Exception as e:
-        # Ignore errors related to missing columns (PGRST204)
-        if "PGRST204" not in str(e):
-            print(f"Warning: Failed to update user redundant fields: {e}")
+        _raise_assignment_error(e)
+
+    result = response.data or {}
+    if result.get("result") == "already_assigned":
+        return {"message": "Vehicle already assigned to you", "assignment": result.get("assignment")}
+
+    invalidate_fleet_status_cache()
+    # RPC 同时写入了司机档案中的车辆冗余字段
+    user_directory.invalidate()
+    await publish_message({
+        "type": "fleet_update",
+        "action": "assign",
+        "driverId": assignment.driver_id,
+        "vehicleId": assignment.vehicle_id,
+    })
 
     await record_audit(
         actor_id=current_user.get("id"),
@@ -192,70 +192,38 @@ async def assign_vehicle(
         detail={"driver_id": assignment.driver_id}
     )
 
-    return {"message": "Vehicle assigned successfully", "assignment": assign_resp.data[0]}
+    return {"message": "Vehicle assigned successfully", "assignment": result.get("assignment")}
 
 @router.post("/unassign/{driver_id}")
 async def unassign_vehicle(
     driver_id: str,
     current_user: dict = Depends(require_admin)
 ):
-    """解除司机的车辆绑定"""
-    # 找到该司机的活跃分配
-    assign_resp = await run_in_threadpool(
-        supabase.table("driver_assignments")
-        .select("*")
-        .eq("driver_id", driver_id)
-        .eq("status", "active")
-        .execute
-    )
-    if not assign_resp.data:
-        # 同时清理用户信息中的车辆冗余，防止数据不一致
-        try:
-            await run_in_threadpool(
-                supabase.table("users").update({
-                    "vehicle_plate": None,
-                    "vehicle_model": None,
-                    "vehicle_type": None,
-                    "vehicle_status": "idle"
-                }).eq("id", driver_id).execute
-            )
-        except Exception as e:
-            if "PGRST204" not in str(e):
-                print(f"Warning: Failed to clear user redundant fields: {e}")
-        return {"message": "No active assignments found for this driver"}
-        
-    assignment = assign_resp.data[0]
-    
-    # 结束分配
-    await run_in_threadpool(
-        supabase.table("driver_assignments").update({
-            "status": "completed",
-            "returned_at": datetime.datetime.utcnow().isoformat()
-        }).eq("id", assignment["id"]).execute
-    )
-    
-    # 将车辆状态改回 available
-    await run_in_threadpool(
-        supabase.table("vehicles").update({
-            "status": VehicleStatus.AVAILABLE,
-            "updated_at": datetime.datetime.utcnow().isoformat()
-        }).eq("id", assignment["vehicle_id"]).execute
-    )
+    """解除司机的车辆绑定（unassign_vehicle RPC，单个事务）"""
+    from services.goeasy import publish_message
 
-    # 清理用户信息中的车辆冗余
     try:
-        await run_in_threadpool(
-            supabase.table("users").update({
-                "vehicle_plate": None,
-                "vehicle_model": None,
-                "vehicle_type": None,
-                "vehicle_status": "idle"
-            }).eq("id", driver_id).execute
+        response = await run_in_threadpool(
+            supabase.rpc("unassign_vehicle", {"p_driver_id": driver_id}).execute
         )
     except Exception as e:
-        if "PGRST204" not in str(e):
-            print(f"Warning: Failed to clear user redundant fields: {e}")
-    
+        _raise_assignment_error(e)
+
+    result = response.data or {}
+    invalidate_fleet_status_cache()
+    user_directory.invalidate()
+
+    if result.get("result") != "unassigned":
+        return {"message": "No active assignments found for this driver"}
+
+    released = result.get("assignment") or {}
+    await publish_message({
+        "type": "fleet_update",
+        "action": "unassign",
+        "driverId": driver_id,
+        "vehicleId": released.get("vehicle_id"),
+    })
+
     await record_audit(
         actor_id=current_user.get("id"),
         actor_role=current_user.get("role"),
@@ -271,33 +239,27 @@ async def get_fleet_status(
 ):
     """
     获取车队完整状态 (绕过 RLS)
-    聚合司机、活跃指派与车辆信息
+    聚合司机、活跃指派与车辆信息；结果缓存，指派/解绑时失效
     """
-    from fastapi.concurrency import run_in_threadpool
-    
-    # 1. 获取所有司机 (role='driver')
-    drivers_resp = await run_in_threadpool(
-        supabase.table("users")
-        .select("*")
-        .eq("role", "driver")
-        .order("name")
-        .execute
-    )
-    drivers = drivers_resp.data or []
-    
-    # 2. 获取所有活跃的司机指派信息，并关联车辆
+    cached = _fleet_status_cache["data"]
+    if cached is not None and time.monotonic() < _fleet_status_cache["expires_at"]:
+        return cached
+
+    # 司机来自内存用户目录，只需一次查询活跃指派（含车辆）后按司机分组
+    drivers = await user_directory.by_role("driver")
     assignments_resp = await run_in_threadpool(
         supabase.table("driver_assignments")
         .select("*, vehicle:vehicles(*)")
         .eq("status", "active")
         .execute
     )
-    assignments = assignments_resp.data or []
-    
-    # 3. 将指派数据聚合到司机对象中
+    by_driver: dict[str, list] = {}
+    for a in assignments_resp.data or []:
+        by_driver.setdefault(a.get("driver_id"), []).append(a)
+
     for driver in drivers:
-        driver_id = driver.get("id")
-        # 匹配该司机的活跃指派
-        driver["assignments"] = [a for a in assignments if a.get("driver_id") == driver_id]
-        
+        driver["assignments"] = by_driver.get(driver.get("id"), [])
+
+    _fleet_status_cache["data"] = drivers
+    _fleet_status_cache["expires_at"] = time.monotonic() + FLEET_STATUS_TTL_SECONDS
     return drivers
@@ -0,0 +1,303 @@
+"""
+经营统计聚合
+super_admin 统计接口中逐行遍历订单的纯计算部分，与数据库查询分离，
+便于单独做基准测试 (benchmarks/analytics_bench.py)。
+"""
+import calendar
+from datetime import datetime, timedelta
+
+import dateutil.parser
+
+# Business Timezone: GMT+8
+BUSINESS_UTC_OFFSET = timedelta(hours=8)
+
+
+def get_field(obj: dict, *keys):
+    """Defensive helper to get values regardless of case"""
+    for k in keys:
+        if k in obj: return obj[k]
+    return None
+
+
+def aggregate_stats_overview(all_orders_data: list[dict], now_utc: datetime) -> dict:
+    """
+    /super-admin/stats 的订单汇总（不含用户数）。
+    注意：会就地按 created_at 倒序排序 all_orders_data。
+    """
+    now_biz = now_utc + BUSINESS_UTC_OFFSET
+    now_naive = now_biz.replace(tzinfo=None)
+    today_str = now_naive.strftime("%Y-%m-%d")
+    month_ago = now_naive - timedelta(days=31)
+
+    total_orders = len(all_orders_data)
+    total_revenue = 0.0
+    today_orders = 0
+    today_revenue = 0.0
+    month_orders = 0
+    month_revenue = 0.0
+    total_unpaid = 0.0
+
+    status_counts: dict[str, int] = {}
+
+    for o in all_orders_data:
+        # Status count (Normalized to lowercase for frontend mapping)
+        s = str(o.get("status", "unknown")).lower()
+        status_counts[s] = status_counts.get(s, 0) + 1
+
+        # Amount extraction
+        amt = float(get_field(o, "amount", "Amount") or 0.0)
+        bal = float(get_field(o, "balance", "Balance") or 0.0)
+        total_revenue += amt
+        total_unpaid += bal
+
+        # Date parsing
+        due_raw = get_field(o, "dueTime", "duetime")
+        ca_raw = get_field(o, "created_at", "createdAt")
+        dt = None
+        try:
+            if due_raw: dt = dateutil.parser.parse(str(due_raw))
+            elif ca_raw: dt = dateutil.parser.parse(str(ca_raw))
+        except: continue
+        if not dt: continue
+
+        dt_naive = dt.replace(tzinfo=None)
+        dt_str = dt_naive.strftime("%Y-%m-%d")
+
+        # Today calculation
+        is_today = (dt_str == today_str)
+        if is_today:
+            today_orders += 1
+            today_revenue += amt
+
+        # Month calculation (Last 31 days)
+        if dt_naive >= month_ago:
+            month_orders += 1
+            month_revenue += amt
+
+    # Ensure Recent Activity shows the latest 20 orders by sorting descending
+    all_orders_data.sort(key=lambda x: str(x.get('created_at', '')), reverse=True)
+
+    # Monthly sales history (Last 12 months)
+    # buckets[0] is 11 months ago, buckets[11] is current month
+    buckets = [0.0] * 12
+    for o in all_orders_data:
+        amt = float(get_field(o, "amount", "Amount") or 0.0)
+        due_raw = get_field(o, "dueTime", "duetime")
+        ca_raw = get_field(o, "created_at", "createdAt")
+        dt = None
+        try:
+            if due_raw: dt = dateutil.parser.parse(str(due_raw))
+            elif ca_raw: dt = dateutil.parser.parse(str(ca_raw))
+        except: continue
+        if not dt: continue
+        dt_naive = dt.replace(tzinfo=None)
+
+        # Calculate month offset relative to current month (0 = current, 1 = last month, ...)
+        month_diff = (now_naive.year - dt_naive.year) * 12 + (now_naive.month - dt_naive.month)
+        if 0 <= month_diff < 12:
+            buckets[11 - month_diff] = round(buckets[11 - month_diff] + amt, 2)
+
+    return {
+        "total_orders": total_orders,
+        "total_revenue": total_revenue,
+        "today_orders": today_orders,
+        "today_revenue": round(today_revenue, 2),
+        "month_revenue": round(month_revenue, 2),
+        "month_orders": month_orders,
+        "total_unpaid": round(total_unpaid, 2),
+        "orders_by_status": status_counts,
+        "recent_orders": all_orders_data[:20],
+        "monthly_sales": buckets
+    }
+
+
+def aggregate_financials(all_orders: list[dict], range: str, now_utc: datetime) -> dict:
+    """
+    /super-admin/financials 的区间营收与收款方式汇总（不含全局未付余额）
+    """
+    now_biz = now_utc + BUSINESS_UTC_OFFSET
+    now_naive = now_biz.replace(tzinfo=None)
+    today_str = now_naive.strftime("%Y-%m-%d")
+
+    period_revenue = 0
+    period_order_count = 0
+    today_revenue = 0
+    today_order_count = 0
+    pm_stats: dict = {}
+
+    for o in all_orders:
+        amount = float(get_field(o, "amount", "Amount") or 0.0)
+        payment_received = float(get_field(o, "payment_received", "paymentReceived") or 0.0)
+        p_status = str(get_field(o, "paymentStatus", "paymentstatus", "payment_status") or "").lower()
+        p_method = str(get_field(o, "paymentMethod", "paymentmethod", "payment_method") or "cash").lower()
+
+        # NOTE: 统一使用 created_at（下单日期）作为月份归类的基准
+        # 优先使用 created_at，与前端表格过滤逻辑保持一致
+        created_at_raw = get_field(o, "created_at", "createdAt")
+        due_time_raw = get_field(o, "dueTime", "duetime", "due_time")
+
+        # Robust Date Parsing - Using the more flexible dateutil.parser.parse
+        dt = None
+        try:
+            if created_at_raw:
+                dt = dateutil.parser.parse(str(created_at_raw))
+            elif due_time_raw:
+                dt = dateutil.parser.parse(str(due_time_raw))
+        except:
+            continue
+
+        if not dt: continue
+
+        # Use the business-aware dates defined outside the loop (now_naive, today_str)
+        dt_naive = dt.replace(tzinfo=None)
+        dt_str = dt_naive.strftime("%Y-%m-%d")
+        is_today = (dt_str == today_str)
+        is_in_period = False
+
+        if range == "today":
+            is_in_period = is_today
+        elif range == "month":
+            # NOTE: 使用自然月（本月1日起），而不是过去31天
+            # 这样确保统计数字与前端 MONTH 过滤的表格完全一致
+            is_in_period = (dt_naive.year == now_naive.year and dt_naive.month == now_naive.month)
+        else: # all
+            is_in_period = True
+
+        # 1. Main Metrics
+        if is_today:
+            today_revenue += amount
+            today_order_count += 1
+
+        if is_in_period:
+            period_revenue += amount
+            period_order_count += 1
+
+            # 2. Collection Stats (The core "Collection Data")
+            # Logic: Use payment_received, but fallback to amount if status is paid
+            actual_payment = payment_received
+            if actual_payment == 0 and p_status == 'paid':
+                actual_payment = amount
+
+            if actual_payment > 0:
+                if p_method not in pm_stats:
+                    pm_stats[p_method] = {"method": p_method, "amount": 0.0, "count": 0}
+                pm_stats[p_method]["amount"] = round(pm_stats[p_method]["amount"] + actual_payment, 2)
+                pm_stats[p_method]["count"] += 1
+
+    return {
+        "periodRevenue": round(period_revenue, 2),
+        "periodOrders": period_order_count,
+        "todayRevenue": round(today_revenue, 2),
+        "todayOrders": today_order_count,
+        "collections": list(pm_stats.values()),
+    }
+
+
+def ai_summary_windows(now: datetime) -> dict:
+    """AI 摘要需要的时间窗口：近 14 天、本月起点、上月同期起止"""
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    # 获取过去 14 天的所有已完成订单用于计算平均值 (增加窗口冗余)
+    history_start = today_start - timedelta(days=14)
+
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    # 上月同期起点与终点
+    # 处理日期溢出（例如 3月31日对应2月28/29日）
+    last_month_days = calendar.monthrange((month_start - timedelta(days=1)).year, (month_start - timedelta(days=1)).month)[1]
+    last_month_end = (month_start - timedelta(days=1)).replace(
+        day=min(now.day, last_month_days), hour=23, minute=59, second=59
+    )
+    last_month_start = last_month_end.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    return {
+        "history_start": history_start,
+        "month_start": month_start,
+        "last_month_start": last_month_start,
+        "last_month_end": last_month_end,
+    }
+
+
+def aggregate_ai_summary(history_orders: list[dict], comp_orders: list[dict], now: datetime) -> dict:
+    """
+    AI 营业额监督助手：分析波动、预测趋势、检测异常
+    history_orders 为近 14 天订单，comp_orders 为上月同期起至今的订单
+    """
+    windows = ai_summary_windows(now)
+    month_start = windows["month_start"]
+    last_month_start = windows["last_month_start"]
+    last_month_end = windows["last_month_end"]
+
+    daily_revenue = {}
+    for o in history_orders:
+        payment = o.get("payment_received") or 0.0
+        if payment <= 0: continue
+
+        try:
+            dt_str = o.get("dueTime") or o.get("created_at")
+            dt = dateutil.parser.isoparse(dt_str).strftime("%Y-%m-%d")
+            daily_revenue[dt] = daily_revenue.get(dt, 0) + payment
+        except: continue
+
+    # 计算 7 天平均值 (不含今天)
+    today_str = now.strftime("%Y-%m-%d")
+    other_days_revenue = [v for k, v in daily_revenue.items() if k != today_str]
+    avg_7d = sum(other_days_revenue) / len(other_days_revenue) if other_days_revenue else 0
+    today_rev = daily_revenue.get(today_str, 0)
+
+    # 2. 计算月度环比增长 (MTD vs Last Month MTD)
+    mtd_rev = 0
+    last_mtd_rev = 0
+
+    for o in comp_orders:
+        pay = float(o.get("payment_received") or 0.0)
+
+        ca = dateutil.parser.isoparse(o.get("created_at"))
+        if ca >= month_start:
+            mtd_rev += pay
+        elif last_month_start <= ca <= last_month_end:
+            last_mtd_rev += pay
+
+    # 3. 线性预测本月总额
+    days_in_month = calendar.monthrange(now.year, now.month)[1]
+    predicted_total = (mtd_rev / now.day) * days_in_month if now.day > 0 else 0
+
+    # 4. 异常检测：高额未付订单 (> RM 500)
+    unpaid_high_value = [o for o in comp_orders if dateutil.parser.isoparse(o.get("created_at")) >= month_start and o.get("paymentStatus") != "paid" and float(o.get("amount", 0)) > 500]
+
+    # 5. 波动预警与分析
+    warnings = []
+    if avg_7d > 0 and today_rev < (avg_7d * 0.3):
+        warnings.append({
+            "type": "low_revenue",
+            "message": f"今日营收 (RM {today_rev:.2f}) 低于过去 7 天平均水平的 30%，建议检查运营。",
+            "severity": "warning"
+        })
+
+    if last_mtd_rev > 0 and mtd_rev < last_mtd_rev * 0.8:
+        warnings.append({
+            "type": "mtd_decline",
+            "message": f"本月进度 (RM {mtd_rev:.2f}) 较上月同期 (RM {last_mtd_rev:.2f}) 落后超过 20%。",
+            "severity": "info"
+        })
+
+    return {
+        "today_vs_avg": {
+            "today": today_rev,
+            "avg_7d": avg_7d,
+            "ratio": (today_rev / avg_7d) if avg_7d > 0 else 1
+        },
+        "monthly_growth": (mtd_rev - last_mtd_rev) / last_mtd_rev if last_mtd_rev > 0 else 0,
+        "prediction": {
+            "current": mtd_rev,
+            "predicted": predicted_total,
+            "days_passed": now.day,
+            "total_days": days_in_month
+        },
+        "anomalies": [
+            {
+                "id": f"KM-{now.strftime('%y%m')}-XXX",
+                "amount": float(o.get("amount", 0)),
+                "status": "unpaid"
+            } for o in unpaid_high_value[:3]
+        ],
+        "warnings": warnings
+    }
@@ -1,4 +1,6 @@
 from typing import Optional, Any
+import hashlib
+import json
 import logging
 from database import supabase
 from fastapi.concurrency import run_in_threadpool
@@ -10,6 +12,74 @@ import uuid
 # 常量：系统默认 UUID (当操作人不是标准 UUID 格式时使用，如系统自动任务或测试)
 FALLBACK_SYSTEM_UUID = "00000000-0000-0000-0000-000000000000"
 
+# 序列化后超过该长度的列表/字典字段（如 items）仅记录哈希与数量
+LARGE_VALUE_BYTES = 256
+
+
+def _canonical(value: Any) -> Any:
+    """将枚举、datetime 等转换为 JSON 原生类型，便于比较与存储"""
+    return json.loads(json.dumps(value, default=str, sort_keys=True))
+
+
+def _summarize(value: Any) -> Any:
+    """大型数组/对象压缩为 {_hash, _count} 摘要，小值原样返回"""
+    if isinstance(value, (list, dict)):
+        raw = json.dumps(value, sort_keys=True, ensure_ascii=False)
+        if len(raw) > LARGE_VALUE_BYTES:
+            return {
+                "_hash": hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16],
+                "_count": len(value),
+            }
+    return value
+
+
+def build_create_detail(data: dict, **extra: Any) -> dict:
+    """创建类操作：记录一次压缩后的初始快照，作为后续 diff 回放的起点"""
+    snapshot = {k: _summarize(v) for k, v in _canonical(data).items()}
+    return {"_snapshot": snapshot, **extra}
+
+
+def build_diff_detail(old: Optional[dict], new: dict, **extra: Any) -> dict:
+    """
+    更新类操作：仅记录 new 中实际发生变化的字段 {field: {old, new}}。
+    大型数组按哈希比较，未变化时整个字段不写入。
+    """
+    old = _canonical(old or {})
+    diff: dict[str, Any] = {}
+    for key, value in _canonical(new).items():
+        before = old.get(key)
+        if _summarize(before) == _summarize(value):
+            continue
+        diff[key] = {"old": _summarize(before), "new": _summarize(value)}
+    return {"_diff": diff, **extra}
+
+
+def reconstruct_history(entries: list[dict]) -> list[dict]:
+    """
+    按时间升序回放某个目标的审计记录，返回每一步之后的完整状态。
+    被摘要的大型字段在快照中保留 {_hash, _count}，可用于判断是否变更。
+    """
+    state: dict[str, Any] = {}
+    history = []
+    for entry in entries:
+        detail = entry.get("detail") or {}
+        if "_snapshot" in detail:
+            state = dict(detail["_snapshot"])
+        elif "_diff" in detail:
+            for key, change in detail["_diff"].items():
+                state[key] = change.get("new")
+        else:
+            # 兼容旧格式：detail 直接存放了变更字段
+            state.update({k: v for k, v in detail.items() if not k.startswith("_")})
+        history.append({
+            "id": entry.get("id"),
+            "action": entry.get("action"),
+            "actor_id": entry.get("actor_id"),
+            "created_at": entry.get("created_at"),
+            "state": dict(state),
+        })
+    return history
+
 async def record_audit(
     actor_id: str,
     actor_role: str,
@@ -95,3 +165,4 @@ class AuditActions:
     
     CONFIG_UPDATE = "update_config"
     DATA_RESET = "reset_data"
+    AUDIT_ARCHIVE = "archive_audit_logs"
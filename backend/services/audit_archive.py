@@ -0,0 +1,160 @@
+"""
+审计日志归档服务
+将超过保留期的 audit_logs 行按月切分写入本地 JSONL.gz 分段文件，并维护一个小型索引，
+随后从热表中删除已归档的行，保持 audit_logs 表体积稳定。
+"""
+import os
+import json
+import gzip
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import Optional, Any
+
+from database import supabase
+
+logger = logging.getLogger(__name__)
+
+# 归档目录与保留期可通过环境变量覆盖
+ARCHIVE_DIR = os.getenv(
+    "AUDIT_ARCHIVE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "audit_archive"),
+)
+DEFAULT_RETENTION_DAYS = int(os.getenv("AUDIT_RETENTION_DAYS", "90"))
+INDEX_FILE = "index.json"
+# 每批从热表拉取的行数（PostgREST 单次返回上限通常为 1000）
+BATCH_SIZE = 1000
+
+
+def _index_path() -> str:
+    return os.path.join(ARCHIVE_DIR, INDEX_FILE)
+
+
+def load_index() -> list[dict]:
+    """读取归档索引，不存在时返回空列表"""
+    try:
+        with open(_index_path(), "r", encoding="utf-8") as f:
+            return json.load(f).get("segments", [])
+    except FileNotFoundError:
+        return []
+    except Exception as e:
+        logger.error(f"Failed to read audit archive index: {e}")
+        return []
+
+
+def _save_index(segments: list[dict]) -> None:
+    # NOTE: 先写临时文件再原子替换，避免进程中断时索引损坏
+    tmp_path = _index_path() + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"segments": segments}, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, _index_path())
+
+
+def _write_segment(month: str, rows: list[dict]) -> dict:
+    """将同一月份的行写入一个新的 gzip 分段，返回索引条目"""
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    file_name = f"audit_logs-{month}-{stamp}.jsonl.gz"
+    with gzip.open(os.path.join(ARCHIVE_DIR, file_name), "wt", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+
+    created = [str(r.get("created_at") or "") for r in rows]
+    return {
+        "file": file_name,
+        "month": month,
+        "min_created_at": min(created),
+        "max_created_at": max(created),
+        "count": len(rows),
+    }
+
+
+def archive_audit_logs(retention_days: int = DEFAULT_RETENTION_DAYS) -> dict:
+    """
+    同步执行一次归档：按 created_at 升序分批读取早于保留期的行，
+    按月份写入分段文件并更新索引，写入成功后再从热表删除对应行。
+    调用方应通过 run_in_threadpool 执行。
+    """
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=retention_days)).isoformat()
+    segments = load_index()
+
+    archived = 0
+    while True:
+        resp = (
+            supabase.table("audit_logs")
+            .select("*")
+            .lt("created_at", cutoff)
+            .order("created_at", desc=False)
+            .limit(BATCH_SIZE)
+            .execute()
+        )
+        rows = resp.data or []
+        if not rows:
+            break
+
+        by_month: dict[str, list[dict]] = {}
+        for row in rows:
+            month = str(row.get("created_at") or "")[:7] or "unknown"
+            by_month.setdefault(month, []).append(row)
+
+        for month, month_rows in by_month.items():
+            segments.append(_write_segment(month, month_rows))
+        _save_index(segments)
+
+        # 分段与索引已落盘，才能安全地从热表删除
+        ids = [row["id"] for row in rows if row.get("id")]
+        supabase.table("audit_logs").delete().in_("id", ids).execute()
+        archived += len(rows)
+
+        if len(rows) < BATCH_SIZE:
+            break
+
+    logger.info(f"Archived {archived} audit log rows older than {cutoff}")
+    return {"archived": archived, "cutoff": cutoff, "segments": len(segments)}
+
+
+def _matches(row: dict, action: Optional[str], search: Optional[str],
+             start: Optional[str], end: Optional[str]) -> bool:
+    created = str(row.get("created_at") or "")
+    if start and created < start:
+        return False
+    if end and created > end:
+        return False
+    if action and row.get("action") != action:
+        return False
+    if search:
+        needle = search.lower()
+        if needle not in str(row.get("target") or "").lower() and needle not in str(row.get("actor_id") or "").lower():
+            return False
+    return True
+
+
+def read_archived_logs(
+    offset: int,
+    limit: int,
+    action: Optional[str] = None,
+    search: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+) -> tuple[list[dict[str, Any]], int]:
+    """
+    从归档分段中读取日志（按时间倒序），返回 (当前页数据, 命中总数)。
+    只打开与 [start, end] 时间范围重叠的分段。
+    """
+    matched: list[dict] = []
+    for seg in load_index():
+        if start and seg.get("max_created_at", "") < start:
+            continue
+        if end and seg.get("min_created_at", "") > end:
+            continue
+        try:
+            with gzip.open(os.path.join(ARCHIVE_DIR, seg["file"]), "rt", encoding="utf-8") as f:
+                for line in f:
+                    row = json.loads(line)
+                    if _matches(row, action, search, start, end):
+                        row["archived"] = True
+                        matched.append(row)
+        except FileNotFoundError:
+            logger.warning(f"Audit archive segment missing: {seg.get('file')}")
+
+    matched.sort(key=lambda r: str(r.get("created_at") or ""), reverse=True)
+    return matched[offset:offset + limit], len(matched)
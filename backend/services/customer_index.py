@@ -0,0 +1,208 @@
+"""
+客户自动补全索引
+进程内维护全部客户的搜索键：电话号码数字前缀树 (trie) + 姓名 1/2-gram 倒排索引 + 按姓名排序的列表，
+启动时加载一次，由 customers 的增删改接口增量维护。索引只负责排序选出客户 id，
+完整行（含触发器维护的汇总字段）由调用方按 id 从数据库读取，不会返回过期的汇总值。
+"""
+import bisect
+import heapq
+import logging
+import re
+from typing import Optional
+
+from database import supabase
+
+logger = logging.getLogger(__name__)
+
+LOAD_PAGE_SIZE = 1000
+_NON_DIGIT = re.compile(r"\D")
+_PHONE_QUERY = re.compile(r"[\d\s+\-()]+")
+
+
+def normalize_phone(phone: Optional[str]) -> str:
+    """仅保留数字，用于索引与按电话匹配客户"""
+    return _NON_DIGIT.sub("", phone or "")
+
+
+def canonical_phone(phone: Optional[str]) -> Optional[str]:
+    """
+    客户去重使用的规范化号码：仅保留数字，60 开头的国际格式转为 0 开头。
+    没有任何数字时返回 None（写入 phone_normalized 为 NULL，不参与唯一约束）。
+    """
+    digits = normalize_phone(phone)
+    if not digits:
+        return None
+    if digits.startswith("60"):
+        digits = "0" + digits[2:]
+    return digits
+
+
+def _phone_keys(phone: Optional[str]) -> set[str]:
+    """同一号码的多种写法：60123456789 / 0123456789 / 123456789"""
+    digits = normalize_phone(phone)
+    if not digits:
+        return set()
+    keys = {digits, digits.lstrip("0")}
+    if digits.startswith("60"):
+        keys.add(digits[2:])
+        keys.add(digits[2:].lstrip("0"))
+    return {k for k in keys if k}
+
+
+def _grams(text: str) -> set[str]:
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    grams.discard(" ")
+    return grams
+
+
+class CustomerIndex:
+    def __init__(self):
+        self.loaded = False
+        # customer_id -> 搜索键 {"id", "name", "phone"}
+        self._customers: dict[str, dict] = {}
+        # (name, id) 升序，空关键词时直接取前 N 条
+        self._by_name: list[tuple[str, str]] = []
+        # 前缀树节点: {"ids": set, "next": {digit: node}}
+        self._phone_trie: dict = {"ids": set(), "next": {}}
+        self._name_grams: dict[str, set[str]] = {}
+        # canonical_phone -> customer_id
+        self._by_phone: dict[str, str] = {}
+
+    # ── 维护 ──────────────────────────────────────────────────────────────
+
+    def _trie_update(self, key: str, customer_id: str, add: bool):
+        node = self._phone_trie
+        for digit in key:
+            node = node["next"].setdefault(digit, {"ids": set(), "next": {}})
+            if add:
+                node["ids"].add(customer_id)
+            else:
+                node["ids"].discard(customer_id)
+
+    def upsert(self, customer: dict):
+        customer_id = customer.get("id")
+        if not customer_id:
+            return
+        self.remove(customer_id)
+        self._add(customer)
+        bisect.insort(self._by_name, (customer.get("name") or "", customer_id))
+
+    def _add(self, customer: dict):
+        customer_id = customer["id"]
+        self._customers[customer_id] = {"id": customer_id, "name": customer.get("name"), "phone": customer.get("phone")}
+        phone_key = canonical_phone(customer.get("phone"))
+        if phone_key:
+            self._by_phone[phone_key] = customer_id
+        for key in _phone_keys(customer.get("phone")):
+            self._trie_update(key, customer_id, add=True)
+        for gram in _grams((customer.get("name") or "").lower()):
+            self._name_grams.setdefault(gram, set()).add(customer_id)
+
+    def remove(self, customer_id: str):
+        old = self._customers.pop(customer_id, None)
+        if not old:
+            return
+        entry = (old.get("name") or "", customer_id)
+        pos = bisect.bisect_left(self._by_name, entry)
+        if pos < len(self._by_name) and self._by_name[pos] == entry:
+            del self._by_name[pos]
+        phone_key = canonical_phone(old.get("phone"))
+        if phone_key and self._by_phone.get(phone_key) == customer_id:
+            del self._by_phone[phone_key]
+        for key in _phone_keys(old.get("phone")):
+            self._trie_update(key, customer_id, add=False)
+        for gram in _grams((old.get("name") or "").lower()):
+            postings = self._name_grams.get(gram)
+            if postings:
+                postings.discard(customer_id)
+                if not postings:
+                    del self._name_grams[gram]
+
+    def load(self):
+        """全量分页加载 customers 表的搜索键（同步，调用方放入线程池）"""
+        customers: list[dict] = []
+        offset = 0
+        while True:
+            resp = (
+                supabase.table("customers")
+                .select("id, name, phone")
+                .order("id")
+                .range(offset, offset + LOAD_PAGE_SIZE - 1)
+                .execute()
+            )
+            rows = resp.data or []
+            customers.extend(rows)
+            if len(rows) < LOAD_PAGE_SIZE:
+                break
+            offset += LOAD_PAGE_SIZE
+
+        self._customers.clear()
+        self._phone_trie = {"ids": set(), "next": {}}
+        self._name_grams.clear()
+        self._by_phone.clear()
+        for c in customers:
+            if c.get("id"):
+                self._add(c)
+        self._by_name = sorted((c.get("name") or "", cid) for cid, c in self._customers.items())
+        self.loaded = True
+        logger.info(f"Customer index loaded with {len(customers)} customers")
+
+    # ── 查询 ──────────────────────────────────────────────────────────────
+
+    def find_id_by_phone(self, phone: Optional[str]) -> Optional[str]:
+        """按规范化号码精确查找客户 id"""
+        phone_key = canonical_phone(phone)
+        return self._by_phone.get(phone_key) if phone_key else None
+
+    def _phone_prefix(self, digits: str) -> set[str]:
+        node = self._phone_trie
+        for digit in digits:
+            node = node["next"].get(digit)
+            if node is None:
+                return set()
+        return node["ids"]
+
+    def _name_candidates(self, needle: str) -> set[str]:
+        grams = _grams(needle)
+        if not grams:
+            return set()
+        postings = sorted((self._name_grams.get(g, set()) for g in grams), key=len)
+        result = set(postings[0])
+        for p in postings[1:]:
+            result &= p
+            if not result:
+                break
+        return result
+
+    def search(self, q: Optional[str], limit: int = 50) -> list[str]:
+        """
+        返回排序后的前 N 个客户 id。
+        排序规则：电话前缀命中 > 姓名以关键词开头 > 姓名中某个词以关键词开头 > 姓名包含关键词
+        """
+        if not q or not q.strip():
+            return [cid for _, cid in self._by_name[:limit]]
+
+        needle = q.strip().lower()
+        scored: dict[str, int] = {}
+
+        if _PHONE_QUERY.fullmatch(needle):
+            for cid in self._phone_prefix(normalize_phone(needle)):
+                scored[cid] = 0
+
+        for cid in self._name_candidates(needle):
+            name = (self._customers[cid].get("name") or "").lower()
+            if needle not in name:
+                continue
+            if name.startswith(needle):
+                rank = 1
+            elif any(token.startswith(needle) for token in name.split()):
+                rank = 2
+            else:
+                rank = 3
+            scored[cid] = min(scored.get(cid, rank), rank)
+
+        return heapq.nsmallest(limit, scored, key=lambda cid: (scored[cid], self._customers[cid].get("name") or ""))
+
+
+customer_index = CustomerIndex()
@@ -0,0 +1,77 @@
+"""
+订单关联客户档案
+下单时按规范化电话查找已有客户；新号码在订单写入成功后才创建客户并回填 orders.customer_id。
+客户汇总字段（订单数、累计消费、最近下单、未付余额）由数据库触发器增量维护
+(见 migration_v10_customer_rollups.sql)。
+"""
+import logging
+from typing import Optional
+
+from database import supabase
+from fastapi.concurrency import run_in_threadpool
+from services.customer_index import customer_index, canonical_phone
+
+logger = logging.getLogger(__name__)
+
+
+async def _find_in_db(phone_key: str) -> Optional[dict]:
+    res = await run_in_threadpool(
+        supabase.table("customers").select("*").eq("phone_normalized", phone_key).limit(1).execute
+    )
+    return res.data[0] if res.data else None
+
+
+async def find_customer_id(order_data: dict) -> Optional[str]:
+    """
+    下单前按 customerPhone 查找已有客户，命中时订单直接带上 customer_id 写入。
+    无电话、未找到或查询失败时返回 None，不阻塞下单流程。
+    """
+    phone = order_data.get("customerPhone")
+    phone_key = canonical_phone(phone)
+    if not phone_key:
+        return None
+
+    try:
+        if customer_index.loaded:
+            return customer_index.find_id_by_phone(phone)
+        customer = await _find_in_db(phone_key)
+        return customer["id"] if customer else None
+    except Exception as e:
+        logger.warning(f"Failed to look up customer for order {order_data.get('id')}: {e}")
+        return None
+
+
+async def link_new_customer(order: dict) -> Optional[str]:
+    """
+    订单写入成功后再为新号码创建客户并回填 orders.customer_id，下单失败不会留下孤儿客户。
+    按 phone_normalized 唯一索引 upsert：并发下单时只有一个请求真正插入，其余读回同一客户。
+    """
+    phone = order.get("customerPhone")
+    phone_key = canonical_phone(phone)
+    if not phone_key:
+        return None
+
+    try:
+        new_customer = {
+            "name": order.get("customerName") or phone,
+            "phone": phone,
+            "phone_normalized": phone_key,
+            "address": order.get("address"),
+        }
+        res = await run_in_threadpool(
+            supabase.table("customers")
+            .upsert(new_customer, on_conflict="phone_normalized", ignore_duplicates=True)
+            .execute
+        )
+        customer = res.data[0] if res.data else await _find_in_db(phone_key)
+        if not customer:
+            return None
+        customer_index.upsert(customer)
+
+        await run_in_threadpool(
+            supabase.table("orders").update({"customer_id": customer["id"]}).eq("id", order["id"]).execute
+        )
+        return customer["id"]
+    except Exception as e:
+        logger.warning(f"Failed to link customer for order {order.get('id')}: {e}")
+        return None
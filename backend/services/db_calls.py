@@ -0,0 +1,96 @@
+"""
+数据库调用统计
+包装 supabase.table(...) / supabase.rpc(...) 构建的查询，在 execute 时记录表名、操作、
+耗时与返回行数，累加到当前请求的上下文 (contextvars)。
+run_in_threadpool 会复制上下文，线程中的 execute 写入的是同一个统计对象。
+"""
+import contextvars
+import time
+from typing import Optional
+
+_OPERATIONS = {"select", "insert", "update", "upsert", "delete"}
+
+
+class RequestDBStats:
+    def __init__(self):
+        self.calls = 0
+        self.total_seconds = 0.0
+        # (table, operation) -> [次数, 耗时秒, 行数]
+        self.by_query: dict[tuple[str, str], list] = {}
+
+    def record(self, table: str, operation: str, seconds: float, rows: int):
+        self.calls += 1
+        self.total_seconds += seconds
+        entry = self.by_query.setdefault((table, operation), [0, 0.0, 0])
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] += rows
+
+    def summary(self) -> str:
+        parts = [
+            f"{table}.{op} x{count} ({seconds * 1000:.1f}ms, {rows} rows)"
+            for (table, op), (count, seconds, rows) in sorted(
+                self.by_query.items(), key=lambda kv: kv[1][0], reverse=True
+            )
+        ]
+        return ", ".join(parts)
+
+
+_current: contextvars.ContextVar[Optional[RequestDBStats]] = contextvars.ContextVar("db_stats", default=None)
+
+
+def begin_request() -> tuple[RequestDBStats, contextvars.Token]:
+    stats = RequestDBStats()
+    return stats, _current.set(stats)
+
+
+def end_request(token: contextvars.Token):
+    _current.reset(token)
+
+
+def _row_count(response) -> int:
+    data = getattr(response, "data", None)
+    if isinstance(data, list):
+        return len(data)
+    return 1 if data else 0
+
+
+class InstrumentedQuery:
+    """
+    代理 postgrest 查询构建器：链式方法返回的新构建器继续被包装，
+    execute 时把本次调用记入当前请求统计（后台任务等无请求上下文时不记录）。
+    """
+
+    def __init__(self, builder, table: str, operation: str = "query"):
+        self._builder = builder
+        self._table = table
+        self._operation = operation
+
+    def _wrap(self, value, operation: str):
+        if hasattr(value, "execute"):
+            return InstrumentedQuery(value, self._table, operation)
+        return value
+
+    def execute(self, *args, **kwargs):
+        started = time.perf_counter()
+        response = None
+        try:
+            response = self._builder.execute(*args, **kwargs)
+            return response
+        finally:
+            # 失败的调用同样计入往返次数
+            stats = _current.get()
+            if stats is not None:
+                stats.record(self._table, self._operation, time.perf_counter() - started, _row_count(response))
+
+    def __getattr__(self, name):
+        value = getattr(self._builder, name)
+        operation = name if name in _OPERATIONS else self._operation
+        if not callable(value):
+            # 如 .not_ 等属性同样返回构建器
+            return self._wrap(value, operation)
+
+        def method(*args, **kwargs):
+            return self._wrap(value(*args, **kwargs), operation)
+
+        return method
@@ -0,0 +1,66 @@
+"""
+快速 JSON 响应
+读接口默认经 response_model 校验后再序列化，每行订单都会重新运行 OrderBase.validate_finance_logic，
+几百行时校验本身就是主要开销。通过环境变量 FAST_JSON_MODE 按需启用更快的路径：
+
+- 未设置 / off: 原样返回数据，仍由 FastAPI 按 response_model 处理（默认）
+- trusted: 不做校验，只按模型字段裁剪后用 orjson 序列化。前提是数据来自本系统自己的写入路径
+  （余额与付款状态已在创建 / 更新订单时计算），日期等字段保持数据库原始格式
+
+未安装 orjson 时 trusted 模式退回 pydantic-core 的 to_json。
+FastAPI 自身已用 pydantic-core 直接输出 JSON，"校验后再序列化" 的路径没有可省的开销，
+只有跳过校验才有收益（见 benchmarks/serialization_bench.py）。
+"""
+import os
+import logging
+from functools import lru_cache
+from typing import Any, get_args, get_origin
+
+from fastapi import Response
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+logger = logging.getLogger(__name__)
+
+FAST_JSON_MODE = os.getenv("FAST_JSON_MODE", "off").lower()
+if FAST_JSON_MODE not in ("off", "trusted"):
+    logger.error(f"Unknown FAST_JSON_MODE {FAST_JSON_MODE!r}, falling back to 'off'")
+    FAST_JSON_MODE = "off"
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+@lru_cache(maxsize=None)
+def _field_names(model_type) -> frozenset[str] | None:
+    """List[Model] / Model 的字段名；其他类型返回 None（不裁剪）"""
+    if get_origin(model_type) is list:
+        (model_type,) = get_args(model_type)
+    if isinstance(model_type, type) and issubclass(model_type, BaseModel):
+        return frozenset(model_type.model_fields)
+    return None
+
+
+def dumps_trusted(model_type, data: Any) -> bytes:
+    fields = _field_names(model_type)
+    if fields is not None:
+        if isinstance(data, list):
+            data = [{k: v for k, v in row.items() if k in fields} for row in data]
+        elif isinstance(data, dict):
+            data = {k: v for k, v in data.items() if k in fields}
+    if orjson is not None:
+        return orjson.dumps(data)
+    return to_json(data)
+
+
+def json_response(model_type, data: Any, mode: str | None = None):
+    """
+    读接口的返回值出口：off 模式下原样返回 data，交给路由的 response_model；
+    trusted 模式直接返回已序列化的 Response（FastAPI 不会再次校验 Response 对象）。
+    """
+    mode = mode or FAST_JSON_MODE
+    if mode == "trusted":
+        return Response(dumps_trusted(model_type, data), media_type="application/json")
+    return data
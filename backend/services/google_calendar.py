@@ -1,29 +1,38 @@
 import os
 import json
 import logging
+import threading
 from datetime import datetime, timedelta
 from typing import Optional
 
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-
 logger = logging.getLogger(__name__)
 
 SCOPES = ['https://www.googleapis.com/auth/calendar']
 
+# googleapiclient is only imported when a calendar is configured. The service object
+# wraps an httplib2 connection which is not thread-safe, so it is cached per worker thread.
+_local = threading.local()
+
 def get_calendar_service():
     """Builds and returns the Google Calendar service, or None if not configured."""
+    service = getattr(_local, "service", None)
+    if service is not None:
+        return service
+
     creds_str = os.getenv('GOOGLE_CALENDAR_CREDENTIALS_JSON')
     if not creds_str:
         return None
     
     try:
+        from google.oauth2 import service_account
+        from googleapiclient.discovery import build
+
         creds_info = json.loads(creds_str)
         creds = service_account.Credentials.from_service_account_info(
             creds_info, scopes=SCOPES
         )
-        service = build('calendar', 'v3', credentials=creds)
-        return service
+        _local.service = build('calendar', 'v3', credentials=creds, cache_discovery=False)
+        return _local.service
     except Exception as e:
         logger.error(f"Failed to initialize Google Calendar service: {e}")
         return None
@@ -0,0 +1,88 @@
+"""
+产品图片多尺寸处理
+上传的原图在线程池中生成固定宽度的 thumb / card / full 变体 (WebP)，
+按内容哈希存放到确定性路径，重复上传同一张图不会产生新文件。
+"""
+import io
+import asyncio
+import hashlib
+import importlib.util
+import logging
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# 变体名 -> 目标宽度（像素）；原图更小时不放大
+VARIANT_WIDTHS = {
+    "thumb": 160,
+    "card": 480,
+    "full": 1280,
+}
+WEBP_QUALITY = 80
+
+# 图片缩放是 CPU 密集型操作，使用独立线程池，避免占用 FastAPI 默认线程池
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="image-variants")
+
+
+@lru_cache(maxsize=1)
+def is_available() -> bool:
+    # 只检查是否安装，Pillow 在首次生成变体时才真正导入
+    return importlib.util.find_spec("PIL") is not None
+
+
+def content_key(contents: bytes) -> str:
+    return hashlib.sha1(contents).hexdigest()[:20]
+
+
+def variant_path(key: str, variant: str) -> str:
+    return f"products/{key}/{variant}.webp"
+
+
+def _render_variant(contents: bytes, width: int) -> bytes:
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(contents)) as img:
+        # 按 EXIF 方向纠正手机拍摄的照片
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+        if img.width > width:
+            height = round(img.height * width / img.width)
+            img = img.resize((width, height), Image.LANCZOS)
+        out = io.BytesIO()
+        img.save(out, format="WEBP", quality=WEBP_QUALITY, method=4)
+        return out.getvalue()
+
+
+async def generate_variants(contents: bytes) -> Optional[dict[str, bytes]]:
+    """并行生成所有变体；Pillow 未安装或图片无法解码时返回 None"""
+    if not is_available():
+        logger.warning("Pillow not installed, skipping image variant generation.")
+        return None
+
+    loop = asyncio.get_running_loop()
+    try:
+        rendered = await asyncio.gather(*[
+            loop.run_in_executor(_executor, _render_variant, contents, width)
+            for width in VARIANT_WIDTHS.values()
+        ])
+    except Exception as e:
+        logger.error(f"Failed to generate image variants: {e}")
+        return None
+    return dict(zip(VARIANT_WIDTHS.keys(), rendered))
+
+
+def with_display_image(product: dict, variant: str) -> dict:
+    """
+    列表接口使用：image_url 保持原图（管理端表单会原样回写），
+    另给出指定尺寸的 image_src 与供 <img srcset> 使用的 image_srcset；没有变体时均退回原图。
+    """
+    variants = product.get("image_variants") or {}
+    srcset = ", ".join(f"{variants[name]} {width}w" for name, width in VARIANT_WIDTHS.items() if variants.get(name))
+    return {
+        **product,
+        "image_src": variants.get(variant) or product.get("image_url"),
+        "image_srcset": srcset or None,
+    }
@@ -0,0 +1,201 @@
+"""
+食材需求计算引擎
+将指定日期范围内到期订单的 order_items 与菜谱 (recipes.ingredients) 关联，
+换算统一单位后汇总所需食材，并与 inventory_items 的库存/安全库存比较生成缺口报告。
+"""
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Optional
+
+from database import supabase
+
+logger = logging.getLogger(__name__)
+
+# 菜谱 baseQty 对应的份数（后台菜谱页标注为 "分量/10pax"）
+RECIPE_BASE_PORTIONS = float(os.getenv("RECIPE_BASE_PORTIONS", "10"))
+# 同一日期范围的计算结果缓存时长
+PLAN_CACHE_TTL_SECONDS = 120
+# 最多缓存的日期范围个数，超出时淘汰最久未使用的
+PLAN_CACHE_MAX_ENTRIES = 32
+# PostgREST in_ 过滤的单批 ID 数，避免 URL 过长
+IN_FILTER_CHUNK = 200
+# 分页大小，不超过 Supabase 默认的 max-rows (1000)，否则单页会被静默截断
+PAGE_SIZE = 1000
+
+# 单位 -> (基准单位, 换算系数)
+UNIT_FACTORS: dict[str, tuple[str, float]] = {
+    "mg": ("g", 0.001),
+    "g": ("g", 1.0),
+    "gram": ("g", 1.0),
+    "克": ("g", 1.0),
+    "kg": ("g", 1000.0),
+    "公斤": ("g", 1000.0),
+    "斤": ("g", 500.0),
+    "ml": ("ml", 1.0),
+    "毫升": ("ml", 1.0),
+    "l": ("ml", 1000.0),
+    "litre": ("ml", 1000.0),
+    "liter": ("ml", 1000.0),
+    "升": ("ml", 1000.0),
+}
+
+# (start_date, end_date) -> (过期时间, 结果)，按最近使用排序；在线程池中访问，需加锁
+_plan_cache: "OrderedDict[tuple, tuple[float, dict]]" = OrderedDict()
+_plan_cache_lock = threading.Lock()
+
+
+def normalize_unit(qty: float, unit: Optional[str]) -> tuple[float, str]:
+    """换算为基准单位 (g / ml)；无法识别的计数类单位（粒、份、pcs）原样保留"""
+    key = (unit or "").strip().lower()
+    if key in UNIT_FACTORS:
+        base, factor = UNIT_FACTORS[key]
+        return qty * factor, base
+    return qty, key
+
+
+def _name_key(name: Optional[str]) -> str:
+    return " ".join((name or "").lower().split())
+
+
+def _fetch_all(build_query) -> list[dict]:
+    """
+    按 id 排序逐页读取，直到某页不足 PAGE_SIZE 行。
+    build_query 每次返回一个新的查询（select + 过滤条件）。
+    """
+    rows: list[dict] = []
+    offset = 0
+    while True:
+        resp = build_query().order("id").range(offset, offset + PAGE_SIZE - 1).execute()
+        page = resp.data or []
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        offset += PAGE_SIZE
+
+
+def _fetch_in_chunks(table: str, columns: str, field: str, values: list) -> list[dict]:
+    rows: list[dict] = []
+    for i in range(0, len(values), IN_FILTER_CHUNK):
+        chunk = values[i:i + IN_FILTER_CHUNK]
+        rows.extend(_fetch_all(lambda: supabase.table(table).select(columns).in_(field, chunk)))
+    return rows
+
+
+def _load_dish_portions(start_date: str, end_date: str) -> dict[str, float]:
+    """按菜名汇总日期范围内所有订单项的份数（先聚合，后续计算只与菜品种类数相关）"""
+    orders = _fetch_all(lambda: (
+        supabase.table("orders")
+        .select("id")
+        .gte("dueTime", start_date)
+        .lte("dueTime", f"{end_date}T23:59:59")
+        .neq("status", "cancelled")
+    ))
+    order_ids = [o["id"] for o in orders]
+    if not order_ids:
+        return {}
+
+    portions: dict[str, float] = defaultdict(float)
+    for item in _fetch_in_chunks("order_items", "id, name, quantity", "order_id", order_ids):
+        portions[_name_key(item.get("name"))] += float(item.get("quantity") or 0)
+    return portions
+
+
+def compute_requirements(start_date: str, end_date: str) -> dict:
+    """
+    同步计算食材需求与缺口报告，调用方应通过 run_in_threadpool 执行。
+    需求量 = Σ(菜品份数) × baseQty / RECIPE_BASE_PORTIONS，按 (食材, 基准单位) 汇总。
+    """
+    portions = _load_dish_portions(start_date, end_date)
+
+    recipe_rows = _fetch_all(lambda: supabase.table("recipes").select("id, name, ingredients"))
+    recipes = {_name_key(r.get("name")): r.get("ingredients") or [] for r in recipe_rows}
+
+    required: dict[tuple[str, str], dict] = {}
+    unmatched_dishes = []
+    for dish, qty in portions.items():
+        ingredients = recipes.get(dish)
+        if ingredients is None:
+            unmatched_dishes.append(dish)
+            continue
+        scale = qty / RECIPE_BASE_PORTIONS
+        for ing in ingredients:
+            amount, unit = normalize_unit(float(ing.get("baseQty") or 0) * scale, ing.get("unit"))
+            key = (_name_key(ing.get("name")), unit)
+            entry = required.setdefault(key, {"name": ing.get("name"), "unit": unit, "required": 0.0})
+            entry["required"] += amount
+
+    inventory_rows = _fetch_all(lambda: (
+        supabase.table("inventory_items")
+        .select("id, name, unit, stock_quantity, min_threshold")
+    ))
+    inventory = {_name_key(i.get("name")): i for i in inventory_rows}
+
+    report = []
+    for (name_key, unit), entry in required.items():
+        row = {
+            "ingredient": entry["name"],
+            "unit": unit,
+            "required": round(entry["required"], 3),
+            "item_id": None,
+            "stock": None,
+            "min_threshold": None,
+            "shortfall": round(entry["required"], 3),
+            "below_min_after": True,
+        }
+        item = inventory.get(name_key)
+        if item:
+            stock, stock_unit = normalize_unit(float(item.get("stock_quantity") or 0), item.get("unit"))
+            min_threshold, _ = normalize_unit(float(item.get("min_threshold") or 0), item.get("unit"))
+            if stock_unit == unit:
+                remaining = stock - entry["required"]
+                row.update({
+                    "item_id": item.get("id"),
+                    "stock": round(stock, 3),
+                    "min_threshold": round(min_threshold, 3),
+                    "shortfall": round(max(0.0, -remaining), 3),
+                    "below_min_after": remaining < min_threshold,
+                })
+            else:
+                logger.warning(f"Unit mismatch for ingredient {entry['name']}: recipe {unit}, stock {stock_unit}")
+        report.append(row)
+
+    report.sort(key=lambda r: (-r["shortfall"], r["ingredient"] or ""))
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "dishes": dict(portions),
+        "unmatched_dishes": sorted(unmatched_dishes),
+        "requirements": report,
+        "shortfall_count": sum(1 for r in report if r["shortfall"] > 0),
+    }
+
+
+def get_requirements(start_date: str, end_date: str, refresh: bool = False) -> dict:
+    """带缓存的 compute_requirements，按日期范围缓存 PLAN_CACHE_TTL_SECONDS 秒（LRU，最多 PLAN_CACHE_MAX_ENTRIES 项）"""
+    key = (start_date, end_date)
+    with _plan_cache_lock:
+        cached = _plan_cache.get(key)
+        if cached and not refresh and time.monotonic() < cached[0]:
+            _plan_cache.move_to_end(key)
+            return cached[1]
+
+    result = compute_requirements(start_date, end_date)
+
+    with _plan_cache_lock:
+        now = time.monotonic()
+        for stale in [k for k, (expires_at, _) in _plan_cache.items() if expires_at <= now]:
+            del _plan_cache[stale]
+        _plan_cache[key] = (now + PLAN_CACHE_TTL_SECONDS, result)
+        _plan_cache.move_to_end(key)
+        while len(_plan_cache) > PLAN_CACHE_MAX_ENTRIES:
+            _plan_cache.popitem(last=False)
+    return result
+
+
+def invalidate_requirements_cache():
+    """订单、菜谱或库存变动后清空缓存"""
+    with _plan_cache_lock:
+        _plan_cache.clear()
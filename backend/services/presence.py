@@ -0,0 +1,116 @@
+"""
+司机在线状态服务
+司机端定期发送心跳，最近心跳时间只保存在内存中；超过 HEARTBEAT_TIMEOUT_SECONDS
+未收到心跳即视为离线。仅在上线/离线状态切换时通过 GoEasy 推送并写入 users.is_online，
+数据库写入次数与状态切换次数成正比，而不是与心跳次数成正比。
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Optional
+
+from database import supabase
+from fastapi.concurrency import run_in_threadpool
+from services.goeasy import publish_message
+from services.user_directory import user_directory
+
+logger = logging.getLogger(__name__)
+
+# 司机端建议每 30 秒发送一次心跳，连续错过约 3 次视为离线
+HEARTBEAT_TIMEOUT_SECONDS = 90
+SWEEP_INTERVAL_SECONDS = 15
+
+# user_id -> 最近心跳的 monotonic 时间
+_last_seen: dict[str, float] = {}
+# user_id -> 最近心跳的墙钟时间 (ISO)，供管理端展示
+_last_seen_at: dict[str, str] = {}
+_sweeper_task: Optional[asyncio.Task] = None
+
+
+async def _flush(user_id: str, online: bool):
+    """写入 users.is_online 并推送状态切换事件"""
+    try:
+        await run_in_threadpool(
+            supabase.table("users").update({"is_online": online}).eq("id", user_id).execute
+        )
+        user_directory.upsert({"id": user_id, "is_online": online})
+    except Exception as e:
+        logger.error(f"Failed to persist presence for {user_id}: {e}")
+
+    await publish_message({
+        "type": "presence",
+        "action": "online" if online else "offline",
+        "userId": user_id,
+        "timestamp": datetime.now().isoformat()
+    })
+
+
+async def heartbeat(user_id: str):
+    """记录心跳；仅当用户此前不在线时触发上线事件"""
+    was_online = user_id in _last_seen
+    _last_seen[user_id] = time.monotonic()
+    _last_seen_at[user_id] = datetime.now().isoformat()
+    if not was_online:
+        await _flush(user_id, True)
+
+
+async def go_offline(user_id: str):
+    """司机主动下线（如退出登录）"""
+    if _last_seen.pop(user_id, None) is not None:
+        _last_seen_at.pop(user_id, None)
+        await _flush(user_id, False)
+
+
+def is_online(user_id: str) -> bool:
+    return user_id in _last_seen
+
+
+def online_users() -> list[dict]:
+    return [{"user_id": uid, "last_seen": _last_seen_at.get(uid)} for uid in _last_seen]
+
+
+async def sweep():
+    """清理超时未发送心跳的用户"""
+    cutoff = time.monotonic() - HEARTBEAT_TIMEOUT_SECONDS
+    expired = [uid for uid, seen in _last_seen.items() if seen < cutoff]
+    for user_id in expired:
+        await go_offline(user_id)
+
+
+async def _reset_stale_flags():
+    """进程重启后内存状态为空，把上次遗留的 is_online=true 全部置为离线"""
+    await run_in_threadpool(
+        supabase.table("users").update({"is_online": False}).eq("is_online", True).execute
+    )
+    user_directory.invalidate()
+
+
+async def _sweeper_loop():
+    try:
+        await _reset_stale_flags()
+    except Exception as e:
+        logger.error(f"Failed to reset stale presence flags: {e}")
+    while True:
+        await asyncio.sleep(SWEEP_INTERVAL_SECONDS)
+        try:
+            await sweep()
+        except Exception as e:
+            logger.error(f"Presence sweep failed: {e}")
+
+
+def start_sweeper():
+    global _sweeper_task
+    if _sweeper_task is None or _sweeper_task.done():
+        _sweeper_task = asyncio.create_task(_sweeper_loop())
+
+
+async def stop_sweeper():
+    global _sweeper_task
+    if _sweeper_task and not _sweeper_task.done():
+        _sweeper_task.cancel()
+        try:
+            await _sweeper_task
+        except asyncio.CancelledError:
+            pass
+    _sweeper_task = None
@@ -0,0 +1,140 @@
+"""
+就绪探针
+并发探测各外部依赖（Supabase 数据库、Storage、GoEasy、Google Calendar），每项有独立的超时，
+结果缓存 READY_CACHE_SECONDS 秒，避免负载均衡器的高频探测放大到依赖上。
+关键依赖 (critical) 失败时 /ready 返回 503。
+
+同步 SDK 的探测在独立的小线程池中执行：超时只是不再等待，线程要等底层调用返回才释放，
+因此上一次探测仍未结束的依赖直接报告 down，不再发起新的探测，依赖故障期间线程不会越积越多，
+也不会占用处理业务请求的共享线程池。
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+
+from database import supabase
+
+PROBE_TIMEOUT_SECONDS = float(os.getenv("READY_PROBE_TIMEOUT", "2.0"))
+READY_CACHE_SECONDS = float(os.getenv("READY_CACHE_SECONDS", "5"))
+
+# 数据库、Storage、Google Calendar 三个同步探测各占一个线程；同一依赖不会并行探测，线程池不会排队
+_executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="readiness")
+
+
+class NotConfigured(Exception):
+    pass
+
+
+async def _in_probe_thread(fn):
+    return await asyncio.get_running_loop().run_in_executor(_executor, fn)
+
+
+async def _probe_database():
+    await _in_probe_thread(supabase.table("users").select("id").limit(1).execute)
+
+
+async def _probe_storage():
+    await _in_probe_thread(supabase.storage.list_buckets)
+
+
+async def _probe_goeasy():
+    from services.goeasy import GOEASY_HOST, get_client
+    if not os.getenv("GOEASY_APPKEY"):
+        raise NotConfigured()
+    # 不发布消息，只确认 REST 接口可达；任何 HTTP 响应都说明服务在线
+    response = await get_client().get(GOEASY_HOST, timeout=PROBE_TIMEOUT_SECONDS)
+    if response.status_code >= 500:
+        raise RuntimeError(f"HTTP {response.status_code}")
+
+
+async def _probe_calendar():
+    calendar_id = os.getenv("GOOGLE_CALENDAR_ID")
+    if not os.getenv("GOOGLE_CALENDAR_CREDENTIALS_JSON") or not calendar_id:
+        raise NotConfigured()
+
+    def check():
+        from services.google_calendar import get_calendar_service
+        service = get_calendar_service()
+        if service is None:
+            raise RuntimeError("Failed to initialize calendar service")
+        service.calendars().get(calendarId=calendar_id).execute()
+
+    await _in_probe_thread(check)
+
+
+# 名称 -> (探测函数, 是否关键依赖)
+PROBES: dict[str, tuple[Callable[[], Awaitable[None]], bool]] = {
+    "database": (_probe_database, True),
+    "storage": (_probe_storage, False),
+    "goeasy": (_probe_goeasy, False),
+    "google_calendar": (_probe_calendar, False),
+}
+
+_cache: dict = {"result": None, "expires_at": 0.0}
+_lock = asyncio.Lock()
+# 名称 -> 仍在执行的探测（超时后继续在后台运行直到底层调用返回）
+_in_flight: dict[str, asyncio.Future] = {}
+
+
+def _discard_result(future: asyncio.Future):
+    # 超时后才结束的探测，其结果已无人等待；取出异常避免 "exception was never retrieved" 日志
+    if not future.cancelled():
+        future.exception()
+
+
+async def _run_probe(name: str, probe: Callable[[], Awaitable[None]], critical: bool) -> dict:
+    started = time.perf_counter()
+    result = {"critical": critical}
+
+    pending = _in_flight.get(name)
+    if pending is not None and not pending.done():
+        result["status"] = "down"
+        result["error"] = "previous probe still running"
+        result["latency_ms"] = 0.0
+        return result
+
+    future = _in_flight[name] = asyncio.ensure_future(probe())
+    future.add_done_callback(_discard_result)
+    try:
+        await asyncio.wait_for(asyncio.shield(future), timeout=PROBE_TIMEOUT_SECONDS)
+        result["status"] = "up"
+    except NotConfigured:
+        result["status"] = "not_configured"
+    except asyncio.TimeoutError:
+        result["status"] = "down"
+        result["error"] = f"timeout after {PROBE_TIMEOUT_SECONDS}s"
+    except Exception as e:
+        result["status"] = "down"
+        result["error"] = str(e)[:200]
+    result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+async def check_readiness(force: bool = False) -> tuple[dict, bool]:
+    """返回 (报告, 是否就绪)；缓存期内的并发调用共享同一次探测"""
+    cached: Optional[dict] = _cache["result"]
+    if not force and cached is not None and time.monotonic() < _cache["expires_at"]:
+        return cached, cached["status"] != "unavailable"
+
+    async with _lock:
+        cached = _cache["result"]
+        if not force and cached is not None and time.monotonic() < _cache["expires_at"]:
+            return cached, cached["status"] != "unavailable"
+
+        names = list(PROBES)
+        results = await asyncio.gather(*(_run_probe(n, *PROBES[n]) for n in names))
+        dependencies = dict(zip(names, results))
+
+        critical_down = any(d["critical"] and d["status"] == "down" for d in results)
+        any_down = any(d["status"] == "down" for d in results)
+        report = {
+            "status": "unavailable" if critical_down else ("degraded" if any_down else "ready"),
+            "checked_at": datetime.utcnow().isoformat() + "Z",
+            "dependencies": dependencies,
+        }
+        _cache["result"] = report
+        _cache["expires_at"] = time.monotonic() + READY_CACHE_SECONDS
+        return report, not critical_down
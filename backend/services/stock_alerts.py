@@ -0,0 +1,134 @@
+"""
+低库存预警服务
+在内存中维护库存快照与低于安全库存 (min_threshold) 的物料集合。
+启动时全量加载一次，之后由库存写接口增量更新；跨越阈值时通过 GoEasy 推送事件。
+后台任务定期对账，兜底捕获绕过 API 直接改库的情况。
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+
+from database import supabase
+from fastapi.concurrency import run_in_threadpool
+from services.goeasy import publish_message
+
+logger = logging.getLogger(__name__)
+
+# 全量对账间隔
+RECONCILE_INTERVAL_SECONDS = 600
+
+# item_id -> {id, code, name, unit, stock_quantity, min_threshold}
+_items: dict[str, dict] = {}
+# 当前低于阈值的 item_id 集合
+_low_stock: set[str] = set()
+_scanner_task: Optional[asyncio.Task] = None
+# 首次加载完成前不推送事件，避免启动时把已有的低库存全部当作新告警
+_loaded = False
+
+
+def _is_low(item: dict) -> bool:
+    threshold = float(item.get("min_threshold") or 0)
+    return threshold > 0 and float(item.get("stock_quantity") or 0) < threshold
+
+
+async def _publish_transition(item: dict, low: bool):
+    await publish_message({
+        "type": "inventory_alert",
+        "action": "low_stock" if low else "restocked",
+        "itemId": item.get("id"),
+        "name": item.get("name"),
+        "stock_quantity": item.get("stock_quantity"),
+        "min_threshold": item.get("min_threshold"),
+        "timestamp": datetime.now().isoformat()
+    })
+
+
+async def observe_item(item: dict, notify: bool = True):
+    """记录物料最新状态；仅在跨越阈值时更新集合并推送"""
+    item_id = item.get("id")
+    if not item_id:
+        return
+    cached = _items.setdefault(item_id, {})
+    cached.update({k: item[k] for k in ("id", "code", "name", "unit", "stock_quantity", "min_threshold") if k in item})
+
+    low = _is_low(cached)
+    was_low = item_id in _low_stock
+    if low == was_low:
+        return
+    if low:
+        _low_stock.add(item_id)
+    else:
+        _low_stock.discard(item_id)
+    if notify:
+        await _publish_transition(cached, low)
+
+
+async def observe_stock(item_id: str, stock_quantity: float):
+    """库存调整后调用：只更新数量，阈值沿用内存快照"""
+    if item_id not in _items:
+        # 快照中没有（如刚由外部创建），等待下次对账
+        return
+    await observe_item({"id": item_id, "stock_quantity": stock_quantity})
+
+
+def forget_item(item_id: str):
+    _items.pop(item_id, None)
+    _low_stock.discard(item_id)
+
+
+def get_alerts() -> list[dict]:
+    """当前低库存物料，按缺口比例从高到低排序"""
+    alerts = []
+    for item_id in _low_stock:
+        item = _items[item_id]
+        threshold = float(item.get("min_threshold") or 0)
+        stock = float(item.get("stock_quantity") or 0)
+        alerts.append({**item, "deficit": round(threshold - stock, 3)})
+    alerts.sort(key=lambda a: a["deficit"] / (float(a.get("min_threshold") or 1)), reverse=True)
+    return alerts
+
+
+async def reconcile():
+    """全量读取库存并与内存快照对账（启动时及定期执行）"""
+    global _loaded
+    response = await run_in_threadpool(
+        supabase.table("inventory_items")
+        .select("id, code, name, unit, stock_quantity, min_threshold")
+        .execute
+    )
+    rows = response.data or []
+    seen = set()
+    for row in rows:
+        seen.add(row["id"])
+        await observe_item(row, notify=_loaded)
+    for item_id in list(_items):
+        if item_id not in seen:
+            forget_item(item_id)
+    _loaded = True
+
+
+async def _scanner_loop():
+    while True:
+        try:
+            await reconcile()
+        except Exception as e:
+            logger.error(f"Low-stock reconcile failed: {e}")
+        await asyncio.sleep(RECONCILE_INTERVAL_SECONDS)
+
+
+def start_scanner():
+    global _scanner_task
+    if _scanner_task is None or _scanner_task.done():
+        _scanner_task = asyncio.create_task(_scanner_loop())
+
+
+async def stop_scanner():
+    global _scanner_task
+    if _scanner_task and not _scanner_task.done():
+        _scanner_task.cancel()
+        try:
+            await _scanner_task
+        except asyncio.CancelledError:
+            pass
+    _scanner_task = None
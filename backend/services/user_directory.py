@@ -0,0 +1,141 @@
+"""
+用户目录服务
+一次性加载 users 表并在内存中维护 id / email / role 索引，供各路由共享，
+避免每次请求都 select("*")。管理端写操作后主动更新或失效，另有定期刷新兜底。
+"""
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from database import supabase
+from fastapi.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+REFRESH_INTERVAL_SECONDS = 300
+# 未命中时单行回查数据库；查不到的 id / email 在这段时间内不再重复回查
+MISS_TTL_SECONDS = 30
+
+
+class UserDirectory:
+    def __init__(self):
+        self._by_id: dict[str, dict] = {}
+        self._by_email: dict[str, str] = {}
+        self._loaded_at = 0.0
+        self._misses: dict[tuple[str, str], float] = {}
+        self._lock = asyncio.Lock()
+
+    def _index(self, users: list[dict]):
+        self._by_id = {u["id"]: u for u in users if u.get("id")}
+        self._by_email = {u["email"].lower(): u["id"] for u in users if u.get("email") and u.get("id")}
+
+    async def ensure_loaded(self):
+        """首次访问或超过刷新间隔时重新加载；并发请求只触发一次查询"""
+        if self._by_id and time.monotonic() - self._loaded_at < REFRESH_INTERVAL_SECONDS:
+            return
+        async with self._lock:
+            if self._by_id and time.monotonic() - self._loaded_at < REFRESH_INTERVAL_SECONDS:
+                return
+            response = await run_in_threadpool(supabase.table("users").select("*").execute)
+            self._index(response.data or [])
+            self._misses.clear()
+            self._loaded_at = time.monotonic()
+            logger.info(f"User directory loaded with {len(self._by_id)} users")
+
+    def invalidate(self):
+        """下次访问时重新加载"""
+        self._loaded_at = 0.0
+
+    def upsert(self, user: dict):
+        """写操作返回最新行时直接合并到目录，无需整表重载"""
+        user_id = user.get("id")
+        if not user_id:
+            return
+        merged = {**self._by_id.get(user_id, {}), **user}
+        self._misses.pop(("id", user_id), None)
+        self._by_id[user_id] = merged
+        if merged.get("email"):
+            self._by_email[merged["email"].lower()] = user_id
+            self._misses.pop(("email", merged["email"].lower()), None)
+
+    def remove(self, user_id: str):
+        user = self._by_id.pop(user_id, None)
+        if user and user.get("email"):
+            self._by_email.pop(user["email"].lower(), None)
+
+    async def _fetch_missing(self, column: str, value: str) -> Optional[dict]:
+        """
+        目录中没有时回查一行：用户可能由管理端以外的途径（SQL、Supabase 控制台）插入，
+        不必等到下一次整表刷新。查到后合并进目录。
+        """
+        key = (column, value)
+        expires_at = self._misses.get(key)
+        if expires_at and expires_at > time.monotonic():
+            return None
+        try:
+            query = supabase.table("users").select("*")
+            if column == "email":
+                # email 大小写不敏感匹配，转义 LIKE 通配符
+                query = query.ilike(column, value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_"))
+            else:
+                query = query.eq(column, value)
+            response = await run_in_threadpool(query.limit(1).execute)
+        except Exception as e:
+            logger.warning(f"User directory lookup by {column} failed: {e}")
+            return None
+        if not response.data:
+            self._misses[key] = time.monotonic() + MISS_TTL_SECONDS
+            return None
+        self.upsert(response.data[0])
+        return self._by_id.get(response.data[0].get("id"))
+
+    async def fetch_role(self, user_id: str) -> Optional[str]:
+        """
+        从数据库读取用户的当前角色（不使用目录缓存），并合并进目录。
+        供权限守卫使用：其他 worker 上的降级 / 删除不必等到下一次整表刷新才生效。
+        用户不在 users 表中时返回 None；查询失败时直接抛出。
+        """
+        response = await run_in_threadpool(
+            supabase.table("users").select("id, role").eq("id", user_id).limit(1).execute
+        )
+        if not response.data:
+            self.remove(user_id)
+            return None
+        self.upsert(response.data[0])
+        return response.data[0].get("role")
+
+    # ── 查询（返回副本，调用方可自由修改）──────────────────────────────────
+
+    async def all(self) -> list[dict]:
+        await self.ensure_loaded()
+        return [dict(u) for u in self._by_id.values()]
+
+    async def get(self, user_id: str) -> Optional[dict]:
+        await self.ensure_loaded()
+        user = self._by_id.get(user_id)
+        if user is None and user_id:
+            user = await self._fetch_missing("id", user_id)
+        return dict(user) if user else None
+
+    async def get_many(self, user_ids: list[str]) -> dict[str, dict]:
+        await self.ensure_loaded()
+        return {uid: dict(self._by_id[uid]) for uid in user_ids if uid in self._by_id}
+
+    async def by_email(self, email: str) -> Optional[dict]:
+        await self.ensure_loaded()
+        email = (email or "").lower()
+        user_id = self._by_email.get(email)
+        if user_id:
+            return dict(self._by_id[user_id])
+        user = await self._fetch_missing("email", email) if email else None
+        return dict(user) if user else None
+
+    async def by_role(self, role: str) -> list[dict]:
+        await self.ensure_loaded()
+        users = [dict(u) for u in self._by_id.values() if u.get("role") == role]
+        users.sort(key=lambda u: u.get("name") or "")
+        return users
+
+
+user_directory = UserDirectory()
@@ -1,4 +1,5 @@
 import http.client
+import json
 import socket
 import time
 import sys
@@ -10,6 +11,18 @@ def check_port(host, port, timeout=2):
     except (socket.timeout, ConnectionRefusedError):
         return False
 
+def check_backend_ready(host, port, timeout=5):
+    """调用后端 /ready，返回 (是否就绪, 依赖详情)"""
+    try:
+        conn = http.client.HTTPConnection(host, port, timeout=timeout)
+        conn.request("GET", "/ready")
+        resp = conn.getresponse()
+        body = json.loads(resp.read() or b"{}")
+        conn.close()
+        return resp.status == 200, body.get("dependencies", {})
+    except (OSError, ValueError, http.client.HTTPException):
+        return False, {}
+
 services = [
     {"name": "Backend (API)", "host": "localhost", "port": 8000},
     {"name": "Main Frontend (App)", "host": "localhost", "port": 3000},
@@ -28,6 +41,15 @@ for svc in services:
     print(f"{icon} {svc['name']:<20} : {status} (Port {svc['port']})")
     if not is_up:
         all_ok = False
+    elif svc["port"] == 8000:
+        # 端口可达不代表可用，再检查后端依赖的就绪状态
+        is_ready, deps = check_backend_ready(svc["host"], svc["port"])
+        for name, dep in deps.items():
+            dep_icon = "[!]" if dep.get("status") == "down" else "   "
+            print(f"    {dep_icon} {name:<16} : {dep.get('status')} ({dep.get('latency_ms')} ms)")
+        if not is_ready:
+            print(f"[!] {'Backend readiness':<20} : NOT READY")
+            all_ok = False
 
 print("-"*40)
 if all_ok:
@@ -6,7 +6,10 @@ import PullToRefresh from '../src/components/PullToRefresh';
 const InventoryManagement: React.FC = () => {
     const [items, setItems] = useState<InventoryItem[]>([]);
     const [logs, setLogs] = useState<InventoryLog[]>([]);
+    const [itemsCursor, setItemsCursor] = useState<string | null>(null);
+    const [logsCursor, setLogsCursor] = useState<string | null>(null);
     const [isLoading, setIsLoading] = useState(true);
+    const [isLoadingMore, setIsLoadingMore] = useState(false);
     const [activeTab, setActiveTab] = useState<'items' | 'logs'>('items');
     const [searchTerm, setSearchTerm] = useState('');
     const [categoryFilter, setCategoryFilter] = useState('ALL');
@@ -37,12 +40,14 @@ const InventoryManagement: React.FC = () => {
     const fetchData = async () => {
         setIsLoading(true);
         try {
-            const [itemsRes, logsRes] = await Promise.all([
-                InventoryService.getAll(),
+            const [itemsPage, logsPage] = await Promise.all([
+                InventoryService.getPage(),
                 InventoryService.getLogs()
             ]);
-            setItems(itemsRes || []);
-            setLogs(logsRes || []);
+            setItems(itemsPage.data || []);
+            setItemsCursor(itemsPage.nextCursor);
+            setLogs(logsPage.data || []);
+            setLogsCursor(logsPage.nextCursor);
         } catch (err) {
             console.error('Failed to fetch inventory data:', err);
         } finally {
@@ -50,6 +55,28 @@ const InventoryManagement: React.FC = () => {
         }
     };
 
+    // 按 X-Next-Cursor 继续加载当前标签页的下一页
+    const loadMore = async () => {
+        setIsLoadingMore(true);
+        try {
+            if (activeTab === 'items' && itemsCursor) {
+                const page = await InventoryService.getPage(itemsCursor);
+                setItems(prev => [...prev, ...(page.data || [])]);
+                setItemsCursor(page.nextCursor);
+            } else if (activeTab === 'logs' && logsCursor) {
+                const page = await InventoryService.getLogs(undefined, logsCursor);
+                setLogs(prev => [...prev, ...(page.data || [])]);
+                setLogsCursor(page.nextCursor);
+            }
+        } catch (err) {
+            console.error('Failed to load more inventory data:', err);
+        } finally {
+            setIsLoadingMore(false);
+        }
+    };
+
+    const hasMore = activeTab === 'items' ? !!itemsCursor : !!logsCursor;
+
     useEffect(() => {
         fetchData();
     }, []);
@@ -358,6 +385,16 @@ const InventoryManagement: React.FC = () => {
                                 )}
                             </div>
                         )}
+
+                        {!isLoading && hasMore && (
+                            <button
+                                onClick={loadMore}
+                                disabled={isLoadingMore}
+                                className="w-full mt-4 py-3 bg-white border-2 border-primary/10 text-primary rounded-2xl text-[10px] font-black uppercase tracking-widest active:scale-95 transition-all disabled:opacity-50"
+                            >
+                                {isLoadingMore ? '加载中...' : '加载更多'}
+                            </button>
+                        )}
                     </div>
                 </PullToRefresh>
             </main>
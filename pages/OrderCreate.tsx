@@ -32,7 +32,7 @@ const mapApiProduct = (p: ApiProduct): LocalProduct => ({
     name: p?.name || '未命名商品',
     category: p?.category || '其他',
     price: typeof p?.price === 'number' ? p.price : 0,
-    img: p?.image_url || '',
+    img: p?.image_src || p?.image_url || '',
 });
 
 const OrderCreate: React.FC = () => {
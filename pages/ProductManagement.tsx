@@ -21,6 +21,7 @@ const ProductManagement: React.FC = () => {
         price: number | '';
         category: string;
         image_url: string;
+        image_variants: Record<string, string> | null;
         stock: number | '';
     }>({
         code: '',
@@ -28,6 +29,7 @@ const ProductManagement: React.FC = () => {
         price: '',
         category: '',
         image_url: '',
+        image_variants: null,
         stock: 100
     });
 
@@ -84,6 +86,7 @@ const ProductManagement: React.FC = () => {
                 price: product.price ?? '',
                 category: product.category || '',
                 image_url: product.image_url || '',
+                image_variants: product.image_variants ?? null,
                 stock: product.stock ?? 100
             });
             setImagePreview(product.image_url || '');
@@ -92,7 +95,7 @@ const ProductManagement: React.FC = () => {
             setCustomCategory(!isPreset ? (product.category || '') : '');
         } else {
             setEditingProduct(null);
-            setForm({ code: '', name: '', price: '', category: '', image_url: '', stock: 100 });
+            setForm({ code: '', name: '', price: '', category: '', image_url: '', image_variants: null, stock: 100 });
             setImagePreview('');
             setShowCustomCategory(false);
             setCustomCategory('');
@@ -108,8 +111,8 @@ const ProductManagement: React.FC = () => {
         try {
             const localPreview = URL.createObjectURL(file);
             setImagePreview(localPreview);
-            const url = await ProductService.uploadImage(file);
-            setForm(prev => ({ ...prev, image_url: url }));
+            const { url, variants } = await ProductService.uploadImage(file);
+            setForm(prev => ({ ...prev, image_url: url, image_variants: variants }));
         } catch (err) {
             console.error('Image upload failed', err);
             alert('图片上传失败');
@@ -131,7 +134,8 @@ const ProductManagement: React.FC = () => {
             name: form.name,
             price: form.price === '' ? null : Number(form.price),
             category: finalCategory || '其他',
-            image_url: form.image_url || null
+            image_url: form.image_url || null,
+            image_variants: form.image_url ? form.image_variants : null
         };
 
         try {
@@ -244,7 +248,7 @@ const ProductManagement: React.FC = () => {
                                         <span className="material-icons-round text-[10px]">delete</span>
                                     </button>
                                     {p.image_url ? (
-                                        <img src={p.image_url} className="w-full h-full object-cover" alt={p.name} />
+                                        <img src={p.image_src || p.image_url} srcSet={p.image_srcset || undefined} sizes="96px" className="w-full h-full object-cover" alt={p.name} />
                                     ) : (
                                         <div className="w-full h-full bg-slate-50 flex items-center justify-center">
                                             <span className="material-icons-round text-slate-200 text-2xl">fastfood</span>
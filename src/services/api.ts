@@ -110,13 +110,16 @@ export const ProductService = {
     delete: async (id: string): Promise<void> => {
         await api.delete(`/products/${id}`);
     },
-    uploadImage: async (file: File): Promise<string> => {
+    /**
+     * 上传产品图片，返回原图 URL 与各尺寸变体；两者都需随产品一起保存
+     */
+    uploadImage: async (file: File): Promise<{ url: string; variants: Record<string, string> | null }> => {
         const formData = new FormData();
         formData.append('file', file);
         const response = await api.post('/products/upload', formData, {
             headers: { 'Content-Type': 'multipart/form-data' }
         });
-        return response.data.url;
+        return { url: response.data.url, variants: response.data.variants ?? null };
     },
     /**
      * 从产品列表中提取唯一品类列表，为前端创建订单菜单动态生成按钮
@@ -290,10 +293,16 @@ export const CustomerService = {
     },
 };
 
+// 库存列表按游标分页：下一页游标在 X-Next-Cursor 响应头中，为空表示已是最后一页
+export interface CursorPage<T> {
+    data: T[];
+    nextCursor: string | null;
+}
+
 export const InventoryService = {
-    getAll: async (): Promise<InventoryItem[]> => {
-        const response = await api.get('/inventory/items');
-        return response.data;
+    getPage: async (cursor?: string | null, limit = 200): Promise<CursorPage<InventoryItem>> => {
+        const response = await api.get('/inventory/items', { params: { limit, cursor: cursor || undefined } });
+        return { data: response.data, nextCursor: response.headers['x-next-cursor'] || null };
     },
     create: async (item: Partial<InventoryItem>): Promise<InventoryItem> => {
         const response = await api.post('/inventory/items', item);
@@ -310,9 +319,11 @@ export const InventoryService = {
         const response = await api.post('/inventory/adjust', adjustment);
         return response.data;
     },
-    getLogs: async (itemId?: string): Promise<InventoryLog[]> => {
-        const response = await api.get('/inventory/logs', { params: { item_id: itemId, select: '*,inventory_items(name)' } });
-        return response.data;
+    getLogs: async (itemId?: string, cursor?: string | null, limit = 50): Promise<CursorPage<InventoryLog>> => {
+        const response = await api.get('/inventory/logs', {
+            params: { item_id: itemId, select: '*,inventory_items(name)', limit, cursor: cursor || undefined }
+        });
+        return { data: response.data, nextCursor: response.headers['x-next-cursor'] || null };
     }
 };
 